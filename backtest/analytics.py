@@ -0,0 +1,89 @@
+import math
+
+import numpy as np
+
+from backtest.blotter import load_trades, load_equity
+
+DAY_MICROSECONDS = 24 * 3600 * 1000000
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def distribution(values, percentiles=PERCENTILES):
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        return {}
+    result = dict(('p%s' % p, float(v)) for p, v in zip(percentiles, np.percentile(values, percentiles)))
+    result['mean'] = float(values.mean())
+    return result
+
+
+def max_drawdown(equity):
+    """largest fall from a running peak of equity curve"""
+    equity = np.asarray(equity, dtype=np.float64)
+    if not len(equity):
+        return 0.0
+    peak = np.maximum.accumulate(np.maximum(equity, 0))
+    return float((peak - equity).max())
+
+
+def daily_returns(time, equity, capital):
+    """last equity of each utc day to returns against capital"""
+    time = np.asarray(time)
+    equity = np.asarray(equity, dtype=np.float64)
+    if not len(equity):
+        return np.array([])
+    day = time // DAY_MICROSECONDS
+    last = np.r_[np.flatnonzero(day[1:] != day[:-1]), len(day) - 1]
+    daily = np.r_[0.0, equity[last]]
+    return np.diff(daily) / capital
+
+
+def sharpe_ratio(returns, periods=252):
+    returns = np.asarray(returns, dtype=np.float64)
+    if len(returns) < 2:
+        return 0.0
+    std = returns.std(ddof=1)
+    if not std:
+        return 0.0
+    return float(returns.mean() / std * math.sqrt(periods))
+
+
+def profit_factor(profit):
+    profit = np.asarray(profit, dtype=np.float64)
+    gain = profit[profit > 0].sum()
+    loss = -profit[profit < 0].sum()
+    if not loss:
+        return float('inf') if gain else 0.0
+    return float(gain / loss)
+
+
+def profit_time_percent(profit_time, total_time):
+    profit_time = np.asarray(profit_time, dtype=np.float64)
+    total_time = np.asarray(total_time, dtype=np.float64)
+    mask = total_time > 0
+    return profit_time[mask] / total_time[mask] * 100
+
+
+def analyze(trades, equity=None, capital=10000):
+    """summary of trade and equity arrays loaded by backtest.blotter"""
+    profit = trades['profit']
+    report = {'trades': len(profit),
+              'win_rate': round(float((profit > 0).mean() * 100), 2) if len(profit) else 0,
+              'pips': round(float(trades['pips'].sum()), 1),
+              'profit': round(float(profit.sum()), 2),
+              'profit_factor': profit_factor(profit),
+              'mae': distribution(trades['min_profit']),
+              'mfe': distribution(trades['max_profit']),
+              'profit_time_percent': distribution(profit_time_percent(trades['profit_time'], trades['total_time']))}
+
+    if equity is not None and len(equity['equity']):
+        report['max_drawdown'] = max_drawdown(equity['equity'])
+        report['sharpe'] = sharpe_ratio(daily_returns(equity['time'], equity['equity'], capital))
+    else:
+        report['max_drawdown'] = max_drawdown(np.cumsum(profit))
+        report['sharpe'] = 0.0
+    return report
+
+
+def analyze_path(path, capital=10000):
+    return analyze(load_trades(path), load_equity(path), capital)
@@ -0,0 +1,160 @@
+import glob
+import os
+
+import numpy as np
+
+from backtest.store import datetime_to_epoch
+
+TRADE_PREFIX = 'trades'
+EQUITY_PREFIX = 'equity'
+
+TRADE_FIELDS = (('order_id', np.int64),
+                ('instrument', str),
+                ('direction', np.int8),
+                ('lots', np.float64),
+                ('open_time', np.int64),
+                ('close_time', np.int64),
+                ('open_price', np.float64),
+                ('close_price', np.float64),
+                ('pips', np.float64),
+                ('profit', np.float64),
+                ('max_profit', np.float64),
+                ('min_profit', np.float64),
+                ('profit_time', np.int64),
+                ('total_time', np.int64),
+                ('note', str))
+EQUITY_FIELDS = (('time', np.int64),
+                 ('equity', np.float64),
+                 ('drawdown', np.float64),
+                 ('open_orders', np.int64))
+
+
+class ChunkWriter(object):
+    """
+    append only columnar writer, rows are buffered and saved as numbered npz chunks of chunk_size.
+    chunks of an earlier run in path are removed unless resume, which keeps them until truncate.
+    """
+
+    def __init__(self, path, prefix, fields, chunk_size=10000, resume=False):
+        self.path = path
+        self.prefix = prefix
+        self.fields = fields
+        self.chunk_size = chunk_size
+        self.chunk_count = 0
+        self.row_count = 0
+        self.columns = [[] for _ in fields]
+        os.makedirs(path, exist_ok=True)
+        if not resume:
+            self.truncate(0, 0)
+
+    def append(self, row):
+        for column, value in zip(self.columns, row):
+            column.append(value)
+        self.row_count += 1
+        if len(self.columns[0]) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self.columns[0]:
+            return
+        data = {}
+        for (name, dtype), column in zip(self.fields, self.columns):
+            data[name] = np.array(column, dtype=dtype)
+        file_name = os.path.join(self.path, '%s-%05d.npz' % (self.prefix, self.chunk_count))
+        np.savez(file_name, **data)
+        self.chunk_count += 1
+        self.columns = [[] for _ in self.fields]
+
+    def truncate(self, chunk_count, row_count):
+        """rewind to a flushed position, chunks written after it are removed"""
+        for file_name in glob.glob(os.path.join(self.path, '%s-*.npz' % self.prefix)):
+            index = int(os.path.basename(file_name)[len(self.prefix) + 1:-4])
+            if index >= chunk_count:
+                os.remove(file_name)
+        self.chunk_count = chunk_count
+        self.row_count = row_count
+        self.columns = [[] for _ in self.fields]
+
+
+def load_chunks(path, prefix, fields):
+    """concatenate all chunks of prefix to dict of arrays"""
+    files = sorted(glob.glob(os.path.join(path, '%s-*.npz' % prefix)))
+    chunks = [np.load(file_name) for file_name in files]
+    result = {}
+    for name, dtype in fields:
+        arrays = [chunk[name] for chunk in chunks]
+        result[name] = np.concatenate(arrays) if arrays else np.array([], dtype=dtype)
+    return result
+
+
+def load_trades(path):
+    return load_chunks(path, TRADE_PREFIX, TRADE_FIELDS)
+
+
+def load_equity(path):
+    return load_chunks(path, EQUITY_PREFIX, EQUITY_FIELDS)
+
+
+class TradeBlotter(object):
+    """
+    stream closed trades and sampled equity/drawdown of backtest accounts into chunk files,
+    memory is bounded by chunk_size whatever the backtest length.
+    a new blotter clears chunks left in path, resume=True keeps them for set_state of a checkpoint.
+    """
+
+    def __init__(self, path, chunk_size=10000, resume=False):
+        self.path = path
+        self.trades = ChunkWriter(path, TRADE_PREFIX, TRADE_FIELDS, chunk_size, resume)
+        self.equity = ChunkWriter(path, EQUITY_PREFIX, EQUITY_FIELDS, chunk_size, resume)
+        self.realized_profit = 0.0
+        self.peak_equity = 0.0
+
+    def add_trade(self, order):
+        profit = float(order.profit)
+        self.realized_profit += profit
+        self.trades.append((order.order_id,
+                            order.instrument,
+                            order.direction,
+                            float(order.lots),
+                            order.open_us,
+                            datetime_to_epoch(order.close_time),
+                            float(order.open_price),
+                            float(order.close_price),
+                            float(order.pips),
+                            profit,
+                            float(order.max_profit),
+                            float(order.min_profit),
+                            order.profit_time // order.profit_time.resolution,
+                            order.total_time // order.total_time.resolution,
+                            order.note))
+
+    def sample(self, time, accounts):
+        """record equity = realized profit + floating profit of open orders"""
+        floating = 0.0
+        open_count = 0
+        for account in accounts:
+            for order in account.list_open_order():
+                floating += float(order.profit)
+                open_count += 1
+
+        equity = self.realized_profit + floating
+        self.peak_equity = max(self.peak_equity, equity)
+        self.equity.append((datetime_to_epoch(time), equity, self.peak_equity - equity, open_count))
+
+    def close(self):
+        self.trades.flush()
+        self.equity.flush()
+
+    def get_state(self):
+        """flush and return position to resume from, see BacktestRunner.save_checkpoint"""
+        self.close()
+        return {'trades': (self.trades.chunk_count, self.trades.row_count),
+                'equity': (self.equity.chunk_count, self.equity.row_count),
+                'realized_profit': self.realized_profit,
+                'peak_equity': self.peak_equity}
+
+    def set_state(self, state):
+        self.trades.truncate(*state['trades'])
+        self.equity.truncate(*state['equity'])
+        self.realized_profit = state['realized_profit']
+        self.peak_equity = state['peak_equity']
@@ -1,90 +1,65 @@
-from datetime import datetime
+import logging
 
-from dateutil.relativedelta import relativedelta
-from falcon.base.timeframe import PERIOD_CHOICES, get_candle_time, PERIOD_TICK
-from falcon.event import TickPriceEvent, TimeFrameEvent
+from falcon.base.order import SignalAction
+from falcon.base.timeframe import PERIOD_CHOICES, PERIOD_TICK
+from falcon.event import TickPriceEvent, SignalEvent
 
-from handler import TimeFramePublisher
+from handler import BaseHandler, TimeFramePublisher
+
+logger = logging.getLogger(__name__)
 
 
 class BacktestTickPriceHandler(TimeFramePublisher):
     """
-    extract tick price to context.ohlc
+    extract tick price to context.ohlc ring buffers keyed by (instrument, timeframe)
     """
 
     def process(self, event, context):
-        if isinstance(event, TickPriceEvent):
-            context.candle_time[PERIOD_TICK] = event.time
-            now = event.time
+        now = self.get_now(event, context)
+        is_tick = isinstance(event, TickPriceEvent)
+        if is_tick:
             self.enqueue_tick(event, context)
-        else:
-            # by HeartBeatEvent
-            now = datetime.utcnow() + relativedelta(hours=self.timezone)
 
+        if not self.in_candle_window(now, context):
+            self.rollover(now, context)
+
+        if is_tick:
+            self.tick_to_ohlc(event, context)
+
+    def tick_to_ohlc(self, event, context):
+        bid = float(event.bid)
+        ask = float(event.ask)
         for timeframe in PERIOD_CHOICES:
-            new_candle_time = get_candle_time(now, timeframe)
-            if not context.candle_time[timeframe]:
-                context.candle_time[timeframe] = new_candle_time
-                continue
-
-            if isinstance(event, TickPriceEvent):
-                self.tick_to_ohlc(timeframe, new_candle_time, event, context)
-
-            if context.candle_time[timeframe] != new_candle_time:
-                timeframe_event = TimeFrameEvent(timeframe=timeframe,
-                                                 current_time=new_candle_time,
-                                                 previous=context.candle_time[timeframe],
-                                                 timezone=self.timezone,
-                                                 time=now)
-                # print(f'[TimeFramePublisher] {timeframe_event.__dict__}')
-                context.candle_time[timeframe] = new_candle_time
-                context.put_event(timeframe_event)
-
-    def tick_to_ohlc(self, timeframe, candle_time, event, context):
-        timeframe_ohlc = context.ohlc[timeframe]
-        if not len(timeframe_ohlc):
-            # empty, add new ohlc
-            self.add_new_ohlc(timeframe_ohlc, candle_time, event, context)
-        else:
-            ohlc = timeframe_ohlc[-1]
-            if candle_time != ohlc['time']:
-                # candle time updated, add new ohlc
-                self.add_new_ohlc(timeframe_ohlc, candle_time, event, context)
-            else:
-                # candle time not update
-                if event.ask > ohlc['high_ask']:
-                    ohlc['high_ask'] = event.ask
-                if event.bid > ohlc['high_bid']:
-                    ohlc['high_bid'] = event.bid
-                if event.ask < ohlc['low_ask']:
-                    ohlc['low_ask'] = event.ask
-                if event.bid < ohlc['low_bid']:
-                    ohlc['low_bid'] = event.bid
-
-                ohlc['close_bid'] = event.bid
-                ohlc['close_ask'] = event.ask
-
-    def add_new_ohlc(self, timeframe_ohlc, candle_time, event, context):
-        ohlc_data = {'time': candle_time,
-                     'open_ask': event.ask,
-                     'open_bid': event.bid,
-                     'high_ask': event.ask,
-                     'high_bid': event.bid,
-                     'low_ask': event.ask,
-                     'low_bid': event.bid,
-                     'close_ask': event.ask,
-                     'close_bid': event.bid,
-                     }
-        if len(timeframe_ohlc) < context.max_ohlc_keep:
-            timeframe_ohlc.append(ohlc_data)
-        else:
-            timeframe_ohlc.pop(0)
-            timeframe_ohlc.append(ohlc_data)
+            candles = context.ohlc[event.instrument, timeframe]
+            candles.update_tick(context.candle_time[timeframe], bid, ask)
 
     def enqueue_tick(self, event, context):
-        tick_queue = context.ohlc[PERIOD_TICK]
-        if len(tick_queue) < context.max_tick_keep:
-            tick_queue.append(event)
-        else:
-            tick_queue.pop(0)
-            tick_queue.append(event)
+        context.last_ticks[event.instrument] = event
+        ticks = context.ohlc[event.instrument, PERIOD_TICK]
+        ticks.append(event.time, float(event.bid), float(event.ask))
+
+
+class BacktestSignalHandler(BaseHandler):
+    """open market order on backtest accounts by SignalEvent, filled at latest tick of instrument"""
+    subscription = [SignalEvent.type]
+    lots = 0.1
+
+    def __init__(self, lots=None):
+        if lots:
+            self.lots = lots
+
+    def process(self, event, context):
+        if event.action != SignalAction.OPEN:
+            return
+
+        tick = context.last_ticks.get(event.instrument)
+        if not tick:
+            logger.error(f'[BACKTEST_SIGNAL] no tick price for {event.instrument}')
+            return
+
+        for account in context.accounts:
+            account.market_order(event.instrument, event.side, self.lots,
+                                 take_profit=event.take_profit,
+                                 stop_loss=event.stop_loss,
+                                 trailing_pip=event.trailing_stop,
+                                 tick=tick)
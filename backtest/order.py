@@ -1,14 +1,53 @@
+import heapq
+from collections import defaultdict
 from datetime import timedelta
 from decimal import Decimal
 
+import numpy as np
 from falcon.base.order import OrderSide, OrderType
-from falcon.base.price import profit_pip, calculate_price, pip
+from falcon.base.price import calculate_price, pip
 from hulk.base.models import OrderBase
 
+from backtest.store import datetime_to_epoch
 
-class BacktestOrder:
 
-    def __init__(self, order_id, instrument, open_time, side, lots, open_price, take_profit, stop_loss):
+_point_scales = {}
+
+
+def get_point_scale(instrument):
+    """points (tenth of pip) per 1.0 price of instrument, 10000 pips of EURUSD is 100000 points"""
+    scale = _point_scales.get(instrument)
+    if scale is None:
+        scale = _point_scales[instrument] = int(pip(instrument, Decimal('1')) * 10)
+    return scale
+
+
+def to_points(price, scale):
+    """price to nearest integer points"""
+    return int(round(price * scale))
+
+
+class BacktestOrder(object):
+    """
+    slotted order record, prices, profits and times which change by tick are kept as integer points
+    and epoch microseconds, Decimal/datetime/timedelta are only built when read.
+    when attached to an OrderBook the tick state lives in the book arrays.
+    """
+    __slots__ = ('order_type', 'order_id', 'instrument', 'open_time', 'side', 'lots', 'open_price', 'take_profit',
+                 'stop_loss', 'trailing_pip', 'trailing_distance', 'trailing_stop', '_close_price', 'close_time', 'note',
+                 'scale', 'direction', 'open_points', 'close_points', 'open_us',
+                 '_current_points', '_current_us', '_current_time', '_max_points', '_min_points', '_profit_us',
+                 'book', 'slot')
+
+    def __init__(self, order_id, instrument, open_time, side, lots, open_price, take_profit, stop_loss,
+                 trailing_pip=None):
+        if side == OrderSide.BUY:
+            self.direction = 1
+        elif side == OrderSide.SELL:
+            self.direction = -1
+        else:
+            raise Exception(f'Side {side} incorrect.')
+
         self.order_type = OrderType.MARKET
         self.order_id = order_id
         self.instrument = instrument
@@ -16,18 +55,81 @@ class BacktestOrder:
         self.side = side
         self.lots = lots
         self.open_price = open_price
-        self.order_id = order_id
         self.take_profit = take_profit
         self.stop_loss = stop_loss
-
-        self.current_price = self.open_price
-        self.current_time = self.open_time
+        self.trailing_pip = trailing_pip
+        self.trailing_distance = None
+        if trailing_pip:
+            self.trailing_distance = calculate_price(Decimal(0), OrderSide.BUY, trailing_pip, instrument)
+        self.trailing_stop = None
+
+        self.scale = get_point_scale(instrument)
+        self.open_points = self.to_points(open_price)
+        self.open_us = datetime_to_epoch(open_time)
         self.close_price = None
         self.close_time = None
         self.note = ''
-        self.max_profit = 0
-        self.min_profit = 0
-        self.profit_time = timedelta(seconds=0)
+
+        self._current_points = self.open_points
+        self._current_us = self.open_us
+        self._current_time = open_time
+        self._max_points = 0
+        self._min_points = 0
+        self._profit_us = 0
+        self.book = None
+        self.slot = None
+
+    def to_points(self, price):
+        return to_points(price, self.scale)
+
+    def to_price(self, points):
+        return Decimal(points) / self.scale
+
+    def sync(self):
+        """pull tick state from order book"""
+        if self.book is not None:
+            self.book.sync(self)
+
+    @property
+    def current_price(self):
+        self.sync()
+        return self.to_price(self._current_points)
+
+    @current_price.setter
+    def current_price(self, price):
+        self.sync()
+        self._current_points = self.to_points(price)
+        if self.book is not None:
+            self.book.current_points[self.slot] = self._current_points
+
+    @property
+    def close_price(self):
+        return self._close_price
+
+    @close_price.setter
+    def close_price(self, price):
+        self._close_price = price
+        self.close_points = None if price is None else self.to_points(price)
+
+    @property
+    def current_time(self):
+        self.sync()
+        return self._current_time
+
+    @property
+    def max_profit(self):
+        self.sync()
+        return Decimal(self._max_points) / 10
+
+    @property
+    def min_profit(self):
+        self.sync()
+        return Decimal(self._min_points) / 10
+
+    @property
+    def profit_time(self):
+        self.sync()
+        return timedelta(microseconds=self._profit_us)
 
     @property
     def is_closed(self):
@@ -36,8 +138,11 @@ class BacktestOrder:
     @property
     def pips(self):
         if self.close_price:
-            return profit_pip(self.instrument, self.open_price, self.close_price, self.side)
-        return profit_pip(self.instrument, self.open_price, self.current_price, self.side)
+            points = self.close_points
+        else:
+            self.sync()
+            points = self._current_points
+        return Decimal((points - self.open_points) * self.direction) / 10
 
     @property
     def profit(self):
@@ -46,25 +151,26 @@ class BacktestOrder:
     def update_price(self, tick):
         if not tick.instrument == self.instrument:
             return
+        self.mark(datetime_to_epoch(tick.time), self.to_points(tick.bid), self.to_points(tick.ask), tick.time)
 
-        if self.side == OrderSide.BUY:
-            self.current_price = tick.bid
-            profit = self.current_price - self.open_price
-        elif self.side == OrderSide.SELL:
-            self.current_price = tick.ask
-            profit = self.open_price - self.current_price
+    def mark(self, time_us, bid_points, ask_points, time):
+        """mark to market by tick in points"""
+        if self.direction > 0:
+            self._current_points = bid_points
+            profit = bid_points - self.open_points
         else:
-            raise Exception(f'Side {self.side} incorrect.')
+            self._current_points = ask_points
+            profit = self.open_points - ask_points
 
-        profit = pip(self.instrument, profit)
-        if profit > self.max_profit:
-            self.max_profit = profit
-        elif profit < self.min_profit:
-            self.min_profit = profit
+        if profit > self._max_points:
+            self._max_points = profit
+        elif profit < self._min_points:
+            self._min_points = profit
 
         if profit > 0:
-            self.profit_time += tick.time - self.current_time
-        self.current_time = tick.time
+            self._profit_us += time_us - self._current_us
+        self._current_us = time_us
+        self._current_time = time
 
     @property
     def total_time(self):
@@ -85,10 +191,119 @@ class BacktestOrder:
         elif self.side == OrderSide.SELL:
             self.close_price = tick.ask
 
+    def update_trailing_stop(self, tick):
+        """move trailing stop with price, return new level if moved"""
+        if self.side == OrderSide.BUY:
+            level = tick.bid - self.trailing_distance
+            if self.trailing_stop is None or level > self.trailing_stop:
+                self.trailing_stop = level
+                return level
+        else:
+            level = tick.ask + self.trailing_distance
+            if self.trailing_stop is None or level < self.trailing_stop:
+                self.trailing_stop = level
+                return level
+        return None
+
+
+class OrderBook(object):
+    """
+    struct of arrays of open orders of one instrument, mark to market all of them by one numpy pass per tick.
+    worth it with many open orders, the python loop is faster for a few.
+    """
+    fields = ('direction', 'open_points', 'current_points', 'max_points', 'min_points', 'profit_us', 'current_us')
+
+    def __init__(self, size=64):
+        self.orders = []
+        self.time = None
+        self._allocate(size)
+
+    def _allocate(self, size):
+        count = len(self.orders)
+        for field in self.fields:
+            array = np.zeros(size, dtype=np.int64)
+            if count:
+                array[:count] = getattr(self, field)[:count]
+            setattr(self, field, array)
+
+    def __len__(self):
+        return len(self.orders)
+
+    def add(self, order):
+        slot = len(self.orders)
+        if slot == len(self.direction):
+            self._allocate(slot * 2)
+        self.direction[slot] = order.direction
+        self.open_points[slot] = order.open_points
+        self.current_points[slot] = order._current_points
+        self.max_points[slot] = order._max_points
+        self.min_points[slot] = order._min_points
+        self.profit_us[slot] = order._profit_us
+        self.current_us[slot] = order._current_us
+        self.orders.append(order)
+        order.book = self
+        order.slot = slot
+
+    def remove(self, order):
+        """detach order with its latest state, last order moves into the free slot"""
+        self.sync(order)
+        slot = order.slot
+        last = len(self.orders) - 1
+        if slot != last:
+            moved = self.orders[last]
+            for field in self.fields:
+                array = getattr(self, field)
+                array[slot] = array[last]
+            self.orders[slot] = moved
+            moved.slot = slot
+        self.orders.pop()
+        order.book = None
+        order.slot = None
+
+    def sync(self, order):
+        slot = order.slot
+        order._current_points = int(self.current_points[slot])
+        order._max_points = int(self.max_points[slot])
+        order._min_points = int(self.min_points[slot])
+        order._profit_us = int(self.profit_us[slot])
+        current_us = int(self.current_us[slot])
+        if current_us != order._current_us:
+            order._current_us = current_us
+            order._current_time = self.time
+
+    def mark(self, time_us, bid_points, ask_points, time):
+        count = len(self.orders)
+        if not count:
+            return
+        direction = self.direction[:count]
+        current = np.where(direction > 0, bid_points, ask_points)
+        profit = (current - self.open_points[:count]) * direction
+
+        np.maximum(self.max_points[:count], profit, out=self.max_points[:count])
+        np.minimum(self.min_points[:count], profit, out=self.min_points[:count])
+        self.profit_us[:count] += np.where(profit > 0, time_us - self.current_us[:count], 0)
+        self.current_us[:count] = time_us
+        self.current_points[:count] = current
+        self.time = time
 
 
 class BacktestOrderMixin(OrderBase):
+    """
+    open orders are indexed by instrument, closed orders only stay in self.orders.
+    stop loss, take profit and trailing stop levels are kept in heaps per instrument and side,
+    the top of each heap is the level closest to trigger so ticks crossing nothing cost one comparison per heap.
+    trailing orders are in ratchet heaps by the price their stop moves at, best bid seen for buy
+    and best ask for sell, so only orders whose stop moves are touched by a tick.
+    """
     _order_sequence = 0
+    _open_orders = None
+    _trailing_orders = None
+    _triggers = None
+    _ratchets = None
+    _order_books = None
+    use_order_book = False  # bulk mark to market open orders by OrderBook
+    blotter = None  # backtest.blotter.TradeBlotter receiving closed orders
+    keep_closed_orders = True
 
     def _generate_order_id(self):
         self._order_sequence += 1
@@ -103,6 +318,108 @@ class BacktestOrderMixin(OrderBase):
     def get_order(self, order_id):
         return self.orders.get(int(order_id))
 
+    def _init_index(self):
+        if self._open_orders is None:
+            self._open_orders = defaultdict(dict)  # instrument: {order_id: order}
+            self._trailing_orders = defaultdict(dict)  # instrument: {order_id: order}
+            self._triggers = defaultdict(list)  # (instrument, side, rising): heap
+            self._ratchets = defaultdict(list)  # (instrument, side): heap
+            self._order_books = defaultdict(OrderBook)  # instrument: OrderBook
+
+    def list_open_order(self, instrument=None):
+        self._init_index()
+        if instrument:
+            return list(self._open_orders[instrument].values())
+        return [order for orders in self._open_orders.values() for order in orders.values()]
+
+    def _push_trigger(self, order, kind, level):
+        """
+        buy orders exit by bid, sell orders by ask.
+        rising triggers fire when price >= level (buy take profit, sell stops), lowest level on top,
+        falling triggers fire when price <= level (buy stops, sell take profit), highest level on top.
+        """
+        if level is None:
+            return
+        rising = (order.side == OrderSide.BUY) == (kind == 'take_profit')
+        key = level if rising else -level
+        heap = self._triggers[order.instrument, order.side, rising]
+        heapq.heappush(heap, (key, order.order_id, kind, level))
+
+        if len(heap) > 4 * len(self._open_orders[order.instrument]) + 16:
+            # drop entries of closed orders and moved trailing stops
+            heap[:] = [x for x in heap if self._is_valid_trigger(order.instrument, x)]
+            heapq.heapify(heap)
+
+    def _is_valid_trigger(self, instrument, trigger):
+        key, order_id, kind, level = trigger
+        order = self._open_orders[instrument].get(order_id)
+        return order is not None and getattr(order, kind) == level
+
+    def _push_ratchet(self, order):
+        """buy stop moves when bid is above its best bid, sell stop when ask is below its best ask"""
+        if order.trailing_stop is None:
+            key = Decimal('-Infinity')
+        elif order.side == OrderSide.BUY:
+            key = order.trailing_stop + order.trailing_distance
+        else:
+            key = order.trailing_distance - order.trailing_stop
+        heap = self._ratchets[order.instrument, order.side]
+        heapq.heappush(heap, (key, order.order_id))
+
+        trailing_orders = self._trailing_orders[order.instrument]
+        if len(heap) > 4 * len(trailing_orders) + 16:
+            heap[:] = [x for x in heap if x[1] in trailing_orders]
+            heapq.heapify(heap)
+
+    def _ratchet_trailing_stops(self, tick):
+        trailing_orders = self._trailing_orders[tick.instrument]
+        for side, price in ((OrderSide.BUY, tick.bid), (OrderSide.SELL, tick.ask)):
+            heap = self._ratchets.get((tick.instrument, side))
+            moved = []
+            while heap and (heap[0][0] < price if side == OrderSide.BUY else -heap[0][0] > price):
+                key, order_id = heapq.heappop(heap)
+                order = trailing_orders.get(order_id)
+                if order is None:
+                    # closed
+                    continue
+                level = order.update_trailing_stop(tick)
+                if level is not None:
+                    self._push_trigger(order, 'trailing_stop', level)
+                moved.append(order)
+            for order in moved:
+                self._push_ratchet(order)
+
+    def _index_order(self, order):
+        self._init_index()
+        self._open_orders[order.instrument][order.order_id] = order
+        if self.use_order_book:
+            self._order_books[order.instrument].add(order)
+        if order.trailing_pip:
+            self._trailing_orders[order.instrument][order.order_id] = order
+            self._push_ratchet(order)
+        self._push_trigger(order, 'take_profit', order.take_profit)
+        self._push_trigger(order, 'stop_loss', order.stop_loss)
+
+    def _unindex_order(self, order):
+        self._init_index()
+        self._open_orders[order.instrument].pop(order.order_id, None)
+        self._trailing_orders[order.instrument].pop(order.order_id, None)
+        if order.book is not None:
+            order.book.remove(order)
+
+    def _check_triggers(self, tick):
+        for side, price in ((OrderSide.BUY, tick.bid), (OrderSide.SELL, tick.ask)):
+            for rising in (True, False):
+                heap = self._triggers.get((tick.instrument, side, rising))
+                while heap and (heap[0][3] <= price if rising else heap[0][3] >= price):
+                    trigger = heapq.heappop(heap)
+                    # skip closed orders and levels replaced by a newer trailing stop
+                    if not self._is_valid_trigger(tick.instrument, trigger):
+                        continue
+                    key, order_id, kind, level = trigger
+                    self.orders[order_id].note = kind
+                    self.close_order(order_id, tick=tick)
+
     def limit_order(self, instrument, side, price, lots, take_profit=None, stop_loss=None, trailing_pip=None, **kwargs):
         raise NotImplementedError
 
@@ -144,16 +461,18 @@ class BacktestOrderMixin(OrderBase):
 
         lots = Decimal(str(lots))
 
-        if '.' not in str(take_profit):
+        if take_profit is not None and '.' not in str(take_profit):
             # using pips
             take_profit = calculate_price(open_price, side, take_profit, instrument)
-        if '.' not in str(stop_loss):
+        if stop_loss is not None and '.' not in str(stop_loss):
             # using pips
             stop_loss = calculate_price(open_price, OrderSide.reverse(side), stop_loss, instrument)
 
-        order = BacktestOrder(order_id, instrument, open_time, side, lots, open_price, take_profit, stop_loss)
+        order = BacktestOrder(order_id, instrument, open_time, side, lots, open_price, take_profit, stop_loss,
+                              trailing_pip)
 
         self.orders[order_id] = order
+        self._index_order(order)
         return order
 
     def take_profit(self, trade_id, price, **kwargs):
@@ -171,10 +490,28 @@ class BacktestOrderMixin(OrderBase):
     def close_order(self, order_id, lots=None, percent=None, **kwargs):
         tick = kwargs.get('tick')
         order = self.orders.get(order_id)
-        if order:
+        if order and not order.is_closed:
             order.close(tick)
+            self._unindex_order(order)
+            if self.blotter:
+                self.blotter.add_trade(order)
+            if not self.keep_closed_orders:
+                self.orders.pop(order.order_id, None)
 
     def update_tick(self, tick):
-        for order_id, order in self.orders.items():
-            if order.instrument == tick.instrument:
-                order.update_price(tick)
+        self._init_index()
+        orders = self._open_orders.get(tick.instrument)
+        if not orders:
+            return
+
+        scale = get_point_scale(tick.instrument)
+        time_us = datetime_to_epoch(tick.time)
+        bid_points = to_points(tick.bid, scale)
+        ask_points = to_points(tick.ask, scale)
+        if self.use_order_book:
+            self._order_books[tick.instrument].mark(time_us, bid_points, ask_points, tick.time)
+        else:
+            for order in orders.values():
+                order.mark(time_us, bid_points, ask_points, tick.time)
+        self._ratchet_trailing_stops(tick)
+        self._check_triggers(tick)
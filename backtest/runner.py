@@ -1,18 +1,19 @@
-import json
 import logging
-from collections import defaultdict
+import os
+import pickle
+from collections import deque
 from datetime import datetime
 from decimal import Decimal
-from queue import Queue, Empty
 
-from falcon.base.event import BaseEvent
 from falcon.base.symbol import get_mt4_symbol
 from falcon.base.time import str_to_datetime
-from falcon.base.timeframe import PERIOD_M1, PERIOD_M5, PERIOD_M15, PERIOD_M30, PERIOD_H1, PERIOD_H4, \
-    PERIOD_D1, PERIOD_W1, PERIOD_TICK
+from falcon.base.timeframe import PERIOD_M1
 from falcon.event import TickPriceEvent
 
-from backtest.handler import BacktestTickPriceHandler
+from backtest.blotter import TradeBlotter
+from backtest.handler import BacktestTickPriceHandler, BacktestSignalHandler
+from backtest.store import TickStore, is_tick_store
+from base.candle import CandleStore
 from base.strategy import StrategyBase
 from handler import TickPriceHandler
 from runner.runner import MemoryQueueRunner
@@ -21,50 +22,143 @@ logger = logging.getLogger(__name__)
 
 
 class BacktestRunner(MemoryQueueRunner):
-    """Backtest runner"""
+    """
+    Backtest runner
+    queue_name is the tick csv file, or a directory created by backtest.store.convert_csv
+    to replay from the memory mapped arrays without parsing text.
+    """
     print_step = 10000
+    verbose = True
 
     line_count = 0
     loop_sleep = 0
     empty_sleep = 0
     heartbeat = 0
+    use_timer = False  # candles roll by tick time
     start_time = None
-
-    handlers = [BacktestTickPriceHandler()]
-    ohlc = defaultdict(list)
+    data_file_handler = None
+    tick_store = None
+    blotter = None
+    equity_sample_step = 1000
+    checkpoint_path = None
+    checkpoint_step = 2000000
+
+    handlers = [BacktestTickPriceHandler(), BacktestSignalHandler()]
+    ohlc = None
     max_tick_keep = 2000
     max_ohlc_keep = 50
 
     def __init__(self, queue_name, accounts, strategies, *args, **kwargs):
         super(BacktestRunner, self).__init__(queue_name, accounts, strategies, *args, **kwargs)
+        # BaseRunner sets live config values, backtest never sleeps or beats
+        self.loop_sleep = self.empty_sleep = self.heartbeat = 0
+        # next tick is read only after events put by the last one are handled
+        self.batch_size = 1
         self.start_time = datetime.utcnow()
+        self.ohlc = CandleStore(self.max_ohlc_keep, self.max_tick_keep)
+        self.last_ticks = {}
+
+        self.checkpoint_path = kwargs.get('checkpoint_path')
+        self.checkpoint_step = kwargs.get('checkpoint_step', self.checkpoint_step)
+        resume = bool(kwargs.get('resume') and self.checkpoint_path and os.path.exists(self.checkpoint_path))
+
+        blotter_path = kwargs.get('blotter_path')
+        if blotter_path:
+            # stream closed orders to disk instead of keeping them in account.orders
+            self.blotter = TradeBlotter(blotter_path, resume=resume)
+            for account in self.accounts:
+                account.blotter = self.blotter
+                account.keep_closed_orders = False
+
+        if resume:
+            self.load_checkpoint()
 
     def create_queue(self, queue_name):
         self.test_data_path = queue_name
-        self.data_file_handler = open(self.test_data_path)
-        return Queue()
+        if os.path.isdir(queue_name) and is_tick_store(queue_name):
+            self.tick_store = TickStore(queue_name)
+            self.tick_events = self.tick_store.iter_events()
+        else:
+            self.data_file_handler = open(self.test_data_path)
+        return deque()
 
     def yield_event(self, block=False):
-        try:
-            # read from quque first
-            data = self.queue.get(block)
-            if data:
-                data = json.loads(data)
-                return BaseEvent.from_dict(data)
-        except Empty:
-            pass
+        # read from queue first
+        if self.queue:
+            return self.queue.popleft()
 
-        line = self.data_file_handler.readline()
-        if line:
+        if self.checkpoint_path and self.line_count and not self.line_count % self.checkpoint_step:
+            self.save_checkpoint()
+
+        event = self.read_tick()
+        if event:
             self.line_count += 1
-            if not self.line_count % self.print_step:
+            if self.verbose and not self.line_count % self.print_step:
                 print(f'# {self.line_count} TickPriceEvent processed.')
-            return self.line_to_event(line)
+            return event
         else:
             self.stop()
 
         return None
 
+    def read_tick(self):
+        """next TickPriceEvent from tick store or csv, None if reach the end"""
+        if self.tick_store:
+            return next(self.tick_events, None)
+
+        line = self.data_file_handler.readline()
+        if line:
+            return self.line_to_event(line)
+        return None
+
+    def save_checkpoint(self):
+        """
+        pickle replay position and state to checkpoint_path, taken between two ticks so only
+        the queue, candles, accounts and strategies need to be kept. strategy attributes must be picklable.
+        """
+        state = {'line_count': self.line_count,
+                 'offset': self.data_file_handler.tell() if self.data_file_handler else None,
+                 'candle_time': self.candle_time,
+                 'candle_window': self.candle_window,
+                 'ohlc': self.ohlc,
+                 'last_ticks': self.last_ticks,
+                 'events': list(self.queue),
+                 # blotter is shared by runner and accounts, saved once by its position
+                 'accounts': [dict((key, value) for key, value in account.__dict__.items() if key != 'blotter')
+                              for account in self.accounts],
+                 'strategies': [strategy.__dict__ for strategy in self.strategies],
+                 'blotter': self.blotter.get_state() if self.blotter else None}
+
+        temp_path = self.checkpoint_path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            pickle.dump(state, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, self.checkpoint_path)
+        logger.info(f'[BACKTEST_CHECKPOINT] {self.line_count} ticks saved to {self.checkpoint_path}')
+
+    def load_checkpoint(self):
+        """restore state saved by save_checkpoint and seek data to where it was taken"""
+        with open(self.checkpoint_path, 'rb') as f:
+            state = pickle.load(f)
+
+        self.line_count = state['line_count']
+        if self.tick_store:
+            self.tick_events = self.tick_store.iter_events(self.line_count)
+        else:
+            self.data_file_handler.seek(state['offset'])
+
+        self.candle_time = state['candle_time']
+        self.candle_window = state['candle_window']
+        self.ohlc = state['ohlc']
+        self.last_ticks = state['last_ticks']
+        self.queue.extend(state['events'])
+        for account, data in zip(self.accounts, state['accounts']):
+            account.__dict__.update(data)
+        for strategy, data in zip(self.strategies, state['strategies']):
+            strategy.__dict__.update(data)
+        if self.blotter and state['blotter']:
+            self.blotter.set_state(state['blotter'])
+        logger.info(f'[BACKTEST_CHECKPOINT] resume from {self.line_count} ticks of {self.checkpoint_path}')
+
     def line_to_event(self, line):
         """
         GBP/USD,20181202 22:01:01.100,1.27211,1.27656
@@ -81,43 +175,31 @@ class BacktestRunner(MemoryQueueRunner):
 
     def loop_handlers(self, event):
         """loop handlers to process event"""
-        re_put = False
-        for strategy in self.strategies:
-            # loop strategies
-            if event.type in strategy.subscription:
-                self.handle_event(strategy, event)
-
-        for handler in self.handlers:
-            # loop handlers
-            if '*' in handler.subscription:
-                result = self.handle_event(handler, event)
-                re_put = result or re_put
-                continue
-            elif event.type in handler.subscription:
-                result = self.handle_event(handler, event)
-                re_put = result or re_put
+        re_put = self.dispatch(event)
 
         if event.type == TickPriceEvent.type:
             for account in self.accounts:
                 account.update_tick(event)
+            if self.blotter and not self.line_count % self.equity_sample_step:
+                self.blotter.sample(event.time, self.accounts)
 
         if re_put:
-            if event.tried > 10:
-                logger.error('[EVENT_RETRY] tried to many times abort, event=%s' % event)
-            else:
-                event.tried += 1
-                self.put_event(event)
+            self.retry_event(event)
 
     def stop(self):
-        self.data_file_handler.close()
-        print('=' * 40)
-        print(f'{self.line_count} lines processed.')
-        print(f'{len(self.ohlc[PERIOD_TICK])} lines processed.')
-        # pprint(self.candle_time)
-        print(
-            f'PERIOD_M1={len(self.ohlc[PERIOD_M1])}\nPERIOD_M5={len(self.ohlc[PERIOD_M5])}\nPERIOD_M15={len(self.ohlc[PERIOD_M15])}\nPERIOD_M30={len(self.ohlc[PERIOD_M30])}\nPERIOD_H1={len(self.ohlc[PERIOD_H1])}\nPERIOD_H4={len(self.ohlc[PERIOD_H4])}\nPERIOD_D1={len(self.ohlc[PERIOD_D1])}\nPERIOD_W1={len(self.ohlc[PERIOD_W1])}')
-
-        print(f'Time spend {datetime.utcnow()-self.start_time}')
+        if self.data_file_handler:
+            self.data_file_handler.close()
+        if self.blotter:
+            if self.last_tick_time:
+                self.blotter.sample(self.last_tick_time, self.accounts)
+            self.blotter.close()
+        if self.verbose:
+            print('=' * 40)
+            print(f'{self.line_count} lines processed.')
+            for (instrument, timeframe), buffer in self.ohlc.items():
+                print(f'{instrument} {timeframe}={len(buffer)}')
+
+            print(f'Time spend {datetime.utcnow()-self.start_time}')
         del self.queue
         self.running = False
 
@@ -0,0 +1,141 @@
+import json
+import os
+from array import array
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import numpy as np
+from falcon.base.symbol import get_mt4_symbol
+from falcon.base.time import str_to_datetime
+from falcon.event import TickPriceEvent
+
+EPOCH = datetime(1970, 1, 1)
+ONE_MICROSECOND = timedelta(microseconds=1)
+
+TIME_FILE = 'time.npy'
+BID_FILE = 'bid.npy'
+ASK_FILE = 'ask.npy'
+INSTRUMENT_FILE = 'instrument.npy'
+META_FILE = 'meta.json'
+
+PRICE_DIGITS = 5
+CSV_TIME_FORMAT = '%Y%m%d %H:%M:%S.%f'
+
+
+def datetime_to_epoch(dt):
+    """naive utc datetime to int epoch microseconds"""
+    return (dt - EPOCH) // ONE_MICROSECOND
+
+
+def epoch_to_datetime(microseconds):
+    """int epoch microseconds to naive utc datetime"""
+    return EPOCH + timedelta(microseconds=int(microseconds))
+
+
+def price_to_int(price, digits=PRICE_DIGITS):
+    """price string or Decimal to scaled integer, 1.27724 -> 127724"""
+    scaled = Decimal(price).scaleb(digits)
+    if scaled != scaled.to_integral_value():
+        raise ValueError(f'Price {price} has more than {digits} digits.')
+    return int(scaled)
+
+
+def convert_csv(csv_path, store_path, digits=PRICE_DIGITS, time_format=CSV_TIME_FORMAT):
+    """
+    one time convert tick csv into columnar store
+    GBP/USD,20181202 22:01:01.100,1.27211,1.27656
+    """
+    times = array('q')
+    bids = array('q')
+    asks = array('q')
+    codes = array('h')
+    instruments = []
+
+    with open(csv_path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            fields = line.split(',')
+            instrument = get_mt4_symbol(fields[0])
+            if instrument not in instruments:
+                instruments.append(instrument)
+
+            codes.append(instruments.index(instrument))
+            times.append(datetime_to_epoch(str_to_datetime(fields[1], time_format)))
+            bids.append(price_to_int(fields[2].strip(), digits))
+            asks.append(price_to_int(fields[3].strip(), digits))
+
+    os.makedirs(store_path, exist_ok=True)
+    np.save(os.path.join(store_path, TIME_FILE), np.frombuffer(times, dtype=np.int64))
+    np.save(os.path.join(store_path, BID_FILE), np.frombuffer(bids, dtype=np.int64))
+    np.save(os.path.join(store_path, ASK_FILE), np.frombuffer(asks, dtype=np.int64))
+    np.save(os.path.join(store_path, INSTRUMENT_FILE), np.frombuffer(codes, dtype=np.int16))
+    with open(os.path.join(store_path, META_FILE), 'w') as f:
+        json.dump({'digits': digits, 'instruments': instruments, 'count': len(times)}, f)
+
+    return TickStore(store_path)
+
+
+def is_tick_store(path):
+    return os.path.isfile(os.path.join(path, META_FILE))
+
+
+class TickStore(object):
+    """memory mapped columnar tick data, produced by convert_csv"""
+    broker = 'Back test broker'
+    chunk_size = 65536
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        self.digits = meta['digits']
+        self.instruments = meta['instruments']
+
+        self.time = np.load(os.path.join(path, TIME_FILE), mmap_mode='r')
+        self.bid = np.load(os.path.join(path, BID_FILE), mmap_mode='r')
+        self.ask = np.load(os.path.join(path, ASK_FILE), mmap_mode='r')
+        self.instrument = np.load(os.path.join(path, INSTRUMENT_FILE), mmap_mode='r')
+
+    def __len__(self):
+        return len(self.time)
+
+    def get_instrument_code(self, instrument):
+        return self.instruments.index(get_mt4_symbol(instrument))
+
+    def to_price(self, value):
+        return Decimal(value).scaleb(-self.digits)
+
+    def get_event(self, index):
+        return TickPriceEvent(broker=self.broker,
+                              instrument=self.instruments[self.instrument[index]],
+                              time=epoch_to_datetime(self.time[index]),
+                              bid=self.to_price(int(self.bid[index])),
+                              ask=self.to_price(int(self.ask[index])))
+
+    def iter_events(self, start=0):
+        """replay TickPriceEvent from index `start`, arrays are sliced by chunk to avoid per item numpy access"""
+        for chunk_start in range(start, len(self), self.chunk_size):
+            chunk_end = chunk_start + self.chunk_size
+            times = self.time[chunk_start:chunk_end].tolist()
+            bids = self.bid[chunk_start:chunk_end].tolist()
+            asks = self.ask[chunk_start:chunk_end].tolist()
+            codes = self.instrument[chunk_start:chunk_end].tolist()
+
+            for i in range(len(times)):
+                yield TickPriceEvent(broker=self.broker,
+                                     instrument=self.instruments[codes[i]],
+                                     time=EPOCH + timedelta(microseconds=times[i]),
+                                     bid=self.to_price(bids[i]),
+                                     ask=self.to_price(asks[i]))
+
+
+if __name__ == '__main__':
+    """
+    run example:
+    python -m backtest.store ./tests/GBPUSD-2018-12-tick.csv ./tests/GBPUSD-2018-12-tick
+    """
+    import sys
+
+    store = convert_csv(sys.argv[1], sys.argv[2])
+    print(f'{len(store)} ticks of {store.instruments} saved to {store.path}')
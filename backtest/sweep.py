@@ -0,0 +1,138 @@
+import importlib
+import itertools
+import logging
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from multiprocessing import Pool, cpu_count
+
+from backtest.account import BacktestAccount
+from backtest.analytics import analyze_path
+from backtest.runner import BacktestRunner
+from backtest.store import convert_csv, is_tick_store
+from backtest.vectorized import VectorizedBacktest, summarize_trades
+
+logger = logging.getLogger(__name__)
+
+STRATEGY_ATTRIBUTES = ('take_profit', 'stop_loss', 'trailing_stop')
+RESULT_COLUMNS = ('trades', 'win_rate', 'pips', 'profit')
+
+
+def import_class(path):
+    """strategy.hlhb_trend.HLHBTrendStrategy to class"""
+    module_name, class_name = path.rsplit('.', 1)
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def expand_grid(grid):
+    """{'a': [1, 2], 'b': [3]} to [{'a': 1, 'b': 3}, {'a': 2, 'b': 3}]"""
+    keys = sorted(grid.keys())
+    values = [grid[key] if isinstance(grid[key], (list, tuple)) else [grid[key]] for key in keys]
+    return [dict(zip(keys, combination)) for combination in itertools.product(*values)]
+
+
+def create_strategy(strategy_class, params):
+    """strategy instance with take_profit/stop_loss/trailing_stop and strategy.params overridden"""
+    strategy = strategy_class()
+    strategy.params = dict(strategy_class.params)
+    for key, value in params.items():
+        if key in STRATEGY_ATTRIBUTES:
+            setattr(strategy, key, value)
+        else:
+            strategy.params[key] = value
+    return strategy
+
+
+def summarize(account):
+    orders = list(account.orders.values())
+    pips = sum((order.pips for order in orders), Decimal(0))
+    profit = sum((order.profit for order in orders), Decimal(0))
+    wins = len([order for order in orders if order.pips > 0])
+    return {'trades': len(orders),
+            'win_rate': round(wins / len(orders) * 100, 2) if orders else 0,
+            'pips': float(pips),
+            'profit': float(profit)}
+
+
+def run_backtest(strategy_class, data_path, params, vectorized=False, blotter_path=None, **kwargs):
+    """run one backtest in current process, return params with result summary, kwargs go to BacktestRunner"""
+    strategy = create_strategy(strategy_class, params)
+    if vectorized:
+        result = dict(params)
+        result.update(summarize_trades(VectorizedBacktest(strategy, data_path).run()))
+        return result
+
+    account = BacktestAccount()
+    runner = BacktestRunner(data_path, [account], [strategy], [], blotter_path=blotter_path, **kwargs)
+    runner.verbose = False
+    runner.run()
+
+    result = dict(params)
+    if blotter_path:
+        # closed orders are only in blotter, open orders are left in account
+        report = analyze_path(blotter_path)
+        open_summary = summarize(account)
+        for key in ('trades', 'pips', 'profit'):
+            result[key] = report[key] + open_summary[key]
+        result['win_rate'] = report['win_rate']
+    else:
+        result.update(summarize(account))
+    return result
+
+
+def _run_task(task):
+    strategy_class, data_path, params, vectorized = task
+    try:
+        return run_backtest(strategy_class, data_path, params, vectorized)
+    except Exception as ex:
+        logger.error(f'[BACKTEST_SWEEP] {params}={ex}')
+        result = dict(params)
+        result['error'] = str(ex)
+        return result
+
+
+def rank(results, sort_by='profit'):
+    return sorted(results, key=lambda x: x.get(sort_by, float('-inf')), reverse=True)
+
+
+def sweep(strategy_class, data_path, grid, processes=None, sort_by='profit', vectorized=False):
+    """
+    run a backtest for every combination of grid on a process pool,
+    csv is converted once to a tick store so workers share it by mmap instead of parsing text.
+    """
+    if isinstance(strategy_class, str):
+        strategy_class = import_class(strategy_class)
+
+    temp_path = None
+    if not (os.path.isdir(data_path) and is_tick_store(data_path)):
+        temp_path = tempfile.mkdtemp(prefix='quicksilver_ticks_')
+        convert_csv(data_path, temp_path)
+        data_path = temp_path
+
+    tasks = [(strategy_class, data_path, params, vectorized) for params in expand_grid(grid)]
+    try:
+        with Pool(processes or cpu_count()) as pool:
+            results = list(pool.imap_unordered(_run_task, tasks))
+    finally:
+        if temp_path:
+            shutil.rmtree(temp_path, ignore_errors=True)
+
+    return rank(results, sort_by)
+
+
+def format_table(results, top=None):
+    """ranked results to text table"""
+    if not results:
+        return ''
+    results = results[:top] if top else results
+    columns = [key for key in results[0] if key not in RESULT_COLUMNS]
+    columns = ['rank'] + columns + [key for key in RESULT_COLUMNS if key in results[0]]
+    rows = [[str(i + 1)] + [str(result.get(key, '')) for key in columns[1:]] for i, result in enumerate(results)]
+    widths = [max(len(column), *[len(row[i]) for row in rows]) for i, column in enumerate(columns)]
+
+    lines = ['  '.join(column.rjust(width) for column, width in zip(columns, widths))]
+    lines.append('  '.join('-' * width for width in widths))
+    for row in rows:
+        lines.append('  '.join(value.rjust(width) for value, width in zip(row, widths)))
+    return '\n'.join(lines)
@@ -0,0 +1,183 @@
+import os
+from decimal import Decimal
+
+import numpy as np
+from falcon.base.order import OrderSide
+from falcon.base.price import pip
+from falcon.base.timeframe import PERIOD_M1, PERIOD_M5, PERIOD_M15, PERIOD_M30, PERIOD_H1, PERIOD_H4, PERIOD_D1, \
+    PERIOD_W1
+
+from backtest.store import TickStore, is_tick_store, epoch_to_datetime
+
+MINUTE = 60 * 1000000
+TIMEFRAME_MICROSECONDS = {PERIOD_M1: MINUTE,
+                          PERIOD_M5: 5 * MINUTE,
+                          PERIOD_M15: 15 * MINUTE,
+                          PERIOD_M30: 30 * MINUTE,
+                          PERIOD_H1: 60 * MINUTE,
+                          PERIOD_H4: 240 * MINUTE,
+                          PERIOD_D1: 1440 * MINUTE,
+                          PERIOD_W1: 10080 * MINUTE}
+# 1970-01-01 is Thursday, shift 3 days to start weeks on Monday
+WEEK_OFFSET = 3 * 1440 * MINUTE
+
+RESOLUTION_TICK = 'tick'
+RESOLUTION_M1 = 'M1'
+
+
+def resample(time, bid, ask, timeframe):
+    """
+    tick arrays to candle arrays of timeframe, time is int64 epoch microseconds,
+    return dict with `time` as datetime64[us] of candle start and open/high/low/close of bid and ask
+    """
+    period = TIMEFRAME_MICROSECONDS[timeframe]
+    offset = WEEK_OFFSET if timeframe == PERIOD_W1 else 0
+    bucket = (time + offset) // period
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:] - 1, len(time) - 1]
+
+    candles = {'time': (bucket[starts] * period - offset).astype('datetime64[us]')}
+    for name, series in (('bid', bid), ('ask', ask)):
+        candles['open_' + name] = series[starts]
+        candles['high_' + name] = np.maximum.reduceat(series, starts)
+        candles['low_' + name] = np.minimum.reduceat(series, starts)
+        candles['close_' + name] = series[ends]
+    return candles
+
+
+class VectorizedBacktest(object):
+    """
+    whole history backtest for strategies implementing StrategyBase.vectorized_signal.
+    entry and exit fill at the first tick (or M1 candle) after the signal candle closed,
+    stop loss and take profit are resolved against the tick or M1 series, one position per pair at a time.
+    trailing stop is not simulated.
+    """
+
+    def __init__(self, strategy, data_path, resolution=RESOLUTION_TICK, lots=0.1):
+        if not (os.path.isdir(data_path) and is_tick_store(data_path)):
+            raise ValueError(f'{data_path} is not a tick store, convert it by backtest.store.convert_csv')
+        self.strategy = strategy
+        self.store = TickStore(data_path)
+        self.resolution = resolution
+        self.lots = lots
+        self.timeframe = strategy.timeframes[0]
+
+    def run(self):
+        trades = []
+        for symbol in self.strategy.pairs:
+            if symbol in self.store.instruments:
+                trades.extend(self.run_pair(symbol))
+        return sorted(trades, key=lambda x: x['open_time'])
+
+    def load_pair(self, symbol):
+        mask = np.asarray(self.store.instrument) == self.store.get_instrument_code(symbol)
+        scale = 10 ** -self.store.digits
+        time = np.asarray(self.store.time)[mask]
+        bid = np.asarray(self.store.bid)[mask] * scale
+        ask = np.asarray(self.store.ask)[mask] * scale
+        return time, bid, ask
+
+    def get_path(self, time, bid, ask):
+        """price path used to resolve fills, ticks or M1 candles"""
+        if self.resolution == RESOLUTION_M1:
+            candles = resample(time, bid, ask, PERIOD_M1)
+            return {'time': candles['time'].astype(np.int64),
+                    'bid': candles['open_bid'], 'ask': candles['open_ask'],
+                    'low_bid': candles['low_bid'], 'high_bid': candles['high_bid'],
+                    'low_ask': candles['low_ask'], 'high_ask': candles['high_ask']}
+        return {'time': time, 'bid': bid, 'ask': ask,
+                'low_bid': bid, 'high_bid': bid, 'low_ask': ask, 'high_ask': ask}
+
+    def run_pair(self, symbol):
+        time, bid, ask = self.load_pair(symbol)
+        candles = resample(time, bid, ask, self.timeframe)
+        signal = self.strategy.vectorized_signal(symbol, candles)
+        if signal is None:
+            raise NotImplementedError(f'{self.strategy} does not support vectorized backtest.')
+
+        entry = np.asarray(signal['entry'])
+        exit_ = np.asarray(signal.get('exit', np.zeros(len(entry), dtype=bool)), dtype=bool)
+        path = self.get_path(time, bid, ask)
+        size = len(path['time'])
+
+        # first step of path after each candle closed
+        close_time = candles['time'].astype(np.int64) + TIMEFRAME_MICROSECONDS[self.timeframe]
+        signal_step = np.searchsorted(path['time'], close_time, side='left')
+        exit_candles = np.flatnonzero(exit_)
+        pip_per_price = float(pip(symbol, Decimal('1')))
+
+        trades = []
+        cursor = 0
+        for i in np.flatnonzero(entry):
+            start = signal_step[i]
+            if start < cursor or start >= size:
+                continue
+
+            side = OrderSide.BUY if entry[i] > 0 else OrderSide.SELL
+            next_exit = np.searchsorted(exit_candles, i, side='right')
+            end = signal_step[exit_candles[next_exit]] if next_exit < len(exit_candles) else size - 1
+            end = min(end, size - 1)
+
+            trade = self.resolve(symbol, side, path, start, end, pip_per_price)
+            trades.append(trade)
+            cursor = trade.pop('close_step') + 1
+        return trades
+
+    def resolve(self, symbol, side, path, start, end, pip_per_price):
+        if side == OrderSide.BUY:
+            open_price = path['ask'][start]
+            direction = 1
+            low, high, close = path['low_bid'], path['high_bid'], path['bid']
+        else:
+            open_price = path['bid'][start]
+            direction = -1
+            low, high, close = path['low_ask'], path['high_ask'], path['ask']
+
+        stop_loss = take_profit = None
+        if self.strategy.stop_loss:
+            stop_loss = open_price - direction * self.strategy.stop_loss / pip_per_price
+        if self.strategy.take_profit:
+            take_profit = open_price + direction * self.strategy.take_profit / pip_per_price
+
+        # the entry tick itself can not trigger
+        first = start + 1 if self.resolution == RESOLUTION_TICK else start
+        close_step, close_price = end, close[end]
+        reason = 'exit' if end < len(close) - 1 else 'end'
+
+        levels = []
+        if take_profit is not None:
+            crossed = high[first:end + 1] >= take_profit if direction > 0 else low[first:end + 1] <= take_profit
+            levels.append((crossed, take_profit, 'take_profit'))
+        if stop_loss is not None:
+            crossed = low[first:end + 1] <= stop_loss if direction > 0 else high[first:end + 1] >= stop_loss
+            levels.append((crossed, stop_loss, 'stop_loss'))
+
+        # stop loss is checked last so it wins when both are crossed in one step
+        for crossed, level, level_reason in levels:
+            if not crossed.any():
+                continue
+            step = first + int(np.argmax(crossed))
+            if step <= close_step:
+                close_step = step
+                close_price = close[step] if self.resolution == RESOLUTION_TICK else level
+                reason = level_reason
+
+        pips = round(float((close_price - open_price) * direction * pip_per_price), 1)
+        return {'instrument': symbol,
+                'side': side,
+                'open_time': epoch_to_datetime(path['time'][start]),
+                'open_price': round(float(open_price), self.store.digits),
+                'close_time': epoch_to_datetime(path['time'][close_step]),
+                'close_price': round(float(close_price), self.store.digits),
+                'pips': pips,
+                'profit': round(pips * self.lots * 10, 2),
+                'reason': reason,
+                'close_step': close_step}
+
+
+def summarize_trades(trades):
+    wins = len([trade for trade in trades if trade['pips'] > 0])
+    return {'trades': len(trades),
+            'win_rate': round(wins / len(trades) * 100, 2) if trades else 0,
+            'pips': round(sum(trade['pips'] for trade in trades), 1),
+            'profit': round(sum(trade['profit'] for trade in trades), 2)}
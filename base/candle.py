@@ -0,0 +1,143 @@
+import numpy as np
+from falcon.base.timeframe import PERIOD_TICK
+
+OHLC_FIELDS = ('open_bid', 'high_bid', 'low_bid', 'close_bid', 'open_ask', 'high_ask', 'low_ask', 'close_ask')
+TICK_FIELDS = ('bid', 'ask')
+
+
+class RingBuffer(object):
+    """
+    preallocated fixed size buffer, one numpy array per field plus `time`.
+    every value is written twice (at i and i + size) so the latest items are always
+    a contiguous slice, views are returned in chronological order without copy.
+    """
+    fields = ()
+
+    def __init__(self, size):
+        self.size = size
+        self.count = 0
+        self.arrays = {'time': np.zeros(size * 2, dtype='datetime64[us]')}
+        for field in self.fields:
+            self.arrays[field] = np.zeros(size * 2, dtype=np.float64)
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    def __getitem__(self, field):
+        """chronological view of field, oldest first and latest at [-1]"""
+        end = (self.count - 1) % self.size + self.size + 1
+        return self.arrays[field][end - len(self):end]
+
+    def _write(self, index, field, value):
+        array = self.arrays[field]
+        array[index] = value
+        array[index + self.size] = value
+
+    def to_dict(self):
+        return dict((field, self[field]) for field in self.arrays)
+
+
+class TickBuffer(RingBuffer):
+    fields = TICK_FIELDS
+
+    def append(self, time, bid, ask):
+        index = self.count % self.size
+        self._write(index, 'time', time)
+        self._write(index, 'bid', bid)
+        self._write(index, 'ask', ask)
+        self.count += 1
+
+
+class CandleBuffer(RingBuffer):
+    """
+    ohlc candles of one instrument and timeframe,
+    the forming candle is kept as python floats and only written to arrays when read or closed.
+    """
+    fields = OHLC_FIELDS
+
+    def __init__(self, size):
+        super(CandleBuffer, self).__init__(size)
+        self.last_time = None
+        self.current = None
+        self.dirty = False
+        self.listeners = []
+
+    def subscribe(self, callback):
+        """callback(candle) is called with a dict of the candle just closed"""
+        self.listeners.append(callback)
+
+    def get_current(self):
+        """forming candle as dict"""
+        if self.current is None:
+            return None
+        candle = dict(zip(self.fields, self.current))
+        candle['time'] = self.last_time
+        return candle
+
+    def closed_candles(self):
+        """dict of each closed candle in buffer, oldest first"""
+        data = self.to_dict()
+        count = len(self) - 1 if self.current is not None else len(self)
+        for i in range(count):
+            candle = dict((field, float(data[field][i])) for field in self.fields)
+            candle['time'] = data['time'][i].astype(object)
+            yield candle
+
+    def __getitem__(self, field):
+        self.flush()
+        return super(CandleBuffer, self).__getitem__(field)
+
+    def update_tick(self, candle_time, bid, ask):
+        """merge tick into forming candle, return True if a new candle started"""
+        current = self.current
+        if candle_time != self.last_time:
+            if self.listeners and current is not None:
+                closed = self.get_current()
+                for callback in self.listeners:
+                    callback(closed)
+            self.flush()
+            self.last_time = candle_time
+            self.current = [bid, bid, bid, bid, ask, ask, ask, ask]
+            self.count += 1
+            self.dirty = True
+            return True
+
+        if bid > current[1]:
+            current[1] = bid
+        elif bid < current[2]:
+            current[2] = bid
+        if ask > current[5]:
+            current[5] = ask
+        elif ask < current[6]:
+            current[6] = ask
+        current[3] = bid
+        current[7] = ask
+        self.dirty = True
+        return False
+
+    def flush(self):
+        if not self.dirty:
+            return
+        index = (self.count - 1) % self.size
+        self._write(index, 'time', self.last_time)
+        for field, value in zip(self.fields, self.current):
+            self._write(index, field, value)
+        self.dirty = False
+
+
+class CandleStore(dict):
+    """ring buffers keyed by (instrument, timeframe), created on first access"""
+
+    def __init__(self, max_ohlc_keep, max_tick_keep):
+        super(CandleStore, self).__init__()
+        self.max_ohlc_keep = max_ohlc_keep
+        self.max_tick_keep = max_tick_keep
+
+    def __missing__(self, key):
+        instrument, timeframe = key
+        if timeframe == PERIOD_TICK:
+            buffer = TickBuffer(self.max_tick_keep)
+        else:
+            buffer = CandleBuffer(self.max_ohlc_keep)
+        self[key] = buffer
+        return buffer
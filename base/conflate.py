@@ -0,0 +1,116 @@
+import calendar
+import threading
+import time
+from collections import deque
+
+from falcon.event import TickPriceEvent
+
+
+def tick_timestamp(event):
+    """epoch seconds of naive utc event time"""
+    return calendar.timegm(event.time.utctimetuple()) + event.time.microsecond / 1e6
+
+
+class ConflatingQueue(object):
+    """
+    event queue keeping only the newest queued tick of each instrument, a newer tick replaces the queued one
+    so the instrument is not starved by a fast feed. the newest tick moves to the tail, behind events put
+    before it, and keeps the put time of the tick it replaced. replaced entries are left dead and compacted
+    once they are half of the deque. with merge_range the tick delivered has `high` and `low` of the bids it replaced.
+    thread safe, get(block=True) waits for an event.
+    with event_time=True age of ticks counts from their utc event time instead of put time, for ticks which
+    already waited in another queue, e.g. redis.
+    """
+
+    def __init__(self, merge_range=False, event_time=False):
+        self.merge_range = merge_range
+        self.event_time = event_time
+        self.entries = deque()  # [event or None when replaced, put time]
+        self.dead = 0
+        self.ticks = {}  # instrument to its queued entry
+        self.condition = threading.Condition()
+        self.conflated = 0
+        self.max_age = 0  # seconds, oldest entry when it was taken
+
+    def __len__(self):
+        return len(self.entries) - self.dead
+
+    def qsize(self):
+        return len(self)
+
+    def put(self, event):
+        with self.condition:
+            if event.type == TickPriceEvent.type:
+                entry = self.ticks.get(event.instrument)
+                if entry:
+                    if self.merge_range:
+                        self.merge(entry[0], event)
+                    self.conflated += 1
+                    if self.entries[-1] is entry:
+                        entry[0] = event
+                        return
+                    # move behind events put after the replaced tick
+                    entry[0] = None
+                    self.dead += 1
+                    entry = [event, entry[1]]
+                    self.ticks[event.instrument] = entry
+                    self.entries.append(entry)
+                    if self.dead > len(self.entries) // 2:
+                        self.compact()
+                    return
+                if self.merge_range:
+                    event.high = event.low = event.bid
+                entry = [event, tick_timestamp(event) if self.event_time else time.time()]
+                self.ticks[event.instrument] = entry
+            else:
+                entry = [event, time.time()]
+            self.entries.append(entry)
+            self.condition.notify()
+
+    def merge(self, old, new):
+        new.high = max(old.high, new.bid)
+        new.low = min(old.low, new.bid)
+
+    def compact(self):
+        self.entries = deque(entry for entry in self.entries if entry[0] is not None)
+        self.dead = 0
+
+    def drop_dead(self):
+        entries = self.entries
+        while entries and entries[0][0] is None:
+            entries.popleft()
+            self.dead -= 1
+
+    def pop(self):
+        self.drop_dead()
+        event, put_time = self.entries.popleft()
+        if event.type == TickPriceEvent.type:
+            del self.ticks[event.instrument]
+        age = time.time() - put_time
+        if age > self.max_age:
+            self.max_age = age
+        return event
+
+    def get(self, block=False, timeout=None):
+        with self.condition:
+            if not len(self) and block:
+                self.condition.wait_for(self.__len__, timeout)
+            return self.pop() if len(self) else None
+
+    def get_many(self, count, block=False, timeout=None):
+        with self.condition:
+            if not len(self) and block:
+                self.condition.wait_for(self.__len__, timeout)
+            return [self.pop() for _ in range(min(count, len(self)))]
+
+    def age(self):
+        """seconds the oldest queued event has waited"""
+        with self.condition:
+            self.drop_dead()
+            return time.time() - self.entries[0][1] if self.entries else 0
+
+    def stats(self):
+        return {'queued': len(self),
+                'conflated': self.conflated,
+                'age': round(self.age(), 6),
+                'max_age': round(self.max_age, 6)}
@@ -1,3 +1,4 @@
+import numpy as np
 from falcon.base.order import OrderSide
 
 
@@ -11,6 +12,18 @@ def check_cross(data1, data2, shift=1):
     return None
 
 
+def cross_array(data1, data2):
+    """vectorized check_cross over whole series, 1 for up cross (buy), -1 for down cross (sell), 0 for none"""
+    data1 = np.asarray(data1)
+    data2 = np.asarray(data2)
+    result = np.zeros(len(data1), dtype=np.int8)
+    up = (data1[1:] > data2[1:]) & (data1[:-1] < data2[:-1])
+    down = (data1[1:] < data2[1:]) & (data1[:-1] > data2[:-1])
+    result[1:][up] = 1
+    result[1:][down] = -1
+    return result
+
+
 def check_reverse(data, shift=1):
     first = -1 - shift
     second = -2 - shift
@@ -0,0 +1,257 @@
+import math
+from collections import deque
+
+import numpy as np
+
+NAN = float('nan')
+
+
+class Indicator(object):
+    """
+    streaming indicator updated in O(1) by every closed candle.
+    output is aligned with talib, nan until enough candles, latest value at [-1]
+    """
+    max_keep = 500
+
+    def __init__(self, period, source='close_bid', max_keep=None):
+        self.period = period
+        self.source = source
+        self.values = deque(maxlen=max_keep or self.max_keep)
+        self.count = 0
+
+    def __getitem__(self, index):
+        return self.values[index]
+
+    def __len__(self):
+        return len(self.values)
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__, self.period)
+
+    @staticmethod
+    def get_value(candle, source):
+        """source is a candle field name or a callable of candle"""
+        if callable(source):
+            return source(candle)
+        return candle[source]
+
+    def to_array(self):
+        return np.array(self.values, dtype=np.float64)
+
+    def update(self, candle):
+        value = self.next(candle)
+        self.count += 1
+        self.values.append(value)
+        return value
+
+    def next(self, candle):
+        """calculate the value of new candle, self.count is the index of it"""
+        raise NotImplementedError
+
+    def bind(self, candles):
+        """warm up with closed candles of a CandleBuffer then follow it"""
+        for candle in candles.closed_candles():
+            self.update(candle)
+        candles.subscribe(self.update)
+        return self
+
+
+class SMA(Indicator):
+    def __init__(self, period, source='close_bid', max_keep=None):
+        super(SMA, self).__init__(period, source, max_keep)
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+
+    def next(self, candle):
+        value = self.get_value(candle, self.source)
+        if len(self.window) == self.period:
+            self.total -= self.window[0]
+        self.window.append(value)
+        self.total += value
+
+        if len(self.window) < self.period:
+            return NAN
+        return self.total / self.period
+
+
+class EMA(Indicator):
+    def __init__(self, period, source='close_bid', max_keep=None):
+        super(EMA, self).__init__(period, source, max_keep)
+        self.k = 2.0 / (period + 1)
+        self.total = 0.0
+        self.ema = None
+
+    def next(self, candle):
+        value = self.get_value(candle, self.source)
+        if self.ema is None:
+            # seeded by sma of first period values
+            self.total += value
+            if self.count + 1 < self.period:
+                return NAN
+            self.ema = self.total / self.period
+            return self.ema
+
+        self.ema = (value - self.ema) * self.k + self.ema
+        return self.ema
+
+
+class RSI(Indicator):
+    """Wilder's RSI"""
+
+    def __init__(self, period, source='close_bid', max_keep=None):
+        super(RSI, self).__init__(period, source, max_keep)
+        self.previous = None
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+
+    def next(self, candle):
+        value = self.get_value(candle, self.source)
+        previous, self.previous = self.previous, value
+        if previous is None:
+            return NAN
+
+        change = value - previous
+        gain = change if change > 0 else 0.0
+        loss = -change if change < 0 else 0.0
+
+        if self.count <= self.period:
+            self.avg_gain += gain
+            self.avg_loss += loss
+            if self.count < self.period:
+                return NAN
+            self.avg_gain /= self.period
+            self.avg_loss /= self.period
+        else:
+            self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+            self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+
+        total = self.avg_gain + self.avg_loss
+        return 100 * self.avg_gain / total if total else 0.0
+
+
+class ATR(Indicator):
+    """Wilder's average true range"""
+
+    def __init__(self, period, high='high_bid', low='low_bid', close='close_bid', max_keep=None):
+        super(ATR, self).__init__(period, close, max_keep)
+        self.high = high
+        self.low = low
+        self.previous_close = None
+        self.atr = 0.0
+
+    def next(self, candle):
+        high = self.get_value(candle, self.high)
+        low = self.get_value(candle, self.low)
+        previous_close, self.previous_close = self.previous_close, self.get_value(candle, self.source)
+        if previous_close is None:
+            return NAN
+
+        true_range = max(high - low, abs(high - previous_close), abs(low - previous_close))
+        if self.count <= self.period:
+            self.atr += true_range
+            if self.count < self.period:
+                return NAN
+            self.atr /= self.period
+        else:
+            self.atr = (self.atr * (self.period - 1) + true_range) / self.period
+        return self.atr
+
+
+class ADX(Indicator):
+    """Wilder's average directional index"""
+
+    def __init__(self, period, high='high_bid', low='low_bid', close='close_bid', max_keep=None):
+        super(ADX, self).__init__(period, close, max_keep)
+        self.high = high
+        self.low = low
+        self.previous = None
+        self.plus_dm = 0.0
+        self.minus_dm = 0.0
+        self.tr = 0.0
+        self.sum_dx = 0.0
+        self.adx = NAN
+
+    def get_dx(self):
+        if not self.tr:
+            return None
+        plus_di = 100 * self.plus_dm / self.tr
+        minus_di = 100 * self.minus_dm / self.tr
+        total = plus_di + minus_di
+        if not total:
+            return None
+        return 100 * abs(minus_di - plus_di) / total
+
+    def next(self, candle):
+        high = self.get_value(candle, self.high)
+        low = self.get_value(candle, self.low)
+        close = self.get_value(candle, self.source)
+        previous, self.previous = self.previous, (high, low, close)
+        if previous is None:
+            return NAN
+
+        previous_high, previous_low, previous_close = previous
+        up = high - previous_high
+        down = previous_low - low
+        plus_dm = up if up > 0 and up > down else 0.0
+        minus_dm = down if down > 0 and down > up else 0.0
+        true_range = max(high - low, abs(high - previous_close), abs(low - previous_close))
+
+        if self.count < self.period:
+            self.plus_dm += plus_dm
+            self.minus_dm += minus_dm
+            self.tr += true_range
+            return NAN
+
+        self.plus_dm += plus_dm - self.plus_dm / self.period
+        self.minus_dm += minus_dm - self.minus_dm / self.period
+        self.tr += true_range - self.tr / self.period
+        dx = self.get_dx()
+
+        if self.count < self.period * 2 - 1:
+            self.sum_dx += dx or 0.0
+            return NAN
+        if self.count == self.period * 2 - 1:
+            self.adx = (self.sum_dx + (dx or 0.0)) / self.period
+        elif dx is not None:
+            self.adx = (self.adx * (self.period - 1) + dx) / self.period
+        return self.adx
+
+
+class BollingerBands(Indicator):
+    """sma middle band with population standard deviation, upper and lower kept as extra series"""
+
+    def __init__(self, period=5, nbdev_up=2, nbdev_down=2, source='close_bid', max_keep=None):
+        super(BollingerBands, self).__init__(period, source, max_keep)
+        self.nbdev_up = nbdev_up
+        self.nbdev_down = nbdev_down
+        self.upper = deque(maxlen=self.values.maxlen)
+        self.lower = deque(maxlen=self.values.maxlen)
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+        self.total_square = 0.0
+
+    def update(self, candle):
+        middle = super(BollingerBands, self).update(candle)
+        if math.isnan(middle):
+            self.upper.append(NAN)
+            self.lower.append(NAN)
+        else:
+            variance = self.total_square / self.period - middle * middle
+            deviation = math.sqrt(variance) if variance > 0 else 0.0
+            self.upper.append(middle + deviation * self.nbdev_up)
+            self.lower.append(middle - deviation * self.nbdev_down)
+        return middle
+
+    def next(self, candle):
+        value = self.get_value(candle, self.source)
+        if len(self.window) == self.period:
+            oldest = self.window[0]
+            self.total -= oldest
+            self.total_square -= oldest * oldest
+        self.window.append(value)
+        self.total += value
+        self.total_square += value * value
+
+        if len(self.window) < self.period:
+            return NAN
+        return self.total / self.period
@@ -0,0 +1,102 @@
+from collections import deque
+
+from falcon.event import TickPriceEvent, TimeFrameEvent, HeartBeatEvent, SignalEvent, OrderHoldingEvent, \
+    StartUpEvent, DebugEvent, TradeOpenEvent, TradeCloseEvent
+
+CONTROL = 'control'
+ORDER = 'order'
+TIMEFRAME = 'timeframe'
+TICK = 'tick'
+LANES = (CONTROL, ORDER, TIMEFRAME, TICK)  # high priority first
+
+LANE_MAPPING = {StartUpEvent.type: CONTROL,
+                DebugEvent.type: CONTROL,
+                SignalEvent.type: ORDER,
+                TradeOpenEvent.type: ORDER,
+                TradeCloseEvent.type: ORDER,
+                OrderHoldingEvent.type: ORDER,
+                TimeFrameEvent.type: TIMEFRAME,
+                HeartBeatEvent.type: TIMEFRAME,
+                TickPriceEvent.type: TICK}
+
+
+class Lanes(object):
+    """
+    priority lanes of queued events, events of one lane keep their order.
+    weights None drains strictly by priority, else {lane: n} takes up to n events of each lane in turn
+    so ticks still move while orders keep coming. event types not in mapping go to default lane.
+    """
+
+    def __init__(self, mapping=None, weights=None, lanes=LANES, default=ORDER):
+        self.names = tuple(lanes)
+        self.mapping = dict(LANE_MAPPING)
+        self.mapping.update(mapping or {})
+        self.default = self.names.index(default)
+        self.indexes = dict((event_type, self.names.index(lane)) for event_type, lane in self.mapping.items())
+        self.weights = [weights[name] for name in self.names] if weights else None
+        self.index = 0  # lane in turn and credit left, weighted only
+        self.credit = 0
+
+    def get_lane(self, event_type):
+        """index of lane in self.names"""
+        return self.indexes.get(event_type, self.default)
+
+    def drain(self, pop, count):
+        """
+        up to count items by lane order, pop(lane, n) returns up to n items of lane.
+        strict starts over from the first lane each call, weighted continues the turn of the last call.
+        """
+        lane_count = len(self.names)
+        if self.weights:
+            index, credit = self.index, self.credit
+        else:
+            index, credit = 0, count
+        items = []
+        empty = 0
+        while len(items) < count and empty < lane_count:
+            if credit <= 0:
+                credit = self.weights[index] if self.weights else count
+            take = min(credit, count - len(items))
+            got = pop(index, take)
+            if got:
+                items.extend(got)
+                credit -= len(got)
+                empty = 0
+            else:
+                empty += 1
+            if len(got) < take or credit <= 0:
+                index = (index + 1) % lane_count
+                credit = 0
+        if self.weights:
+            self.index, self.credit = index, credit
+        return items
+
+
+class LaneQueue(object):
+    """in memory queue of event objects, one deque per lane"""
+
+    def __init__(self, lanes):
+        self.lanes = lanes
+        self.queues = [deque() for _ in lanes.names]
+
+    def __len__(self):
+        return sum(len(queue) for queue in self.queues)
+
+    def qsize(self):
+        return len(self)
+
+    def put(self, event):
+        self.queues[self.lanes.get_lane(event.type)].append(event)
+
+    def pop(self, lane, count):
+        queue = self.queues[lane]
+        if count == 1 or len(queue) <= 1:
+            return [queue.popleft()] if queue else []
+        return [queue.popleft() for _ in range(min(count, len(queue)))]
+
+    def get(self, block=False):
+        items = self.lanes.drain(self.pop, 1)
+        return items[0] if items else None
+
+    def get_many(self, count, block=False):
+        return self.lanes.drain(self.pop, count)
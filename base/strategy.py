@@ -1,4 +1,5 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from datetime import datetime
 
 from falcon.event import TimeFrameEvent, OrderHoldingEvent, StartUpEvent, TickPriceEvent
@@ -7,6 +8,23 @@ from handler import BaseHandler
 
 logger = logging.getLogger(__name__)
 
+PARALLEL_THREAD = 'thread'
+PARALLEL_PROCESS = 'process'
+
+
+class PairContext(object):
+    """runner proxy for one pair evaluated on a worker thread, events are kept to be put in pair order"""
+
+    def __init__(self, context, events):
+        self.context = context
+        self.events = events
+
+    def put_event(self, event):
+        self.events.append(event)
+
+    def __getattr__(self, name):
+        return getattr(self.context, name)
+
 
 class StrategyBase(BaseHandler):
     name = None
@@ -22,16 +40,27 @@ class StrategyBase(BaseHandler):
     pairs = []
     data_reader = None
     params = {}
+    indicators = None
     subscription = [TimeFrameEvent.type, OrderHoldingEvent.type]
 
     stop_loss = 100
     take_profit = None
     trailing_stop = None
 
+    # None evaluate pairs one by one, 'thread' run signal_pair concurrently,
+    # 'process' run fetch_pair on threads and evaluate_pair on processes
+    parallel = None
+    max_workers = None
+    thread_pool = None
+    process_pool = None
+
     def __str__(self):
         return '%s v%s #%s' % (self.name, self.version, self.magic_number)
 
     def signal(self, event, context):
+        if self.parallel and len(self.pairs) > 1:
+            return self.signal_parallel(event, context)
+
         for symbol in self.pairs:
             try:
                 self.signal_pair(symbol, event, context)
@@ -41,8 +70,99 @@ class StrategyBase(BaseHandler):
     def signal_pair(self, symbol, event, context):
         raise NotImplementedError
 
-    def can_open(self):
-        now = datetime.utcnow()
+    def fetch_pair(self, symbol, event, context):
+        """optional io part of signal_pair, read data needed by evaluate_pair, called on a worker thread"""
+        raise NotImplementedError
+
+    @classmethod
+    def evaluate_pair(cls, params, symbol, data):
+        """optional math part of signal_pair, must only use its arguments to run on a worker process"""
+        raise NotImplementedError
+
+    def apply_pair(self, symbol, result, event, context):
+        """optional last part of signal_pair, emit signal of evaluate_pair result, called on runner thread"""
+        raise NotImplementedError
+
+    def get_thread_pool(self):
+        if self.thread_pool is None:
+            self.thread_pool = ThreadPoolExecutor(self.max_workers or len(self.pairs))
+        return self.thread_pool
+
+    def get_process_pool(self):
+        if self.process_pool is None:
+            self.process_pool = ProcessPoolExecutor(self.max_workers)
+        return self.process_pool
+
+    def shutdown(self):
+        for pool in (self.thread_pool, self.process_pool):
+            if pool:
+                pool.shutdown()
+        self.thread_pool = self.process_pool = None
+
+    def signal_parallel(self, event, context):
+        """evaluate pairs concurrently, errors are isolated per pair and events are put in the order of self.pairs"""
+        if self.indicators is None:
+            self.indicators = {}
+        if self.parallel == PARALLEL_PROCESS and type(self).fetch_pair is not StrategyBase.fetch_pair:
+            return self.signal_process(event, context)
+
+        pool = self.get_thread_pool()
+        tasks = []
+        for symbol in self.pairs:
+            events = []
+            tasks.append((symbol, events, pool.submit(self.signal_pair, symbol, event, PairContext(context, events))))
+
+        for symbol, events, future in tasks:
+            try:
+                future.result()
+            except Exception as ex:
+                logger.error(f'[STRATEGY_SIGNAL] {symbol}={ex}')
+            for pair_event in events:
+                context.put_event(pair_event)
+
+    def signal_process(self, event, context):
+        threads = self.get_thread_pool()
+        fetches = [(symbol, threads.submit(self.fetch_pair, symbol, event, context)) for symbol in self.pairs]
+
+        processes = self.get_process_pool()
+        evaluations = []
+        for symbol, future in fetches:
+            try:
+                evaluations.append((symbol, processes.submit(type(self).evaluate_pair, self.params, symbol,
+                                                             future.result())))
+            except Exception as ex:
+                logger.error(f'[STRATEGY_SIGNAL] {symbol}={ex}')
+
+        for symbol, future in evaluations:
+            try:
+                self.apply_pair(symbol, future.result(), event, context)
+            except Exception as ex:
+                logger.error(f'[STRATEGY_SIGNAL] {symbol}={ex}')
+
+    def vectorized_signal(self, symbol, candles):
+        """
+        optional hook for backtest.vectorized, candles is dict of arrays over whole history of self.timeframes[0].
+        return {'entry': array of 1 buy / -1 sell / 0, 'exit': bool array}, None if not supported
+        """
+        return None
+
+    def create_indicators(self, symbol, timeframe):
+        """return dict of name to new base.indicator instance"""
+        return {}
+
+    def get_indicators(self, symbol, timeframe, context):
+        """indicators bound to context.ohlc candles of symbol, created on first call"""
+        if self.indicators is None:
+            self.indicators = {}
+        key = (symbol, timeframe)
+        if key not in self.indicators:
+            candles = context.ohlc[symbol, timeframe]
+            indicators = self.create_indicators(symbol, timeframe)
+            self.indicators[key] = dict((name, indicator.bind(candles)) for name, indicator in indicators.items())
+        return self.indicators[key]
+
+    def can_open(self, now=None):
+        now = now or datetime.utcnow()
         if now.weekday() not in self.weekdays:
             return False
         if now.hour not in self.hours:
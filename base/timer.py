@@ -0,0 +1,167 @@
+import math
+import time
+from collections import deque
+
+
+class Timer(object):
+    __slots__ = ('due', 'expire', 'callback', 'args', 'interval', 'cancelled')
+
+    def __init__(self, due, callback, args, interval=None):
+        self.due = due
+        self.expire = None
+        self.callback = callback
+        self.args = args
+        self.interval = interval
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TimerWheel(object):
+    """
+    hierarchical timing wheel, level 0 has `slots` buckets of `resolution` seconds,
+    every upper level bucket covers a full turn of the level below and cascades down when its turn comes.
+    schedule and cancel are O(1), advance steps bucket by bucket and skips over empty levels.
+    timers never fire before due, fire delay is kept in `jitter` as microseconds.
+    """
+
+    def __init__(self, resolution=0.001, slots=256, levels=4, clock=time.time, jitter_keep=1000):
+        self.resolution = resolution
+        self.slots = slots
+        self.levels = levels
+        self.clock = clock
+        self.spans = [slots ** level for level in range(levels + 1)]
+        self.wheels = [[[] for _ in range(slots)] for _ in range(levels)]
+        self.counts = [0] * levels
+        self.overflow = []
+        self.tick = int(clock() / resolution)  # next tick to process
+        self.jitter = deque(maxlen=jitter_keep)
+        self.fired = 0
+
+    def __len__(self):
+        return sum(self.counts) + len(self.overflow)
+
+    def schedule(self, delay, callback, *args, interval=None):
+        """callback(*args) after delay seconds, then every interval seconds if given"""
+        return self.schedule_at(self.clock() + delay, callback, *args, interval=interval)
+
+    def schedule_at(self, due, callback, *args, interval=None):
+        """callback(*args) at clock time due"""
+        timer = Timer(due, callback, args, interval)
+        self._place(timer)
+        return timer
+
+    def _place(self, timer):
+        if timer.expire is None:
+            timer.expire = max(int(math.ceil(timer.due / self.resolution)), self.tick)
+        delta = timer.expire - self.tick
+        for level in range(self.levels):
+            if delta < self.spans[level + 1]:
+                index = (timer.expire // self.spans[level]) % self.slots
+                self.wheels[level][index].append(timer)
+                self.counts[level] += 1
+                return
+        self.overflow.append(timer)
+
+    def _step(self):
+        """cascade upper levels at their boundary, highest first, then fire level 0 bucket of current tick"""
+        tick = self.tick
+        top = 0
+        while top + 1 < self.levels and not tick % self.spans[top + 1]:
+            top += 1
+        if top + 1 == self.levels and not tick % self.spans[self.levels] and self.overflow:
+            timers, self.overflow = self.overflow, []
+            for timer in timers:
+                self._place(timer)
+        for level in range(top, 0, -1):
+            self._cascade(level, (tick // self.spans[level]) % self.slots)
+
+        index = tick % self.slots
+        bucket = self.wheels[0][index]
+        self.tick += 1
+        if not bucket:
+            return
+        self.wheels[0][index] = []
+        self.counts[0] -= len(bucket)
+        for timer in bucket:
+            self._fire(timer)
+
+    def _cascade(self, level, index):
+        bucket = self.wheels[level][index]
+        if not bucket:
+            return
+        self.wheels[level][index] = []
+        self.counts[level] -= len(bucket)
+        for timer in bucket:
+            if not timer.cancelled:
+                self._place(timer)
+
+    def _fire(self, timer):
+        if timer.cancelled:
+            return
+        self.jitter.append((self.clock() - timer.due) * 1000000)
+        self.fired += 1
+        if timer.interval:
+            timer.due += timer.interval
+            timer.expire = None
+            self._place(timer)
+        timer.callback(*timer.args)
+
+    def advance(self, now=None):
+        """fire every timer due by now"""
+        now = self.clock() if now is None else now
+        target = int(now / self.resolution)
+        while self.tick <= target:
+            level = self._lowest_level()
+            if level is None:
+                self.tick = target + 1
+                break
+            span = self.spans[level]
+            if level and self.tick % span:
+                # nothing below `level`, jump to its next boundary
+                self.tick = min((self.tick // span + 1) * span, target + 1)
+                continue
+            self._step()
+
+    def _lowest_level(self):
+        for level, count in enumerate(self.counts):
+            if count:
+                return level
+        if self.overflow:
+            return self.levels
+        return None
+
+    def next_timeout(self):
+        """seconds until the next tick that has work, None if no timer"""
+        level = self._lowest_level()
+        if level is None:
+            return None
+        if level == 0:
+            for offset in range(self.slots):
+                if self.wheels[0][(self.tick + offset) % self.slots]:
+                    break
+            tick = self.tick + offset
+        elif level == self.levels:
+            span = self.spans[level]
+            tick = self.tick if not self.tick % span else (self.tick // span + 1) * span
+        else:
+            # boundary where the first non empty bucket of level cascades
+            span = self.spans[level]
+            for offset in range(self.slots):
+                if self.wheels[level][(self.tick // span + offset) % self.slots]:
+                    break
+            tick = (self.tick // span + offset) * span
+            if tick < self.tick:
+                tick += self.slots * span
+        return max(tick * self.resolution - self.clock(), 0)
+
+    def jitter_stats(self):
+        """count, p50, p99 and max of recent fire delay in microseconds"""
+        values = sorted(self.jitter)
+        if not values:
+            return {'count': 0}
+        return {'count': len(values),
+                'p50_us': round(values[len(values) // 2], 1),
+                'p99_us': round(values[min(int(len(values) * 0.99), len(values) - 1)], 1),
+                'max_us': round(values[-1], 1)}
@@ -0,0 +1,87 @@
+import json
+import platform
+import time
+from datetime import datetime
+
+from falcon.event import HeartBeatEvent
+
+from backtest.runner import BacktestRunner
+from benchmarks.ticks import generate_ticks
+from redis_queue.codec import CODECS
+
+
+def create_events(instruments=('GBPUSD',), count=100000, seed=0):
+    """synthetic tick events with a heartbeat every 100 ticks, as they are put to redis by a price stream"""
+    runner = BacktestRunner('./tests/test_tick.csv', [], [], [])
+    events = []
+    for i, line in enumerate(generate_ticks(instruments, count=count, seed=seed)):
+        events.append(runner.line_to_event(line))
+        if i % 100 == 99:
+            events.append(HeartBeatEvent(i // 100))
+    return events
+
+
+def benchmark_codec(codec, events):
+    perf_counter = time.perf_counter
+    encode = codec.encode
+    decode = codec.decode
+
+    start = perf_counter()
+    items = [encode(event) for event in events]
+    encode_seconds = perf_counter() - start
+
+    start = perf_counter()
+    for item in items:
+        decode(item)
+    decode_seconds = perf_counter() - start
+
+    count = len(events)
+    size = sum(len(item) for item in items)
+    return {'count': count,
+            'encode_per_sec': round(count / encode_seconds, 1) if encode_seconds else 0,
+            'decode_per_sec': round(count / decode_seconds, 1) if decode_seconds else 0,
+            'encode_us': round(encode_seconds / count * 1e6, 3),
+            'decode_us': round(decode_seconds / count * 1e6, 3),
+            'bytes_per_event': round(size / count, 1)}
+
+
+def run_benchmarks(instruments=('GBPUSD',), count=100000, seed=0, output=None, names=None):
+    """encode and decode the same events by each codec, return report dict and write it to output json"""
+    events = create_events(instruments, count, seed)
+    report = {'time': datetime.utcnow().isoformat(),
+              'python': platform.python_version(),
+              'platform': platform.platform(),
+              'config': {'instruments': list(instruments), 'count': count, 'seed': seed},
+              'results': {}}
+    for name, codec in CODECS.items():
+        if names and name not in names:
+            continue
+        report['results'][name] = benchmark_codec(codec, events)
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == '__main__':
+    """
+    run example:
+    python -m benchmarks.codec --count 100000 --instruments GBPUSD,USDJPY --output codec.json
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--instruments', default='GBPUSD')
+    parser.add_argument('--count', default=100000, type=int)
+    parser.add_argument('--seed', default=0, type=int)
+    parser.add_argument('--only', default=None, help='comma separated codec names')
+    parser.add_argument('--output', default='codec.json')
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.instruments.split(','), args.count, args.seed, args.output,
+                            args.only.split(',') if args.only else None)
+    for name, result in report['results'].items():
+        print(f"{name:10} encode={result['encode_per_sec']:>12}/s  decode={result['decode_per_sec']:>12}/s  "
+              f"size={result['bytes_per_event']}B")
+    print(f'saved to {args.output}')
@@ -0,0 +1,236 @@
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+from falcon.base.order import OrderSide
+
+from backtest.account import BacktestAccount
+from backtest.handler import BacktestTickPriceHandler
+from backtest.runner import BacktestRunner
+from benchmarks.ticks import write_ticks
+
+ORDERS_PER_INSTRUMENT = 10
+
+
+class Benchmark(object):
+    """
+    time each call of one pipeline stage, setup() returns (func, list of args) on fresh state
+    so the timing pass and the tracemalloc passes see the same work.
+    """
+    name = None
+
+    def __init__(self, csv_path):
+        self.csv_path = csv_path
+        with open(csv_path) as f:
+            self.lines = f.readlines()
+
+    def create_runner(self, accounts=None, **kwargs):
+        runner = BacktestRunner(self.csv_path, accounts or [], [], [], **kwargs)
+        runner.verbose = False
+        return runner
+
+    def create_account(self, runner, events):
+        """account holding ORDERS_PER_INSTRUMENT open orders of each instrument, sl/tp far away"""
+        account = BacktestAccount()
+        first_ticks = {}
+        for event in events:
+            first_ticks.setdefault(event.instrument, event)
+        for tick in first_ticks.values():
+            for i in range(ORDERS_PER_INSTRUMENT):
+                side = OrderSide.BUY if i % 2 else OrderSide.SELL
+                account.market_order(tick.instrument, side, 0.1, take_profit=5000, stop_loss=5000,
+                                     trailing_pip=20 if i % 3 == 0 else None, tick=tick)
+        return account
+
+    def parse(self, runner):
+        return [runner.line_to_event(line) for line in self.lines]
+
+    def setup(self):
+        raise NotImplementedError
+
+    def run(self):
+        func, calls = self.setup()
+        perf_counter = time.perf_counter
+        latencies = np.zeros(len(calls), dtype=np.float64)
+        start = perf_counter()
+        for i, args in enumerate(calls):
+            begin = perf_counter()
+            func(*args)
+            latencies[i] = perf_counter() - begin
+        total = perf_counter() - start
+
+        # peak of each call alone, clear_traces resets traced and peak memory, python 3.6 has no reset_peak
+        func, calls = self.setup()
+        tracemalloc.start()
+        clear_traces = tracemalloc.clear_traces
+        get_traced_memory = tracemalloc.get_traced_memory
+        allocated = 0
+        for args in calls:
+            clear_traces()
+            func(*args)
+            allocated += get_traced_memory()[1]
+        tracemalloc.stop()
+
+        func, calls = self.setup()
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        for args in calls:
+            func(*args)
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        stats = after.compare_to(before, 'filename')
+
+        count = len(latencies)
+        return {'count': count,
+                'seconds': round(total, 4),
+                'ticks_per_sec': round(count / total, 1) if total else 0,
+                'p50_us': round(float(np.percentile(latencies, 50)) * 1e6, 3),
+                'p99_us': round(float(np.percentile(latencies, 99)) * 1e6, 3),
+                'max_us': round(float(latencies.max()) * 1e6, 3),
+                # peak memory of each call alone, temporaries included, bytes allocated while processing one tick
+                'allocated_bytes_per_tick': round(allocated / count, 1),
+                # memory blocks and bytes still alive after all calls, e.g. buffers and queued events
+                'retained_blocks_per_tick': round(sum(stat.count_diff for stat in stats) / count, 3),
+                'retained_bytes_per_tick': round(sum(stat.size_diff for stat in stats) / count, 1)}
+
+
+class LineToEventBenchmark(Benchmark):
+    name = 'line_to_event'
+
+    def setup(self):
+        runner = self.create_runner()
+        return runner.line_to_event, [(line,) for line in self.lines]
+
+
+class TickPriceHandlerBenchmark(Benchmark):
+    name = 'tick_price_handler'
+
+    def setup(self):
+        runner = self.create_runner()
+        handler = BacktestTickPriceHandler()
+        return handler.process, [(event, runner) for event in self.parse(runner)]
+
+
+class LoopHandlersBenchmark(Benchmark):
+    name = 'loop_handlers'
+
+    def setup(self):
+        runner = self.create_runner()
+        events = self.parse(runner)
+        runner.accounts.append(self.create_account(runner, events))
+        return runner.loop_handlers, [(event,) for event in events]
+
+
+class UpdateTickBenchmark(Benchmark):
+    name = 'update_tick'
+
+    def setup(self):
+        runner = self.create_runner()
+        events = self.parse(runner)
+        account = self.create_account(runner, events)
+        return account.update_tick, [(event,) for event in events]
+
+
+class RunnerBenchmark(Benchmark):
+    """full BacktestRunner.run, latency is per event taken from queue or csv"""
+    name = 'runner'
+
+    def setup(self):
+        runner = self.create_runner()
+        runner.accounts.append(self.create_account(runner, self.parse(runner)))
+        return runner.run, [()]
+
+    def run(self):
+        result = super(RunnerBenchmark, self).run()
+        # one call of run() processed every line, report per tick instead of per call
+        seconds = result['seconds']
+        count = len(self.lines)
+        result.update({'count': count,
+                       'ticks_per_sec': round(count / seconds, 1) if seconds else 0,
+                       'allocated_bytes_per_tick': round(result['allocated_bytes_per_tick'] / count, 1),
+                       'retained_blocks_per_tick': round(result['retained_blocks_per_tick'] / count, 3),
+                       'retained_bytes_per_tick': round(result['retained_bytes_per_tick'] / count, 1)})
+        result.update(self.event_latency())
+        return result
+
+    def event_latency(self):
+        runner = self.create_runner()
+        runner.accounts.append(self.create_account(runner, self.parse(runner)))
+        latencies = []
+        loop_handlers = runner.loop_handlers
+        perf_counter = time.perf_counter
+
+        def timed_loop_handlers(event):
+            begin = perf_counter()
+            loop_handlers(event)
+            latencies.append(perf_counter() - begin)
+
+        runner.loop_handlers = timed_loop_handlers
+        runner.run()
+        return {'events': len(latencies),
+                'p50_us': round(float(np.percentile(latencies, 50)) * 1e6, 3),
+                'p99_us': round(float(np.percentile(latencies, 99)) * 1e6, 3),
+                'max_us': round(float(max(latencies)) * 1e6, 3)}
+
+
+BENCHMARKS = (LineToEventBenchmark, TickPriceHandlerBenchmark, LoopHandlersBenchmark, UpdateTickBenchmark,
+              RunnerBenchmark)
+
+
+def run_benchmarks(instruments=('GBPUSD',), count=100000, tick_rate=10, volatility=0.5, seed=0,
+                   output=None, names=None):
+    """run each benchmark over the same synthetic ticks, return report dict and write it to output json"""
+    config = {'instruments': list(instruments), 'count': count, 'tick_rate': tick_rate,
+              'volatility': volatility, 'seed': seed}
+    report = {'time': datetime.utcnow().isoformat(),
+              'python': platform.python_version(),
+              'platform': platform.platform(),
+              'config': config,
+              'results': {}}
+
+    fd, csv_path = tempfile.mkstemp(prefix='quicksilver_bench_', suffix='.csv')
+    os.close(fd)
+    try:
+        write_ticks(csv_path, instruments=instruments, count=count, tick_rate=tick_rate,
+                    volatility=volatility, seed=seed)
+        for benchmark_class in BENCHMARKS:
+            if names and benchmark_class.name not in names:
+                continue
+            report['results'][benchmark_class.name] = benchmark_class(csv_path).run()
+    finally:
+        os.remove(csv_path)
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == '__main__':
+    """
+    run example:
+    python -m benchmarks.pipeline --count 100000 --instruments GBPUSD,EURUSD --output benchmark.json
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--instruments', default='GBPUSD')
+    parser.add_argument('--count', default=100000, type=int)
+    parser.add_argument('--tick-rate', default=10, type=float)
+    parser.add_argument('--volatility', default=0.5, type=float)
+    parser.add_argument('--seed', default=0, type=int)
+    parser.add_argument('--only', default=None, help='comma separated benchmark names')
+    parser.add_argument('--output', default='benchmark.json')
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.instruments.split(','), args.count, args.tick_rate, args.volatility, args.seed,
+                            args.output, args.only.split(',') if args.only else None)
+    for name, result in report['results'].items():
+        print(f"{name:20} {result['ticks_per_sec']:>12} ticks/s  p50={result['p50_us']}us  "
+              f"p99={result['p99_us']}us  alloc={result['allocated_bytes_per_tick']}B/tick")
+    print(f'saved to {args.output}')
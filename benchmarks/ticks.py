@@ -0,0 +1,67 @@
+import math
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import numpy as np
+from falcon.base.price import pip
+
+from backtest.store import CSV_TIME_FORMAT
+
+START_PRICES = {'GBPUSD': 1.27, 'EURUSD': 1.13, 'AUDUSD': 0.72, 'NZDUSD': 0.68, 'USDCAD': 1.33,
+                'USDCHF': 0.99, 'USDJPY': 113.0, 'EURJPY': 128.0, 'GBPJPY': 144.0, 'XAUUSD': 1230.0}
+START_TIME = datetime(2018, 12, 3)
+SPREAD_PIPS = 1.5
+
+
+def get_digits(instrument):
+    """price digits of instrument, one more than pip, 5 for GBPUSD and 3 for USDJPY"""
+    return int(round(math.log10(float(pip(instrument, Decimal('1')))))) + 1
+
+
+def generate_ticks(instruments=('GBPUSD',), count=100000, tick_rate=10, volatility=0.5, seed=0, start=START_TIME):
+    """
+    deterministic random walk ticks as csv lines in the format of tests/test_tick.csv,
+    tick_rate is average ticks per second of each instrument, volatility is std of pips moved per tick.
+    same arguments always generate the same ticks.
+    """
+    random = np.random.RandomState(seed)
+    instrument_index = random.randint(0, len(instruments), count)
+    intervals = random.exponential(1000000.0 / (tick_rate * len(instruments)), count)
+    times = np.cumsum(intervals.astype(np.int64))
+    steps = random.normal(0, volatility, count)
+
+    bids = np.zeros(count)
+    asks = np.zeros(count)
+    for i, instrument in enumerate(instruments):
+        mask = instrument_index == i
+        pip_per_price = float(pip(instrument, Decimal('1')))
+        bids[mask] = START_PRICES.get(instrument, 1.0) + np.cumsum(steps[mask]) / pip_per_price
+        asks[mask] = bids[mask] + SPREAD_PIPS / pip_per_price
+
+    names = ['%s/%s' % (instrument[:3], instrument[3:]) for instrument in instruments]
+    digits = [get_digits(instrument) for instrument in instruments]
+    lines = []
+    for index, microseconds, bid, ask in zip(instrument_index, times, bids, asks):
+        time = (start + timedelta(microseconds=int(microseconds))).strftime(CSV_TIME_FORMAT)[:-3]
+        lines.append('%s,%s,%.*f,%.*f\n' % (names[index], time, digits[index], bid, digits[index], ask))
+    return lines
+
+
+def write_ticks(path, **kwargs):
+    """write generate_ticks to csv file, return tick count"""
+    lines = generate_ticks(**kwargs)
+    with open(path, 'w') as f:
+        f.writelines(lines)
+    return len(lines)
+
+
+if __name__ == '__main__':
+    """
+    run example:
+    python -m benchmarks.ticks ./tests/synthetic-tick.csv 1000000 GBPUSD,EURUSD,USDJPY
+    """
+    import sys
+
+    instruments = sys.argv[3].split(',') if len(sys.argv) > 3 else ['GBPUSD']
+    count = write_ticks(sys.argv[1], instruments=instruments, count=int(sys.argv[2]))
+    print(f'{count} ticks of {instruments} saved to {sys.argv[1]}')
@@ -13,6 +13,13 @@ REDIS_DB = env.str('REDIS_DB', default=7)
 LOOP_SLEEP = env.float('LOOP_SLEEP', default=0.1)
 EMPTY_SLEEP = env.float('EMPTY_SLEEP', default=1)
 HEARTBEAT = env.float('HEARTBEAT', default=5)
+BATCH_SIZE = env.int('BATCH_SIZE', default=100)  # events taken from queue per round trip
+FLUSH_INTERVAL = env.float('FLUSH_INTERVAL', default=0.005)  # max seconds a put event is buffered
+STATUS_FLUSH_INTERVAL = env.float('STATUS_FLUSH_INTERVAL', default=0.5)  # 0 to write status at once
+PRICE_CACHE_MAX_AGE = env.float('PRICE_CACHE_MAX_AGE', default=1)  # seconds a cached tick price is read without GET
+RETRY_BASE_DELAY = env.float('RETRY_BASE_DELAY', default=0.5)  # seconds before first retry of a re-put event
+RETRY_MAX_DELAY = env.float('RETRY_MAX_DELAY', default=60)
+EVENT_CODEC = env.str('EVENT_CODEC', default='json')  # json or binary, for events in redis queues
 
 JARVIS_HOST = env.str('JARVIS_HOST', default='localhost')
 JARVIS_PORT = env.int('JARVIS_PORT', default=54321)
@@ -2,7 +2,8 @@ import logging
 from datetime import datetime
 
 from dateutil.relativedelta import relativedelta
-from falcon.base.timeframe import PERIOD_CHOICES, get_candle_time, PERIOD_H1, PERIOD_TICK
+from falcon.base.timeframe import PERIOD_CHOICES, get_candle_time, PERIOD_H1, PERIOD_TICK, PERIOD_M1, PERIOD_M5, \
+    PERIOD_M15, PERIOD_M30, PERIOD_H4, PERIOD_D1, PERIOD_W1
 from falcon.event import DebugEvent, TickPriceEvent, HeartBeatEvent, TimeFrameEvent, TradeOpenEvent, TradeCloseEvent
 
 import config
@@ -12,9 +13,29 @@ from redis_queue import runtime
 
 logger = logging.getLogger(__name__)
 
+TIMEFRAME_DELTA = {PERIOD_M1: relativedelta(minutes=1),
+                   PERIOD_M5: relativedelta(minutes=5),
+                   PERIOD_M15: relativedelta(minutes=15),
+                   PERIOD_M30: relativedelta(minutes=30),
+                   PERIOD_H1: relativedelta(hours=1),
+                   PERIOD_H4: relativedelta(hours=4),
+                   PERIOD_D1: relativedelta(days=1),
+                   PERIOD_W1: relativedelta(weeks=1)}
+
+
+def get_next_candle_time(now, timeframe):
+    """
+    start time of the candle after the one `now` belongs to,
+    unknown timeframes are rechecked every minute, an early boundary only costs a rollover check.
+    """
+    if timeframe in TIMEFRAME_DELTA:
+        return get_candle_time(now, timeframe) + TIMEFRAME_DELTA[timeframe]
+    return get_candle_time(now, PERIOD_M1) + TIMEFRAME_DELTA[PERIOD_M1]
+
 
 class BaseHandler(object):
     subscription = ()
+    blocking = False  # slow io, AsyncRunner runs it in a thread pool executor
 
     def process(self, event, context):
         raise NotImplementedError
@@ -89,9 +110,27 @@ class TimeFramePublisher(BaseHandler):
             now = datetime.utcnow() + relativedelta(hours=self.timezone)
         return now
 
+    def in_candle_window(self, now, context):
+        """True if no candle boundary of any timeframe is crossed since last rollover"""
+        window = context.candle_window
+        return window is not None and window[0] <= now < window[1]
+
+    def update_candle_window(self, now, context):
+        """window between the latest candle start and the nearest next candle start over all timeframes"""
+        starts = [context.candle_time[timeframe] for timeframe in PERIOD_CHOICES]
+        if not all(starts):
+            context.candle_window = None
+            return
+        ends = [get_next_candle_time(now, timeframe) for timeframe in PERIOD_CHOICES]
+        context.candle_window = (max(starts), min(ends))
+
     def process(self, event, context):
         now = self.get_now(event, context)
+        if self.in_candle_window(now, context):
+            return
+        self.rollover(now, context)
 
+    def rollover(self, now, context):
         for timeframe in PERIOD_CHOICES:
             new_candle_time = get_candle_time(now, timeframe)
             if not context.candle_time[timeframe]:
@@ -111,6 +150,8 @@ class TimeFramePublisher(BaseHandler):
                 if timeframe == PERIOD_H1:
                     logger.info(f'TimeFrame H1 , last_tick={context.last_tick_time}')
 
+        self.update_candle_window(now, context)
+
 
 # class PriceAlertHandler(BaseHandler):
 #     subscription = [TickPriceEvent.type, TimeFrameEvent.type, HeartBeatEvent.type]
@@ -189,6 +230,7 @@ class TimeFramePublisher(BaseHandler):
 
 class TelegramHandler(BaseHandler):
     subscription = [TradeOpenEvent.type, TradeCloseEvent.type]
+    blocking = True
 
     def __init__(self):
         self.client = JarvisClient(port=config.JARVIS_PORT, hostname=config.JARVIS_HOST)
@@ -1,3 +1,5 @@
+import json
+
 import click
 
 @click.group()
@@ -10,9 +12,37 @@ def debug():
     click.echo('quicksilver debug')
 
 @quicksilver.command()
-def backtest():
+@click.option('--data', default='./tests/test_tick.csv', help='tick csv or tick store directory')
+@click.option('--strategy', 'strategy_path', default='strategy.hlhb_trend.HLHBTrendStrategy',
+              help='dotted path of strategy class')
+@click.option('--sweep', 'grid_path', default=None, help='json file of parameter grid, {"short_ema": [5, 8]}')
+@click.option('--processes', default=None, type=int, help='worker processes for sweep, default all cores')
+@click.option('--sort', 'sort_by', default='profit', help='result column to rank by')
+@click.option('--top', default=20, type=int, help='print top n results')
+@click.option('--vectorized', is_flag=True, help='whole history vectorized backtest, data must be a tick store')
+@click.option('--blotter', 'blotter_path', default=None, help='directory to stream closed trades and equity curve')
+@click.option('--checkpoint', 'checkpoint_path', default=None, help='file to save backtest state periodically')
+@click.option('--checkpoint-step', default=2000000, type=int, help='ticks between two checkpoints')
+@click.option('--resume', is_flag=True, help='continue from --checkpoint file if it exists')
+def backtest(data, strategy_path, grid_path, processes, sort_by, top, vectorized, blotter_path,
+             checkpoint_path, checkpoint_step, resume):
     '''backtest'''
-    click.echo('quicksilver backtest')
+    from backtest.sweep import import_class, run_backtest, sweep, rank, format_table
+
+    strategy_class = import_class(strategy_path)
+    if grid_path:
+        with open(grid_path) as f:
+            grid = json.load(f)
+        results = sweep(strategy_class, data, grid, processes=processes, sort_by=sort_by, vectorized=vectorized)
+    else:
+        results = rank([run_backtest(strategy_class, data, {}, vectorized, blotter_path,
+                                     checkpoint_path=checkpoint_path, checkpoint_step=checkpoint_step,
+                                     resume=resume)], sort_by)
+    click.echo(format_table(results, top=top))
+
+    if blotter_path and not grid_path and not vectorized:
+        from backtest.analytics import analyze_path
+        click.echo(json.dumps(analyze_path(blotter_path), indent=2))
 
 @quicksilver.command()
 def run():
@@ -0,0 +1,243 @@
+"""event codecs for queues crossing process boundary"""
+import json
+import struct
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from falcon.base.event import BaseEvent
+from falcon.event import TickPriceEvent, TimeFrameEvent, HeartBeatEvent, SignalEvent, OrderHoldingEvent, \
+    StartUpEvent, DebugEvent
+
+EPOCH = datetime(1970, 1, 1)
+ONE_MICROSECOND = timedelta(microseconds=1)
+MAGIC = 0xb1
+
+# field kinds
+STRING = 's'
+TIME = 't'
+PRICE = 'p'
+INT = 'i'
+ANY = 'a'
+
+INT64 = struct.Struct('<q')
+FLOAT64 = struct.Struct('<d')
+PRICE_STRUCT = struct.Struct('<qb')
+LENGTH = struct.Struct('<H')
+HEADER = struct.Struct('<BHB')  # magic, type id, extra field count
+NULL_INT = -2 ** 63
+NULL_LENGTH = 0xffff
+
+
+class JsonCodec(object):
+    """readable text, used by default and for debugging"""
+    binary = False
+
+    def encode(self, event):
+        return json.dumps(event.to_dict())
+
+    def decode(self, data):
+        return BaseEvent.from_dict(json.loads(data))
+
+
+def encode_string(value):
+    if value is None:
+        return LENGTH.pack(NULL_LENGTH)
+    data = value.encode()
+    return LENGTH.pack(len(data)) + data
+
+
+def decode_string(data, offset):
+    length, = LENGTH.unpack_from(data, offset)
+    offset += 2
+    if length == NULL_LENGTH:
+        return None, offset
+    return bytes(data[offset:offset + length]).decode(), offset + length
+
+
+def encode_time(value):
+    if value is None:
+        return INT64.pack(NULL_INT)
+    if value.tzinfo is not None:
+        raise TypeError('timezone aware datetime')
+    return INT64.pack((value - EPOCH) // ONE_MICROSECOND)
+
+
+def decode_time(data, offset):
+    value, = INT64.unpack_from(data, offset)
+    if value == NULL_INT:
+        return None, offset + 8
+    return EPOCH + timedelta(microseconds=value), offset + 8
+
+
+def encode_price(value):
+    """Decimal as int64 mantissa and int8 exponent, 1.27724 -> (127724, -5)"""
+    if value is None:
+        return PRICE_STRUCT.pack(NULL_INT, 0)
+    if not isinstance(value, Decimal):
+        raise TypeError(f'price {value!r} is not Decimal')
+    exponent = value.as_tuple().exponent
+    return PRICE_STRUCT.pack(int(value.scaleb(-exponent)), exponent)
+
+
+def decode_price(data, offset):
+    mantissa, exponent = PRICE_STRUCT.unpack_from(data, offset)
+    if mantissa == NULL_INT:
+        return None, offset + 9
+    return Decimal(mantissa).scaleb(exponent), offset + 9
+
+
+def encode_int(value):
+    return INT64.pack(NULL_INT if value is None else value)
+
+
+def decode_int(data, offset):
+    value, = INT64.unpack_from(data, offset)
+    return (None if value == NULL_INT else value), offset + 8
+
+
+def encode_any(value):
+    """self described value, one tag byte then payload"""
+    if value is None:
+        return b'N'
+    if value is True:
+        return b'T'
+    if value is False:
+        return b'F'
+    if isinstance(value, int) and -2 ** 63 < value < 2 ** 63:
+        return b'i' + INT64.pack(value)
+    if isinstance(value, float):
+        return b'd' + FLOAT64.pack(value)
+    if isinstance(value, str):
+        return b's' + encode_string(value)
+    if isinstance(value, Decimal):
+        return b'D' + encode_price(value)
+    if isinstance(value, datetime):
+        return b't' + encode_time(value)
+    if isinstance(value, (list, dict)):
+        return b'j' + encode_string(json.dumps(value))
+    raise TypeError(f'{type(value)} is not supported')
+
+
+def decode_any(data, offset):
+    tag = data[offset:offset + 1]
+    offset += 1
+    if tag == b'N':
+        return None, offset
+    if tag == b'T':
+        return True, offset
+    if tag == b'F':
+        return False, offset
+    if tag == b'i':
+        return INT64.unpack_from(data, offset)[0], offset + 8
+    if tag == b'd':
+        return FLOAT64.unpack_from(data, offset)[0], offset + 8
+    if tag == b's':
+        return decode_string(data, offset)
+    if tag == b'D':
+        return decode_price(data, offset)
+    if tag == b't':
+        return decode_time(data, offset)
+    if tag == b'j':
+        value, offset = decode_string(data, offset)
+        return json.loads(value), offset
+    raise ValueError(f'unknown tag {tag}')
+
+
+ENCODERS = {STRING: encode_string, TIME: encode_time, PRICE: encode_price, INT: encode_int, ANY: encode_any}
+DECODERS = {STRING: decode_string, TIME: decode_time, PRICE: decode_price, INT: decode_int, ANY: decode_any}
+
+
+class Schema(object):
+    def __init__(self, event_class, type_id, fields):
+        self.event_class = event_class
+        self.type_id = type_id
+        self.fields = tuple(fields)
+        self.names = frozenset(name for name, kind in self.fields)
+        self.encoders = tuple((name, ENCODERS[kind]) for name, kind in self.fields)
+        self.decoders = tuple((name, DECODERS[kind]) for name, kind in self.fields)
+
+
+class BinaryCodec(object):
+    """
+    compact codec by per event type schema, type is a numeric id, prices are fixed point integers
+    and times are epoch microseconds. attributes not in schema are appended as name and tagged value,
+    event types without schema or with unsupported values fall back to json, decode accepts both.
+    """
+    binary = True
+
+    def __init__(self):
+        self.by_type = {}
+        self.by_id = {}
+        self.json = JsonCodec()
+
+    def register(self, event_class, type_id, fields):
+        """fields is list of (attribute, kind), type_id must be the same in every process"""
+        if type_id in self.by_id and self.by_id[type_id].event_class is not event_class:
+            raise ValueError(f'Schema id {type_id} is used by {self.by_id[type_id].event_class.__name__}')
+        schema = Schema(event_class, type_id, fields)
+        self.by_type[event_class.type] = schema
+        self.by_id[type_id] = schema
+        return schema
+
+    def encode(self, event):
+        schema = self.by_type.get(event.type)
+        if schema is None:
+            return self.json.encode(event).encode()
+
+        values = event.__dict__
+        try:
+            parts = [encoder(getattr(event, name, None)) for name, encoder in schema.encoders]
+            extras = [name for name in values if name not in schema.names]
+            for name in extras:
+                parts.append(encode_string(name))
+                parts.append(encode_any(values[name]))
+            header = HEADER.pack(MAGIC, schema.type_id, len(extras))
+        except (TypeError, OverflowError, struct.error):
+            return self.json.encode(event).encode()
+        return header + b''.join(parts)
+
+    def decode(self, data):
+        if isinstance(data, str) or data[0] != MAGIC:
+            return self.json.decode(data)
+
+        magic, type_id, extra_count = HEADER.unpack_from(data, 0)
+        schema = self.by_id[type_id]
+        offset = HEADER.size
+        values = {}
+        for name, decoder in schema.decoders:
+            values[name], offset = decoder(data, offset)
+        for _ in range(extra_count):
+            name, offset = decode_string(data, offset)
+            values[name], offset = decode_any(data, offset)
+
+        event = schema.event_class.__new__(schema.event_class)
+        event.__dict__.update(values)
+        return event
+
+
+def create_binary_codec():
+    codec = BinaryCodec()
+    codec.register(TickPriceEvent, 1, [('instrument', STRING), ('time', TIME), ('bid', PRICE), ('ask', PRICE),
+                                       ('broker', STRING), ('tried', INT)])
+    codec.register(TimeFrameEvent, 2, [('timeframe', ANY), ('current_time', TIME), ('previous', TIME),
+                                       ('timezone', ANY), ('time', TIME), ('tried', INT)])
+    codec.register(HeartBeatEvent, 3, [('time', TIME), ('tried', INT)])
+    codec.register(SignalEvent, 4, [('time', TIME), ('tried', INT)])
+    codec.register(OrderHoldingEvent, 5, [('time', TIME), ('tried', INT)])
+    codec.register(StartUpEvent, 6, [('time', TIME), ('tried', INT)])
+    codec.register(DebugEvent, 7, [('time', TIME), ('tried', INT)])
+    return codec
+
+
+JSON_CODEC = JsonCodec()
+BINARY_CODEC = create_binary_codec()
+CODECS = {'json': JSON_CODEC, 'binary': BINARY_CODEC}
+
+
+def get_codec(codec):
+    """codec instance or its name in CODECS"""
+    if isinstance(codec, str):
+        if codec not in CODECS:
+            raise ValueError(f'Unknown event codec {codec}, choices are {", ".join(CODECS)}')
+        return CODECS[codec]
+    return codec
@@ -1,11 +1,19 @@
-from redis_queue.redis import queue_redis
+import os
+import socket
+import time
+
+from redis.exceptions import ResponseError
+
+from redis_queue.redis import queue_redis, binary_queue_redis
 
 
 class RedisQueue(object):
     """Simple Queue with Redis Backend"""
+    chunk_size = 1000  # max items of one RPUSH
+    lpop_count = True  # LPOP with count needs redis >= 6.2
 
-    def __init__(self, name):
-        self.__db = queue_redis
+    def __init__(self, name, binary=False):
+        self.__db = binary_queue_redis if binary else queue_redis
         self.key = 'queue:%s' % name
 
     def qsize(self):
@@ -21,6 +29,17 @@ class RedisQueue(object):
         if item:
             self.__db.rpush(self.key, item)
 
+    def put_many(self, items):
+        """Put items into the queue by one pipelined round trip."""
+        items = [item for item in items if item]
+        if not items:
+            return 0
+        pipe = self.__db.pipeline(transaction=False)
+        for i in range(0, len(items), self.chunk_size):
+            pipe.rpush(self.key, *items[i:i + self.chunk_size])
+        pipe.execute()
+        return len(items)
+
     def get(self, block=False, timeout=None):
         """Remove and return an item from the queue.
 
@@ -39,3 +58,237 @@ class RedisQueue(object):
     def get_nowait(self):
         """Equivalent to get(False)."""
         return self.get(False)
+
+    def get_many(self, count, block=False, timeout=None):
+        """Remove and return up to count items by one round trip, empty list if the queue is empty.
+
+        If block is true, wait for the first item as get() does."""
+        items = None
+        if self.lpop_count:
+            try:
+                items = self.__db.lpop(self.key, count)
+            except (ResponseError, TypeError):
+                # redis server < 6.2 or redis-py < 4.0 without count of LPOP
+                self.lpop_count = False
+        if not self.lpop_count:
+            pipe = self.__db.pipeline(transaction=True)
+            pipe.lrange(self.key, 0, count - 1)
+            pipe.ltrim(self.key, count, -1)
+            items = pipe.execute()[0]
+
+        if items or not block:
+            return items or []
+        item = self.get(True, timeout)
+        if not item:
+            return []
+        return [item[1]] + (self.get_many(count - 1) if count > 1 else [])
+
+
+class RedisStreamQueue(object):
+    """
+    Queue on a redis stream read by a consumer group, runner replicas on the same stream share the events.
+    items delivered are pending in the group until ack(), pending items of a consumer idle for claim_idle
+    milliseconds, e.g. its runner crashed, are claimed and delivered to another consumer.
+    """
+    field = 'e'
+    max_len = 100000  # approximate MAXLEN of XADD
+    claim_idle = 30000
+    claim_interval = 5  # seconds between claims
+
+    def __init__(self, name, group='runner', consumer=None, binary=False, max_len=None):
+        self.__db = binary_queue_redis if binary else queue_redis
+        self.key = 'stream:%s' % name
+        self.group = group
+        # stable consumer name lets a restarted runner read its own pending items first
+        self.consumer = consumer or '%s-%s' % (socket.gethostname(), os.getpid())
+        self.field_key = self.field.encode() if binary else self.field
+        self.max_len = max_len or self.max_len
+        self.delivered = []
+        self.read_id = '0'  # own pending history first, then new items by '>'
+        self.claim_time = 0
+        self.create_group()
+
+    def create_group(self, start_id='$'):
+        """create group on the stream, new group reads items added after start_id"""
+        try:
+            self.__db.xgroup_create(self.key, self.group, id=start_id, mkstream=True)
+        except ResponseError as ex:
+            if 'BUSYGROUP' not in str(ex):
+                raise
+
+    def replay(self, start_id='0'):
+        """deliver the group again from items after start_id, for warm restart"""
+        self.__db.xgroup_setid(self.key, self.group, start_id)
+
+    def qsize(self):
+        """Return the approximate size of the stream."""
+        return self.__db.xlen(self.key)
+
+    def is_empty(self):
+        return self.qsize() == 0
+
+    def put(self, item):
+        if item:
+            self.__db.xadd(self.key, {self.field: item}, maxlen=self.max_len, approximate=True)
+
+    def put_many(self, items):
+        items = [item for item in items if item]
+        if not items:
+            return 0
+        pipe = self.__db.pipeline(transaction=False)
+        for item in items:
+            pipe.xadd(self.key, {self.field: item}, maxlen=self.max_len, approximate=True)
+        pipe.execute()
+        return len(items)
+
+    def trim(self, max_len=None, min_id=None):
+        """trim stream to max_len items or items from min_id, return count removed"""
+        if min_id:
+            return self.__db.xtrim(self.key, minid=min_id, approximate=False)
+        return self.__db.xtrim(self.key, maxlen=max_len or self.max_len, approximate=False)
+
+    def get(self, block=False, timeout=None):
+        items = self.get_many(1, block, timeout)
+        return items[0] if items else None
+
+    def get_nowait(self):
+        return self.get(False)
+
+    def get_many(self, count, block=False, timeout=None):
+        """up to count items, claimed items of dead consumers first, remember their ids to ack"""
+        entries = []
+        now = time.time()
+        if now - self.claim_time >= self.claim_interval:
+            self.claim_time = now
+            entries = self.claim(count)
+
+        if not entries:
+            if self.read_id == '>' and block:
+                # redis blocks forever by 0
+                block_ms = int(timeout * 1000) if timeout else 0
+            else:
+                block_ms = None
+            response = self.__db.xreadgroup(self.group, self.consumer, {self.key: self.read_id},
+                                            count=count, block=block_ms)
+            entries = response[0][1] if response else []
+            if self.read_id != '>':
+                if not entries:
+                    self.read_id = '>'
+                    return self.get_many(count, block, timeout)
+                self.read_id = entries[-1][0]
+
+        items = []
+        for entry_id, fields in entries:
+            self.delivered.append(entry_id)
+            if fields:
+                # fields of a trimmed pending entry are gone
+                items.append(fields.get(self.field_key))
+        return items
+
+    def claim(self, count):
+        """take over entries pending longer than claim_idle from other consumers"""
+        try:
+            result = self.__db.xautoclaim(self.key, self.group, self.consumer, self.claim_idle, count=count)
+        except ResponseError:
+            return []
+        return result[1] if result else []
+
+    def ack(self):
+        """ack items delivered so far, they will not be delivered again"""
+        if not self.delivered:
+            return 0
+        ids, self.delivered = self.delivered, []
+        return self.__db.xack(self.key, self.group, *ids)
+
+
+# base.lanes.Lanes.drain on redis lists in one round trip
+DRAIN_LANES_SCRIPT = """
+local count = tonumber(ARGV[1])
+local index = tonumber(ARGV[2])
+local credit = tonumber(ARGV[3])
+local lane_count = #KEYS
+local items = {}
+local empty = 0
+while #items < count and empty < lane_count do
+    if credit <= 0 then
+        credit = tonumber(ARGV[3 + index])
+    end
+    local take = math.min(credit, count - #items)
+    local got = redis.call('LRANGE', KEYS[index], 0, take - 1)
+    if #got > 0 then
+        redis.call('LTRIM', KEYS[index], #got, -1)
+        for _, item in ipairs(got) do
+            items[#items + 1] = item
+        end
+        credit = credit - #got
+        empty = 0
+    else
+        empty = empty + 1
+    end
+    if #got < take or credit <= 0 then
+        index = index % lane_count + 1
+        credit = 0
+    end
+end
+table.insert(items, 1, credit)
+table.insert(items, 1, index)
+return items
+"""
+
+
+class RedisLaneQueue(object):
+    """Queue of priority lanes, one redis list per lane of base.lanes.Lanes"""
+
+    def __init__(self, name, lanes, binary=False):
+        self.__db = binary_queue_redis if binary else queue_redis
+        self.lanes = lanes
+        self.keys = ['queue:%s:%s' % (name, lane) for lane in lanes.names]
+        self.drain_script = self.__db.register_script(DRAIN_LANES_SCRIPT)
+
+    def qsize(self):
+        pipe = self.__db.pipeline(transaction=False)
+        for key in self.keys:
+            pipe.llen(key)
+        return sum(pipe.execute())
+
+    def is_empty(self):
+        return self.qsize() == 0
+
+    def put(self, item, lane):
+        if item:
+            self.__db.rpush(self.keys[lane], item)
+
+    def put_many(self, items):
+        """items of (item, lane) by one pipeline"""
+        pipe = self.__db.pipeline(transaction=False)
+        count = 0
+        for item, lane in items:
+            if item:
+                pipe.rpush(self.keys[lane], item)
+                count += 1
+        if count:
+            pipe.execute()
+        return count
+
+    def get(self, block=False, timeout=None):
+        items = self.get_many(1, block, timeout)
+        return items[0] if items else None
+
+    def get_nowait(self):
+        return self.get(False)
+
+    def get_many(self, count, block=False, timeout=None):
+        """up to count items drained by lanes, if block wait on every lane by BLPOP for the first item"""
+        lanes = self.lanes
+        if lanes.weights:
+            args = [count, lanes.index + 1, lanes.credit] + lanes.weights
+        else:
+            args = [count, 1, count] + [count] * len(self.keys)
+        result = self.drain_script(keys=self.keys, args=args)
+        if lanes.weights:
+            lanes.index, lanes.credit = int(result[0]) - 1, int(result[1])
+        items = result[2:]
+        if items or not block:
+            return items
+        item = self.__db.blpop(self.keys, timeout=timeout or 0)
+        return [item[1]] if item else []
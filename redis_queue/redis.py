@@ -7,4 +7,10 @@ queue_redis = redis.StrictRedis(host=config.REDIS_HOST,
                                 db=config.REDIS_DB,
                                 decode_responses=True)
 
+# bytes in and out for binary event codec
+binary_queue_redis = redis.StrictRedis(host=config.REDIS_HOST,
+                                       port=config.REDIS_PORT,
+                                       db=config.REDIS_DB,
+                                       decode_responses=False)
+
 status_redis = queue_redis
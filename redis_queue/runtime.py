@@ -1,53 +1,305 @@
 """status recorder"""
+import atexit
 import json
+import logging
+import threading
+import time
+from collections import deque
 from datetime import datetime
 from decimal import Decimal
 
 from falcon.base.time import str_to_datetime
+
+import config
 from redis_queue.redis import status_redis
 
+logger = logging.getLogger(__name__)
+
 LAST_TICK_TIME_KEY = 'LAST_TICK_TIME'
 OPENING_TRADE_COUNT_KEY = 'OPENING_TRADE_COUNT'
 TICK_PRICE_SUFFIX = '_LIST'
 HEARTBEAT = 'HEARTBEAT'
+TICK_PRICE_CHANNEL = 'TICK_PRICE'
+
+
+class StatusRecorder(object):
+    """
+    write-behind status writes, the latest value of each key is kept in memory and dirty keys are sent
+    by one MSET every flush_interval seconds from a daemon thread, values overwritten before flush are coalesced.
+    reads see values not flushed yet. flush_interval=0 writes at once.
+    keys with a suffix in `publish` are also published to its channel in the same pipeline, as json [key, value].
+    """
+    publish = {TICK_PRICE_SUFFIX: TICK_PRICE_CHANNEL}
+
+    def __init__(self, redis=status_redis, flush_interval=config.STATUS_FLUSH_INTERVAL):
+        self.redis = redis
+        self.flush_interval = flush_interval
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.writes = 0  # set() calls
+        self.coalesced = 0  # writes overwritten before flush
+        self.flushed = 0  # keys sent to redis
+        self.flushes = 0  # MSET round trips
+
+    def set(self, key, value):
+        with self.lock:
+            if key in self.pending:
+                self.coalesced += 1
+            self.pending[key] = value
+            self.writes += 1
+        if self.flush_interval <= 0:
+            self.flush()
+        elif self.thread is None:
+            self.start()
+
+    def get(self, key):
+        with self.lock:
+            if key in self.pending:
+                return self.pending[key]
+        return self.redis.get(key)
+
+    def mget(self, keys):
+        """values of keys, one MGET for keys not pending"""
+        with self.lock:
+            values = [self.pending.get(key) for key in keys]
+        missing = [i for i, value in enumerate(values) if value is None]
+        if missing:
+            for i, value in zip(missing, self.redis.mget([keys[i] for i in missing])):
+                values[i] = value
+        return values
+
+    def get_channel(self, key):
+        for suffix, channel in self.publish.items():
+            if key.endswith(suffix):
+                return channel
+        return None
+
+    def flush(self):
+        """send dirty keys by one MSET, return count of keys sent"""
+        with self.lock:
+            if not self.pending:
+                return 0
+            items, self.pending = self.pending, {}
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.mset(items)
+            for key, value in items.items():
+                channel = self.get_channel(key)
+                if channel:
+                    pipe.publish(channel, json.dumps([key, value]))
+            pipe.execute()
+        except Exception as ex:
+            logger.error(f'[STATUS] flush {len(items)} keys error={ex}')
+            with self.lock:
+                # keep for next flush unless set again meanwhile
+                for key, value in items.items():
+                    self.pending.setdefault(key, value)
+            return 0
+        with self.lock:
+            self.flushed += len(items)
+            self.flushes += 1
+        return len(items)
+
+    def start(self):
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, name='status-recorder', daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while not self.stopped.wait(self.flush_interval):
+            self.flush()
+
+    def stop(self):
+        """stop the flush thread and flush what is left"""
+        self.stopped.set()
+        thread, self.thread = self.thread, None
+        if thread and thread is not threading.current_thread():
+            thread.join()
+        self.flush()
+
+    def stats(self):
+        return {'writes': self.writes,
+                'coalesced': self.coalesced,
+                'flushed': self.flushed,
+                'flushes': self.flushes,
+                'pending': len(self.pending)}
+
+
+def decode_tick_price(data):
+    price = json.loads(data)
+    if 'ask' in price:
+        price['ask'] = Decimal(str(price['ask']))
+    if 'bid' in price:
+        price['bid'] = Decimal(str(price['bid']))
+    if 'time' in price:
+        price['time'] = str_to_datetime(price['time'], format='%Y-%m-%d %H:%M:%S:%f')
+    return price
 
 
+class PriceCache(object):
+    """
+    decoded tick price of each key read through recorder, kept fresh by the prices StatusRecorder publishes.
+    a daemon thread subscribes the channel, prices are only cached while subscribed so a dropped subscription
+    never serves old prices. writers not publishing, e.g. a plain SET, are seen by a GET once the cached price
+    is max_age seconds old. staleness is seconds since the cached price was updated when it is read.
+    """
+    staleness_keep = 1000
+    reconnect_sleep = 1
+
+    def __init__(self, recorder, redis=status_redis, channel=TICK_PRICE_CHANNEL, max_age=config.PRICE_CACHE_MAX_AGE):
+        self.recorder = recorder
+        self.redis = redis
+        self.channel = channel
+        self.max_age = max_age
+        self.prices = {}  # key to [raw data, decoded price or None, update time]
+        self.subscribed = False
+        self.thread = None
+        self.hits = 0
+        self.misses = 0
+        self.updates = 0
+        self.staleness = deque(maxlen=self.staleness_keep)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name='price-cache', daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self.channel)
+                self.subscribed = True
+                for message in pubsub.listen():
+                    self.handle_message(message)
+            except Exception as ex:
+                logger.error(f'[PRICE_CACHE] subscription error={ex}')
+            finally:
+                self.subscribed = False
+                self.prices = {}
+                pubsub.close()
+            time.sleep(self.reconnect_sleep)
+
+    def handle_message(self, message):
+        if message.get('type') == 'message':
+            key, data = json.loads(message['data'])
+            self.update(key, data)
+
+    def update(self, key, data):
+        """new raw price of key, decoded when it is read"""
+        self.prices[key] = [data, None, time.time()]
+        self.updates += 1
+
+    def read(self, entry):
+        if entry[1] is None:
+            entry[1] = decode_tick_price(entry[0])
+        self.hits += 1
+        self.staleness.append(time.time() - entry[2])
+        return entry[1]
+
+    def lookup(self, key, now):
+        """cached entry of key not older than max_age"""
+        entry = self.prices.get(key)
+        if entry and now - entry[2] < self.max_age:
+            return entry
+        return None
+
+    def store(self, key, data, read_time):
+        """price read from redis at read_time, kept unless a newer one was published meanwhile"""
+        self.misses += 1
+        if not data:
+            return None
+        entry = [data, None, read_time]
+        if self.subscribed:
+            cached = self.prices.get(key)
+            if cached and cached[2] > read_time:
+                entry = cached
+            else:
+                self.prices[key] = entry
+        entry[1] = entry[1] or decode_tick_price(entry[0])
+        return entry[1]
+
+    def get(self, key):
+        if self.thread is None:
+            self.start()
+        now = time.time()
+        entry = self.lookup(key, now)
+        if entry:
+            return self.read(entry)
+        return self.store(key, self.recorder.get(key), now)
+
+    def get_many(self, keys):
+        """prices of keys, one MGET for keys not cached"""
+        if self.thread is None:
+            self.start()
+        now = time.time()
+        prices = {}
+        missing = []
+        for key in keys:
+            entry = self.lookup(key, now)
+            if entry:
+                prices[key] = self.read(entry)
+            else:
+                missing.append(key)
+        if missing:
+            for key, data in zip(missing, self.recorder.mget(missing)):
+                prices[key] = self.store(key, data, now)
+        return prices
+
+    def stats(self):
+        staleness = sorted(self.staleness)
+        total = self.hits + self.misses
+        result = {'hits': self.hits,
+                  'misses': self.misses,
+                  'updates': self.updates,
+                  'hit_rate': round(self.hits / total, 4) if total else 0,
+                  'subscribed': self.subscribed}
+        if staleness:
+            result.update({'staleness_p50_ms': round(staleness[len(staleness) // 2] * 1000, 3),
+                           'staleness_max_ms': round(staleness[-1] * 1000, 3)})
+        return result
+
+
+recorder = StatusRecorder()
+atexit.register(recorder.stop)
+price_cache = PriceCache(recorder)
 
 
 def set_last_tick(dt):
     if isinstance(dt, datetime):
         dt = dt.strftime('%Y-%m-%d %H:%M:%S:%f')
-    status_redis.set(LAST_TICK_TIME_KEY, dt)
+    recorder.set(LAST_TICK_TIME_KEY, dt)
 
 
 def get_last_tick():
-    return status_redis.get(LAST_TICK_TIME_KEY)
+    return recorder.get(LAST_TICK_TIME_KEY)
 
 
 def get_tick_price(instrument):
-    key = instrument.upper() + TICK_PRICE_SUFFIX
-    data = status_redis.get(key)
-    if data:
-        price = json.loads(data)
-        if 'ask' in price:
-            price['ask'] = Decimal(str(price['ask']))
-        if 'bid' in price:
-            price['bid'] = Decimal(str(price['bid']))
-        if 'time' in price:
-            price['time'] = str_to_datetime(price['time'], format='%Y-%m-%d %H:%M:%S:%f')
-        return price
-    return None
+    """decoded price dict of instrument, a copy of the cached one so callers may modify it"""
+    price = price_cache.get(instrument.upper() + TICK_PRICE_SUFFIX)
+    return dict(price) if price else price
+
+
+def get_tick_prices(instruments):
+    """{instrument: price dict or None}"""
+    keys = [instrument.upper() + TICK_PRICE_SUFFIX for instrument in instruments]
+    prices = price_cache.get_many(keys)
+    return dict((instrument, dict(prices[key]) if prices[key] else None) for instrument, key in zip(instruments, keys))
 
 
 def set_tick_price(instrument, data):
     key = instrument.upper() + TICK_PRICE_SUFFIX
     if not isinstance(data, str):
         data = json.dumps(data)
-    status_redis.set(key, data)
+    recorder.set(key, data)
+    if price_cache.subscribed:
+        price_cache.update(key, data)
 
 
 def set_order_count(count):
-    status_redis.set(OPENING_TRADE_COUNT_KEY, count)
+    recorder.set(OPENING_TRADE_COUNT_KEY, count)
 
 def set_heartbeat():
-    status_redis.set(HEARTBEAT, datetime.now().strftime('%Y-%m-%d %H:%M:%S:%f'))
+    recorder.set(HEARTBEAT, datetime.now().strftime('%Y-%m-%d %H:%M:%S:%f'))
@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import threading
+from collections import deque
+
+import config
+from redis_queue.queue import RedisQueue
+from runner.base import BaseRunner
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncRunner(BaseRunner):
+    """
+    asyncio runner, the loop awaits new events instead of sleep polling.
+    handler.process may be a coroutine function, it is scheduled as a task so slow io does not hold the next event,
+    plain handlers with `blocking = True` are run in the default thread pool executor,
+    events they put from the pool thread are handed to the loop by call_soon_threadsafe.
+    timers (heartbeat, timeframe boundaries) are advanced by an independent task. events are queued as objects in a deque woken by an asyncio.Event.
+    """
+    max_timer_sleep = 0.05
+
+    def __init__(self, queue_name, accounts, strategies, handlers, *args, **kwargs):
+        self.loop = None
+        self.loop_thread = None
+        self.wakeup = None
+        self.tasks = set()
+        super(AsyncRunner, self).__init__(queue_name, accounts, strategies, handlers, *args, **kwargs)
+
+    def create_queue(self, queue_name):
+        return deque()
+
+    def off_loop(self):
+        """True when called by a thread other than the running loop, e.g. a blocking handler in executor"""
+        return self.loop_thread is not None and threading.get_ident() != self.loop_thread
+
+    def put_event(self, event):
+        if self.off_loop():
+            self.put_event_threadsafe(event)
+            return
+        self.queue.append(event)
+        if self.wakeup:
+            self.wakeup.set()
+
+    def put_event_threadsafe(self, event):
+        """put event from a thread outside the loop, e.g. a price stream"""
+        self.loop.call_soon_threadsafe(self.put_event, event)
+
+    async def get_event(self):
+        """next event, wait until one is put"""
+        while not self.queue:
+            self.wakeup.clear()
+            await self.wakeup.wait()
+            if not self.running:
+                return None
+        return self.queue.popleft()
+
+    def yield_event(self, block=False):
+        return self.queue.popleft() if self.queue else None
+
+    def get_routes(self, event_type):
+        routes = self.routes.get(event_type)
+        if routes is None:
+            routes = super(AsyncRunner, self).get_routes(event_type)
+            routes = self.routes[event_type] = tuple(
+                (process, is_handler, getattr(getattr(process, '__self__', None), 'blocking', False))
+                for process, is_handler in routes)
+        return routes
+
+    def dispatch(self, event):
+        """call routed process, coroutines and blocking handlers are left running, their re-put is async too"""
+        routes = self.routes.get(event.type)
+        if routes is None:
+            routes = self.get_routes(event.type)
+
+        re_put = False
+        for process, is_handler, blocking in routes:
+            try:
+                if blocking:
+                    self.spawn(self.loop.run_in_executor(None, process, event, self), event, is_handler)
+                    continue
+                result = process(event, self)
+                if asyncio.iscoroutine(result):
+                    self.spawn(result, event, is_handler)
+                elif result and is_handler:
+                    re_put = True
+            except Exception as ex:
+                self.process_error(ex, event)
+        return re_put
+
+    def spawn(self, awaitable, event, is_handler):
+        task = asyncio.ensure_future(awaitable)
+        self.tasks.add(task)
+        task.add_done_callback(lambda x: self.task_done(x, event, is_handler))
+        return task
+
+    def task_done(self, task, event, is_handler):
+        self.tasks.discard(task)
+        if task.cancelled():
+            return
+        ex = task.exception()
+        if ex:
+            self.process_error(ex, event)
+        elif task.result() and is_handler:
+            self.retry_event(event)
+
+    async def timer_loop(self):
+        while self.running:
+            timeout = self.timers.next_timeout()
+            await asyncio.sleep(self.max_timer_sleep if timeout is None else min(timeout, self.max_timer_sleep))
+            self.timers.advance()
+
+    async def start(self):
+        """called inside the loop before the first event"""
+        self.loop = asyncio.get_event_loop()
+        self.loop_thread = threading.get_ident()
+        self.wakeup = asyncio.Event()
+        if self.queue:
+            self.wakeup.set()
+
+    async def close(self):
+        """wait for handler tasks still running"""
+        if self.tasks:
+            await asyncio.wait(list(self.tasks))
+
+    async def run_async(self):
+        self.launch()
+        await self.start()
+        timer = asyncio.ensure_future(self.timer_loop()) if self.use_timer else None
+
+        try:
+            while self.running:
+                for _ in range(self.batch_size):
+                    event = await self.get_event()
+                    if not event:
+                        break
+                    self.loop_handlers(event)
+                    if not self.queue:
+                        break
+                # give handler tasks and timers a turn between batches
+                await asyncio.sleep(0)
+        finally:
+            if timer:
+                timer.cancel()
+            await self.close()
+
+    def run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(self.run_async())
+        finally:
+            self.loop_thread = None
+            loop.close()
+
+    def stop(self):
+        self.running = False
+        if self.wakeup:
+            self.wakeup.set()
+
+
+class AsyncRedisRunner(AsyncRunner):
+    """
+    async runner on the redis list of RedisQueue, events are read by BLPOP on an asyncio redis client
+    and written back by a flush task so put_event never blocks the loop.
+    """
+    block_timeout = 1
+
+    def __init__(self, queue_name, accounts, strategies, handlers, *args, **kwargs):
+        self.redis = None
+        self.outbox = []
+        self.flush_task = None
+        super(AsyncRedisRunner, self).__init__(queue_name, accounts, strategies, handlers, *args, **kwargs)
+
+    def create_queue(self, queue_name):
+        return RedisQueue(queue_name, binary=self.codec.binary)
+
+    def put_event(self, event):
+        data = self.encode_event(event)
+        if self.redis is None:
+            # loop not started yet
+            self.queue.put(data)
+            return
+        if self.off_loop():
+            self.loop.call_soon_threadsafe(self.outbox_put, data)
+            return
+        self.outbox_put(data)
+
+    def outbox_put(self, data):
+        self.outbox.append(data)
+        if self.flush_task is None or self.flush_task.done():
+            self.flush_task = asyncio.ensure_future(self.flush())
+
+    async def flush(self):
+        while self.outbox:
+            items, self.outbox = self.outbox, []
+            try:
+                await self.redis.rpush(self.queue.key, *items)
+            except Exception as ex:
+                logger.error('queue put error=%s' % ex)
+
+    async def get_event(self):
+        while self.running:
+            try:
+                item = await self.redis.blpop(self.queue.key, timeout=self.block_timeout)
+            except Exception as ex:
+                logger.error('queue get error=%s' % ex)
+                await asyncio.sleep(self.block_timeout)
+                continue
+            if item:
+                return self.decode_event(item[1])
+        return None
+
+    def yield_event(self, block=False):
+        data = self.queue.get(block)
+        return self.decode_event(data) if data else None
+
+    async def start(self):
+        from redis import asyncio as aioredis
+
+        await super(AsyncRedisRunner, self).start()
+        self.redis = aioredis.StrictRedis(host=config.REDIS_HOST,
+                                          port=config.REDIS_PORT,
+                                          db=config.REDIS_DB,
+                                          decode_responses=not self.codec.binary)
+
+    async def close(self):
+        await super(AsyncRedisRunner, self).close()
+        await self.flush()
+        close = getattr(self.redis, 'aclose', None) or self.redis.close
+        await close()
+        self.redis = None
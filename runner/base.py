@@ -1,40 +1,59 @@
-import json
 import logging
 import sys
 import time
 import traceback
 from collections import Iterable
 
-from falcon.base.event import BaseEvent
 from falcon.base.timeframe import PERIOD_TICK, PERIOD_CHOICES
 from falcon.event import HeartBeatEvent
 
 import config
+from base.lanes import Lanes
 from base.strategy import StrategyBase
-from handler import BaseHandler, TimeFramePublisher
+from base.timer import TimerWheel
+from handler import BaseHandler, TimeFramePublisher, get_next_candle_time
+from redis_queue.codec import get_codec
+from runner.retry import RetryQueue, RetryPolicy
 
 logger = logging.getLogger(__name__)
 
 
 class BaseRunner(object):
     candle_time = {}
+    candle_window = None
     running = False
     halt = False
     heartbeat_count = 0
     handlers = [TimeFramePublisher()]
+    routes = None
+    use_timer = True  # heartbeat and timeframe events by wall clock timers
+    codec = None  # name in redis_queue.codec.CODECS or codec instance, default config.EVENT_CODEC
+    lanes = None  # base.lanes.Lanes to queue events by priority lanes
+    conflate = False  # keep only the newest queued tick of each instrument
+    merge_range = False  # conflated tick has high and low of bids it replaced
 
     def __init__(self, queue_name, accounts, strategies, handlers, *args, **kwargs):
         self.loop_sleep = config.LOOP_SLEEP
         self.empty_sleep = config.EMPTY_SLEEP
         self.heartbeat = config.HEARTBEAT
+        self.batch_size = kwargs.get('batch_size', config.BATCH_SIZE)
         self.last_heartbeat = time.time()
+        self.timers = TimerWheel()
+        self.codec = get_codec(kwargs.get('codec') or self.codec or config.EVENT_CODEC)
+        self.lanes = self.create_lanes(kwargs.get('lanes', self.lanes), kwargs.get('lane_weights'))
+        self.conflate = kwargs.get('conflate', self.conflate)
+        self.merge_range = kwargs.get('merge_range', self.merge_range)
 
         self.accounts = accounts if isinstance(accounts, Iterable) else [accounts]
         self.strategies = strategies if isinstance(strategies, Iterable) else [strategies]
         self.queue_name = queue_name
         self.queue = self.create_queue(queue_name)
+        self.retry_queue = self.create_retry_queue(kwargs.get('retry_policies'))
+        self.handlers = list(self.handlers)
         self.register(handlers)
 
+        self.candle_window = None
+        self.candle_time = {}
         self.candle_time[PERIOD_TICK] = None
         for timeframe in PERIOD_CHOICES:
             self.candle_time[timeframe] = None
@@ -51,11 +70,46 @@ class BaseRunner(object):
     def create_queue(self, queue_name):
         raise NotImplementedError
 
+    def create_retry_queue(self, policies=None):
+        """policies is {event type: runner.retry.RetryPolicy}"""
+        if not self.use_timer:
+            # no timer to wait backoff, e.g. backtest, retry at once
+            return RetryQueue(self, default=RetryPolicy(base_delay=0))
+        return RetryQueue(self, policies)
+
+    def create_lanes(self, lanes, weights=None):
+        """lanes=True for default lanes, a dict for event type to lane mapping, or a Lanes"""
+        if not lanes or isinstance(lanes, Lanes):
+            return lanes or None
+        return Lanes(lanes if isinstance(lanes, dict) else None, weights)
+
     def register(self, handlers):
         """register handlers"""
         for handler in handlers:
             if isinstance(handler, BaseHandler):
                 self.handlers.append(handler)
+        self.build_routes()
+
+    def build_routes(self):
+        """
+        precompute event type to (process, is_handler) tuples, strategies first then handlers in order,
+        call it again after strategies, handlers or their subscription changed.
+        """
+        self.routes = {}
+        for handler in list(self.strategies) + self.handlers:
+            for event_type in handler.subscription:
+                if event_type != '*' and event_type not in self.routes:
+                    self.get_routes(event_type)
+
+    def get_routes(self, event_type):
+        routes = self.routes.get(event_type)
+        if routes is None:
+            routes = [(strategy.process, False) for strategy in self.strategies
+                      if event_type in strategy.subscription]
+            routes += [(handler.process, True) for handler in self.handlers
+                       if '*' in handler.subscription or event_type in handler.subscription]
+            routes = self.routes[event_type] = tuple(routes)
+        return routes
 
     def launch(self):
         """before actcul run event bus"""
@@ -63,73 +117,149 @@ class BaseRunner(object):
         logger.info('Registered handler: %s' % ', '.join([x.__class__.__name__ for x in self.handlers]))
         self.running = True
         self.halt = False
+        if self.use_timer:
+            self.start_timers()
+
+    def start_timers(self):
+        """
+        heartbeat every self.heartbeat seconds, a rollover at each candle boundary of strategy timeframes
+        and whatever the retry queue polls by.
+        """
+        if self.heartbeat > 0:
+            self.timers.schedule(self.heartbeat, self.fire_heartbeat, interval=self.heartbeat)
+        self.retry_queue.start()
+        for timeframe in self.get_timeframes():
+            if timeframe != PERIOD_TICK:
+                self.schedule_timeframe(timeframe)
+
+    def fire_heartbeat(self):
+        self.heartbeat_count += 1
+        self.put_event(HeartBeatEvent(self.heartbeat_count))
+        self.last_heartbeat = time.time()
+
+    def schedule_timeframe(self, timeframe):
+        publishers = self.get_handler_by_type(TimeFramePublisher)
+        if not publishers:
+            return None
+        now = publishers[0].get_now(None, self)
+        delay = (get_next_candle_time(now, timeframe) - now).total_seconds()
+        return self.timers.schedule(delay, self.fire_timeframe, timeframe)
+
+    def fire_timeframe(self, timeframe):
+        """candle boundary of timeframe is reached, publish TimeFrameEvent without waiting for tick or heartbeat"""
+        for publisher in self.get_handler_by_type(TimeFramePublisher):
+            publisher.rollover(publisher.get_now(None, self), self)
+        self.schedule_timeframe(timeframe)
+
+    def sleep(self, seconds):
+        """sleep no longer than the next timer"""
+        if self.use_timer:
+            timeout = self.timers.next_timeout()
+            if timeout is not None:
+                seconds = min(seconds, timeout)
+        if seconds > 0:
+            time.sleep(seconds)
 
     def loop_start(self):
-        pass
+        if self.use_timer:
+            self.timers.advance()
 
     def loop_end(self):
-        # heartbeat event
-        if self.heartbeat > 0 and time.time() - self.last_heartbeat > self.heartbeat:
-            self.heartbeat_count += 1
-            self.put_event(HeartBeatEvent(self.heartbeat_count))
-            self.last_heartbeat = time.time()
+        pass
 
     def yield_event(self, block=False):
         try:
             data = self.queue.get(block)
             if data:
-                data = json.loads(data)
-                return BaseEvent.from_dict(data)
+                return self.decode_event(data)
             else:
                 return None
         except Exception as ex:
             logger.error('queue get error=%s' % ex)
         return None
 
+    def yield_events(self, count, block=False):
+        """up to count events already queued, queues with a batch get override it to save round trips"""
+        events = []
+        while len(events) < count:
+            event = self.yield_event(block and not events)
+            if not event:
+                break
+            events.append(event)
+        return events
+
     def put_event(self, event):
         try:
-            data = json.dumps(event.to_dict())
-            self.queue.put(data)
+            data = self.encode_event(event)
+            if self.lanes:
+                self.queue.put(data, self.lanes.get_lane(event.type))
+            else:
+                self.queue.put(data)
         except Exception as ex:
             logger.error('queue put error=%s' % ex)
 
+    def encode_event(self, event):
+        """event to queue item for queues shared by processes"""
+        return self.codec.encode(event)
+
+    def decode_event(self, data):
+        return self.codec.decode(data)
+
     def handle_error(self, ex):
         pass
 
     def loop_handlers(self, event):
         """loop handlers to process event"""
+        if self.dispatch(event):
+            self.retry_event(event)
+
+    def dispatch(self, event):
+        """call routed strategies and handlers, return True if any handler asks to re-put event"""
+        routes = self.routes.get(event.type)
+        if routes is None:
+            routes = self.get_routes(event.type)
+
         re_put = False
-        for strategy in self.strategies:
-            # loop strategies
-            if event.type in strategy.subscription:
-                self.handle_event(strategy, event)
-
-        for handler in self.handlers:
-            if '*' in handler.subscription:
-                result = self.handle_event(handler, event)
-                re_put = result or re_put
-                continue
-            elif event.type in handler.subscription:
-                result = self.handle_event(handler, event)
-                re_put = result or re_put
-        if re_put:
-            if event.tried > 10:
-                logger.error('[EVENT_RETRY] tried to many times abort, event=%s' % event)
-            else:
-                event.tried += 1
-                self.put_event(event)
+        index, count = 0, len(routes)
+        while index < count:
+            try:
+                # one try block for all routes, re-entered after the one raised
+                while index < count:
+                    process, is_handler = routes[index]
+                    index += 1
+                    if process(event, self) and is_handler:
+                        re_put = True
+            except Exception as ex:
+                self.process_error(ex, event)
+        return re_put
+
+    def retry_event(self, event):
+        """put event again after backoff of its type"""
+        return self.retry_queue.retry(event)
+
+    def handle_batch(self, events):
+        for event in events:
+            self.loop_handlers(event)
+            self.event_end()
+
+    def event_end(self):
+        if self.use_timer:
+            self.timers.advance()
 
     def handle_event(self, handler, event):
         """process event by single handler"""
         try:
             return handler.process(event, self)
         except Exception as ex:
-            logger.error('[EVENT_PROCESS] %s, event=%s' % (ex, event.__dict__))
-            # print trace stack
-            extracted_list = traceback.extract_tb(ex.__traceback__)
-            for item in traceback.StackSummary.from_list(extracted_list).format()[:8]:
-                logger.error(item.strip())
-            self.handle_error(ex)
+            self.process_error(ex, event)
+
+    def process_error(self, ex, event):
+        logger.error('[EVENT_PROCESS] %s, event=%s' % (ex, event.__dict__))
+        # print trace stack
+        extracted_list = traceback.extract_tb(ex.__traceback__)
+        for item in traceback.StackSummary.from_list(extracted_list).format()[:8]:
+            logger.error(item.strip())
+        self.handle_error(ex)
 
     def get_handler_by_type(self, handler_class):
         return [x for x in self.handlers if isinstance(x, handler_class)]
@@ -148,11 +278,11 @@ class BaseRunner(object):
             self.loop_start()
 
             while not self.halt:
-                event = self.yield_event()
-                if not event:
-                    time.sleep(self.empty_sleep)
+                events = self.yield_events(self.batch_size)
+                if not events:
+                    self.sleep(self.empty_sleep)
                     break
-                self.loop_handlers(event)
+                self.handle_batch(events)
 
             self.loop_end()
-            time.sleep(self.loop_sleep)
+            self.sleep(self.loop_sleep)
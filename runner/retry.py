@@ -0,0 +1,161 @@
+import logging
+import random
+import time
+import uuid
+from collections import deque, defaultdict
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class RetryPolicy(object):
+    """exponential backoff, delay of nth retry is base_delay * factor ** (n - 1) up to max_delay, less up to jitter"""
+
+    def __init__(self, base_delay=config.RETRY_BASE_DELAY, factor=2, max_delay=config.RETRY_MAX_DELAY, jitter=0.2,
+                 max_tries=10):
+        self.base_delay = base_delay
+        self.factor = factor
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.max_tries = max_tries
+
+    def get_delay(self, tried):
+        delay = min(self.base_delay * self.factor ** (tried - 1), self.max_delay)
+        return delay * (1 - random.uniform(0, self.jitter)) if delay > 0 else 0
+
+
+class RetryQueue(object):
+    """
+    events re-put by handlers wait their backoff on the runner timer wheel instead of going straight back
+    to the queue, so a failing handler does not spin the loop. policies is {event type: RetryPolicy}.
+    an event is retried at most max_tries times, then it goes to dead_letters.
+    """
+    dead_letter_keep = 1000
+
+    def __init__(self, runner, policies=None, default=None):
+        self.runner = runner
+        self.policies = policies or {}
+        self.default = default or RetryPolicy()
+        self.dead_letters = deque(maxlen=self.dead_letter_keep)
+        self.waiting = 0
+        self.retried = 0
+        self.dead = 0
+        self.retried_types = defaultdict(int)
+        self.dead_types = defaultdict(int)
+
+    def get_policy(self, event_type):
+        return self.policies.get(event_type, self.default)
+
+    def start(self):
+        pass
+
+    def retry(self, event):
+        """put event again after its backoff, return False if it is dead"""
+        policy = self.get_policy(event.type)
+        if event.tried >= policy.max_tries:
+            self.dead_letter(event)
+            return False
+
+        event.tried += 1
+        self.retried += 1
+        self.retried_types[event.type] += 1
+        delay = policy.get_delay(event.tried)
+        if delay > 0:
+            self.schedule(event, delay)
+        else:
+            self.runner.put_event(event)
+        return True
+
+    def schedule(self, event, delay):
+        self.waiting += 1
+        self.runner.timers.schedule(delay, self.put, event)
+
+    def put(self, event):
+        self.waiting -= 1
+        self.runner.put_event(event)
+
+    def dead_letter(self, event):
+        logger.error('[EVENT_RETRY] tried to many times abort, event=%s' % event)
+        self.dead += 1
+        self.dead_types[event.type] += 1
+        self.dead_letters.append(event)
+
+    def stats(self):
+        return {'retried': self.retried,
+                'waiting': self.waiting,
+                'dead': self.dead,
+                'retried_types': dict(self.retried_types),
+                'dead_types': dict(self.dead_types)}
+
+
+# pop members of sorted set due by ARGV[1], at most ARGV[2]
+POP_DUE_SCRIPT = """
+local items = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+if #items > 0 then
+    redis.call('ZREM', KEYS[1], unpack(items))
+end
+return items
+"""
+
+
+class RedisRetryQueue(RetryQueue):
+    """
+    retries kept in redis sorted set `retry:<queue_name>` scored by due time, so they survive a restart
+    and are shared by runners of the queue. due events are polled every poll_interval seconds by the timer wheel,
+    dead events are pushed to list `dead:<queue_name>`.
+    """
+    poll_interval = 0.1
+    poll_count = 100
+
+    def __init__(self, runner, db, queue_name, policies=None, default=None):
+        super(RedisRetryQueue, self).__init__(runner, policies, default)
+        self.db = db
+        self.key = 'retry:%s' % queue_name
+        self.dead_key = 'dead:%s' % queue_name
+        self.pop_due = db.register_script(POP_DUE_SCRIPT)
+
+    def start(self):
+        self.runner.timers.schedule(self.poll_interval, self.poll, interval=self.poll_interval)
+
+    def schedule(self, event, delay):
+        data = self.runner.encode_event(event)
+        # unique member, the same event may be waiting twice
+        prefix = uuid.uuid4().hex + '|'
+        member = (prefix.encode() if isinstance(data, bytes) else prefix) + data
+        self.db.zadd(self.key, {member: time.time() + delay})
+        self.waiting += 1
+
+    def poll(self):
+        """put events due, return count"""
+        try:
+            members = self.pop_due(keys=[self.key], args=[time.time(), self.poll_count])
+        except Exception as ex:
+            logger.error('retry poll error=%s' % ex)
+            return 0
+        for member in members:
+            data = member.split(b'|' if isinstance(member, bytes) else '|', 1)[1]
+            self.put(self.runner.decode_event(data))
+        return len(members)
+
+    def put(self, event):
+        self.waiting = max(self.waiting - 1, 0)
+        self.runner.put_event(event)
+
+    def dead_letter(self, event):
+        super(RedisRetryQueue, self).dead_letter(event)
+        try:
+            pipe = self.db.pipeline(transaction=False)
+            pipe.rpush(self.dead_key, self.runner.encode_event(event))
+            pipe.ltrim(self.dead_key, -self.dead_letter_keep, -1)
+            pipe.execute()
+        except Exception as ex:
+            logger.error('dead letter put error=%s' % ex)
+
+    def stats(self):
+        result = super(RedisRetryQueue, self).stats()
+        try:
+            result['waiting'] = self.db.zcard(self.key)
+        except Exception:
+            pass
+        return result
@@ -1,24 +1,179 @@
 import logging
-from queue import Queue
-
-from redis_queue.queue import RedisQueue
+import time
+from collections import deque
+from queue import Queue, Empty
+
+import config
+from base.conflate import ConflatingQueue
+from base.lanes import LaneQueue
+from redis_queue.queue import RedisQueue, RedisStreamQueue, RedisLaneQueue
+from redis_queue.redis import queue_redis, binary_queue_redis
 from runner.base import BaseRunner
+from runner.retry import RedisRetryQueue
+from runner.shard import ShardRouter, shard_pairs
 
 logger = logging.getLogger(__name__)
 
 
 class MemoryQueueRunner(BaseRunner):
-    """Memory queue runner"""
+    """
+    Memory queue runner, events never leave the process so they are queued as objects without serialization.
+    the queue is an unbounded deque unless threaded=True is given for producers on other threads,
+    a deque per priority lane with lanes=True, or a ConflatingQueue with conflate=True.
+    maxsize bounds the queue by Queue(maxsize), put blocks when it is full, threaded defaults to 2000.
+    """
+    threaded = False
+    plain = True
+    maxsize = None
+
+    def __init__(self, queue_name, accounts, strategies, handlers, *args, **kwargs):
+        self.threaded = kwargs.get('threaded', self.threaded)
+        self.maxsize = kwargs.get('maxsize', 2000 if self.threaded else self.maxsize)
+        if kwargs.get('lanes') and (self.threaded or self.maxsize or kwargs.get('conflate')):
+            raise ValueError('Priority lanes queue can not be threaded, bounded or conflated.')
+        super(MemoryQueueRunner, self).__init__(queue_name, accounts, strategies, handlers, *args, **kwargs)
+        self.plain = not (self.threaded or self.maxsize or self.lanes or self.conflate)
 
     def create_queue(self, queue_name):
-        return Queue(maxsize=2000)
+        if self.conflate:
+            # thread safe and bounded by instrument count, no maxsize to block the feed
+            return ConflatingQueue(self.merge_range)
+        if self.threaded or self.maxsize:
+            return Queue(maxsize=self.maxsize or 0)
+        if self.lanes:
+            return LaneQueue(self.lanes)
+        return deque()
+
+    def yield_event(self, block=False):
+        if self.plain:
+            return self.queue.popleft() if self.queue else None
+        if self.lanes or self.conflate:
+            return self.queue.get(block)
+        try:
+            return self.queue.get(block)
+        except Empty:
+            return None
+
+    def yield_events(self, count, block=False):
+        if self.lanes or self.conflate:
+            return self.queue.get_many(count, block)
+        return super(MemoryQueueRunner, self).yield_events(count, block)
+
+    def put_event(self, event):
+        if self.plain:
+            self.queue.append(event)
+        else:
+            self.queue.put(event)
 
 
 class ReisQueueRunner(BaseRunner):
-    """Redis queue runner"""
+    """
+    Redis queue runner, events are taken batch_size at a time by one round trip.
+    events put while a batch is handled are buffered and sent by one pipeline when the batch is done,
+    batch_size events are buffered or the oldest is buffered for flush_interval seconds.
+    events put outside of a batch, e.g. by a price stream, are sent at once.
+    with conflate=True ticks of one batch are conflated, only the newest of each instrument is handled,
+    conflator age of ticks counts from their event time so it includes the wait in redis.
+    """
+
+    def __init__(self, queue_name, accounts, strategies, handlers, *args, **kwargs):
+        self.outbox = []
+        self.outbox_time = 0
+        self.buffering = False
+        super(ReisQueueRunner, self).__init__(queue_name, accounts, strategies, handlers, *args, **kwargs)
+        self.flush_interval = kwargs.get('flush_interval', config.FLUSH_INTERVAL)
+        self.conflator = ConflatingQueue(self.merge_range, event_time=True) if self.conflate else None
+
+    def create_queue(self, queue_name):
+        if self.lanes:
+            return RedisLaneQueue(queue_name, self.lanes, binary=self.codec.binary)
+        return RedisQueue(queue_name, binary=self.codec.binary)
+
+    def create_retry_queue(self, policies=None):
+        db = binary_queue_redis if self.codec.binary else queue_redis
+        return RedisRetryQueue(self, db, self.queue_name, policies)
+
+    def yield_events(self, count, block=False):
+        try:
+            items = self.queue.get_many(count, block)
+        except Exception as ex:
+            logger.error('queue get error=%s' % ex)
+            return []
+        events = []
+        for data in items:
+            try:
+                events.append(self.decode_event(data))
+            except Exception as ex:
+                # skip the bad item only, the rest of the batch is still handled
+                logger.error('queue decode error=%s, data=%r' % (ex, data))
+        if self.conflator and events:
+            for event in events:
+                self.conflator.put(event)
+            return self.conflator.get_many(len(events))
+        return events
+
+    def put_event(self, event):
+        if not self.buffering:
+            super(ReisQueueRunner, self).put_event(event)
+            return
+        try:
+            data = self.encode_event(event)
+        except Exception as ex:
+            logger.error('queue put error=%s' % ex)
+            return
+        if not self.outbox:
+            self.outbox_time = time.time()
+        self.outbox.append((data, self.lanes.get_lane(event.type)) if self.lanes else data)
+        if len(self.outbox) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """send buffered events by one pipeline"""
+        if not self.outbox:
+            return
+        items, self.outbox = self.outbox, []
+        try:
+            self.queue.put_many(items)
+        except Exception as ex:
+            logger.error('queue put error=%s' % ex)
+
+    def handle_batch(self, events):
+        self.buffering = True
+        try:
+            super(ReisQueueRunner, self).handle_batch(events)
+        finally:
+            self.buffering = False
+            self.flush()
+
+    def event_end(self):
+        super(ReisQueueRunner, self).event_end()
+        if self.outbox and time.time() - self.outbox_time >= self.flush_interval:
+            self.flush()
+
+
+class StreamQueueRunner(ReisQueueRunner):
+    """
+    Redis stream runner, replicas with the same queue_name and group share the events of one stream.
+    events of a batch are acked after they are handled, so events of a crashed replica are redelivered.
+    give a stable consumer name to read its own pending events after restart, start_id to replay from.
+    priority lanes are not supported, the stream keeps one order.
+    """
+
+    def __init__(self, queue_name, accounts, strategies, handlers, *args, **kwargs):
+        if kwargs.get('lanes'):
+            raise ValueError('Priority lanes are not supported by stream queue.')
+        self.group = kwargs.get('group', 'runner')
+        self.consumer = kwargs.get('consumer')
+        super(StreamQueueRunner, self).__init__(queue_name, accounts, strategies, handlers, *args, **kwargs)
+        if kwargs.get('start_id'):
+            self.queue.replay(kwargs['start_id'])
 
     def create_queue(self, queue_name):
-        return RedisQueue(queue_name)
+        return RedisStreamQueue(queue_name, self.group, self.consumer, binary=self.codec.binary)
+
+    def handle_batch(self, events):
+        super(StreamQueueRunner, self).handle_batch(events)
+        self.queue.ack()
 
 
 class TestRedisRunner(ReisQueueRunner):
@@ -34,14 +189,27 @@ class TestRedisRunner(ReisQueueRunner):
 
 
 class StreamRunnerBase(ReisQueueRunner):
+    """
+    price stream runner, with `shards=n` events are put to the shard queues of runner.shard.ShardSupervisor
+    workers instead of being handled in this process.
+    """
     broker = ''
     account = None
+    router = None
 
     def __init__(self, queue_name, accounts, strategies, handlers, *args, **kwargs):
-        super(StreamRunnerBase, self).__init__(queue_name, accounts, strategies, handlers)
+        super(StreamRunnerBase, self).__init__(queue_name, accounts, strategies, handlers, **kwargs)
 
         self.pairs = kwargs.get('pairs')
         self.prices = self._set_up_prices_dict()
+        if kwargs.get('shards'):
+            self.router = ShardRouter(queue_name, shard_pairs(self.pairs, kwargs['shards']), codec=self.codec)
+
+    def put_event(self, event):
+        if self.router:
+            self.router.put_event(event)
+        else:
+            super(StreamRunnerBase, self).put_event(event)
 
     def _set_up_prices_dict(self):
         prices_dict = dict(
@@ -0,0 +1,158 @@
+import logging
+import multiprocessing
+import time
+
+from falcon.event import OrderHoldingEvent, HeartBeatEvent, StartUpEvent, DebugEvent
+
+from redis_queue.codec import JSON_CODEC
+from redis_queue.queue import RedisQueue
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_TYPES = (OrderHoldingEvent.type, HeartBeatEvent.type, StartUpEvent.type, DebugEvent.type)
+
+
+def shard_pairs(pairs, shards):
+    """['EURUSD', 'GBPUSD', 'USDJPY'], 2 to [['EURUSD', 'USDJPY'], ['GBPUSD']]"""
+    shards = max(min(shards, len(pairs)), 1)
+    return [list(pairs[i::shards]) for i in range(shards)]
+
+
+def shard_queue_name(queue_name, index):
+    return f'{queue_name}:{index}'
+
+
+class ShardRouter(object):
+    """
+    put events to the shard queue owning event.instrument,
+    account level events and events of unknown instrument are broadcast to every shard.
+    """
+
+    def __init__(self, queue_name, shards, broadcast_types=BROADCAST_TYPES, queue_class=RedisQueue, codec=JSON_CODEC):
+        self.shards = shards
+        self.codec = codec
+        queue_kwargs = {'binary': True} if codec.binary else {}
+        self.queues = [queue_class(shard_queue_name(queue_name, i), **queue_kwargs) for i in range(len(self.shards))]
+        self.broadcast_types = set(broadcast_types)
+        self.owners = {}
+        for index, shard in enumerate(self.shards):
+            for pair in shard:
+                self.owners[pair] = index
+
+    def get_shard(self, event):
+        """shard index of event, None to broadcast"""
+        if event.type in self.broadcast_types:
+            return None
+        return self.owners.get(getattr(event, 'instrument', None))
+
+    def put_event(self, event):
+        data = self.codec.encode(event)
+        index = self.get_shard(event)
+        if index is None:
+            for queue in self.queues:
+                queue.put(data)
+        else:
+            self.queues[index].put(data)
+
+
+def run_shard(create_runner, queue_name, pairs, index, health):
+    """worker process entry, runner only evaluates pairs of its shard and reports alive by its timer"""
+    runner = create_runner(queue_name, pairs)
+    for strategy in runner.strategies:
+        strategy.pairs = [pair for pair in strategy.pairs if pair in pairs]
+
+    def report():
+        health[index] = time.time()
+
+    report()
+    runner.timers.schedule(ShardSupervisor.report_interval, report, interval=ShardSupervisor.report_interval)
+    runner.run()
+
+
+class ShardSupervisor(object):
+    """
+    run one runner process per shard of pairs, each on queue `<queue_name>:<index>` fed by ShardRouter.
+    create_runner(queue_name, pairs) builds the runner inside the worker, it must be picklable, e.g. a module function.
+    dead workers and workers silent for stale_timeout seconds are restarted.
+    """
+    report_interval = 1
+    stale_timeout = 30
+    check_interval = 1
+    max_restarts = 10  # per worker in restart_window seconds
+    restart_window = 600
+
+    def __init__(self, create_runner, queue_name, pairs, shards=None):
+        self.create_runner = create_runner
+        self.queue_name = queue_name
+        self.shards = shard_pairs(pairs, shards or multiprocessing.cpu_count())
+        self.health = multiprocessing.Array('d', len(self.shards), lock=False)
+        self.workers = [None] * len(self.shards)
+        self.restarts = [[] for _ in self.shards]
+        self.failed = set()
+        self.running = False
+
+    def get_router(self, **kwargs):
+        """router for the price stream to feed the shard queues"""
+        return ShardRouter(self.queue_name, self.shards, **kwargs)
+
+    def start_worker(self, index):
+        self.health[index] = time.time()
+        worker = multiprocessing.Process(target=run_shard,
+                                         args=(self.create_runner, shard_queue_name(self.queue_name, index),
+                                               self.shards[index], index, self.health),
+                                         name=f'shard-{index}',
+                                         daemon=True)
+        worker.start()
+        self.workers[index] = worker
+        logger.info(f'[SHARD] worker {index} pid={worker.pid} pairs={self.shards[index]}')
+        return worker
+
+    def start(self):
+        self.running = True
+        for index in range(len(self.shards)):
+            self.start_worker(index)
+
+    def check(self):
+        """restart dead or stale workers, return indexes restarted"""
+        restarted = []
+        now = time.time()
+        for index, worker in enumerate(self.workers):
+            if index in self.failed or worker.is_alive() and now - self.health[index] < self.stale_timeout:
+                continue
+
+            if worker.is_alive():
+                logger.error(f'[SHARD] worker {index} no report for {now - self.health[index]:.1f}s, restart')
+                worker.terminate()
+                worker.join(self.check_interval)
+            else:
+                logger.error(f'[SHARD] worker {index} exit code={worker.exitcode}, restart')
+
+            history = [t for t in self.restarts[index] if now - t < self.restart_window]
+            if len(history) >= self.max_restarts:
+                logger.error(f'[SHARD] worker {index} restarted {len(history)} times, give up')
+                self.failed.add(index)
+                continue
+            self.restarts[index] = history + [now]
+            self.start_worker(index)
+            restarted.append(index)
+        return restarted
+
+    def stop(self):
+        self.running = False
+        for worker in self.workers:
+            if worker and worker.is_alive():
+                worker.terminate()
+        for worker in self.workers:
+            if worker:
+                worker.join()
+
+    def run(self):
+        self.start()
+        try:
+            while self.running:
+                time.sleep(self.check_interval)
+                self.check()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
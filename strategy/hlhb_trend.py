@@ -1,18 +1,24 @@
 import logging
 
+import numpy as np
 import talib as ta
 from falcon.event import SignalEvent,  TimeFrameEvent, OrderHoldingEvent, StartUpEvent
 from falcon.base.order import OrderSide, SignalAction
 from falcon.base.timeframe import PERIOD_H1
 
 
-from base.helper import check_cross
+from base.helper import check_cross, cross_array
+from base.indicator import ADX, EMA, RSI
 from base.strategy import StrategyBase
 
 
 logger = logging.getLogger(__name__)
 
 
+def mean_price(candle):
+    return (candle['high_ask'] + candle['low_bid']) / 2
+
+
 class HLHBTrendStrategy(StrategyBase):
     """
     Basically, I’m catching trends whenever the 5 EMA crosses above or below the 10 EMA.
@@ -45,27 +51,67 @@ class HLHBTrendStrategy(StrategyBase):
     stop_loss = 30
     trailing_stop = 40
 
-    def signal_pair(self, symbol):
-        short_ema = self.params.get('short_ema')
-        long_ema = self.params.get('long_ema')
-        adx_period = self.params.get('adx')
-        rsi = self.params.get('rsi')
+    def create_indicators(self, symbol, timeframe):
+        return {'adx': ADX(self.params.get('adx'), high='high_ask', low='low_bid', close='close_bid'),
+                'ema_short': EMA(self.params.get('short_ema'), source='close_bid'),
+                'ema_long': EMA(self.params.get('long_ema'), source='close_bid'),
+                'rsi': RSI(self.params.get('rsi'), source=mean_price)}
+
+    def signal_pair(self, symbol, event, context):
+        now = None
+        if getattr(context, 'ohlc', None) is not None:
+            # streaming indicators on local candles, check trading hours by tick time
+            now = context.last_tick_time
+            indicators = self.get_indicators(symbol, PERIOD_H1, context)
+            if len(indicators['ema_long']) < 2:
+                return
+            result = indicators['adx'], indicators['ema_short'], indicators['ema_long'], indicators['rsi']
+        else:
+            result = self.fetch_indicators(symbol)
+
+        self.apply_pair(symbol, result, event, context, now)
+
+    def apply_pair(self, symbol, result, event, context, now=None):
+        adx, ema_short, ema_long, rsi = result
+        if self.can_open(now):
+            self.open(symbol, ema_short, ema_long, adx, rsi, context)
+        self.close(symbol, ema_short, ema_long, adx, rsi)
+
+    def fetch_indicators(self, symbol):
+        return self.evaluate_pair(self.params, symbol, self.fetch_pair(symbol, None, None))
 
-        candles = self.data_reader.get_candle(symbol, PERIOD_H1, count=50, fromTime=None, toTime=None,
-                                              price_type='M', smooth=False)
+    def fetch_pair(self, symbol, event, context):
+        return self.data_reader.get_candle(symbol, PERIOD_H1, count=50, fromTime=None, toTime=None,
+                                           price_type='M', smooth=False)
 
-        adx = ta.ADX(candles['askhigh'], candles['bidlow'], candles['bidclose'], timeperiod=adx_period)
-        ema_short = ta.EMA(candles['bidclose'], timeperiod=short_ema)
-        ema_long = ta.EMA(candles['bidclose'], timeperiod=long_ema)
+    @classmethod
+    def evaluate_pair(cls, params, symbol, candles):
+        adx = ta.ADX(candles['askhigh'], candles['bidlow'], candles['bidclose'], timeperiod=params.get('adx'))
+        ema_short = ta.EMA(candles['bidclose'], timeperiod=params.get('short_ema'))
+        ema_long = ta.EMA(candles['bidclose'], timeperiod=params.get('long_ema'))
         mean = (candles['askhigh'] + candles['bidlow']) / 2
-        rsi = ta.RSI(mean, timeperiod=rsi)
+        rsi = ta.RSI(mean, timeperiod=params.get('rsi'))
         # upper, middle, lower = ta.BBANDS(h1_candles['close'], matype=MA_Type.T3)
-
-        if self.can_open():
-            self.open(symbol, ema_short, ema_long, adx, rsi)
-        self.close(symbol, ema_short, ema_long, adx, rsi)
-
-    def open(self, symbol, ema_short, ema_long, adx, rsi):
+        return adx, ema_short, ema_long, rsi
+
+    def vectorized_signal(self, symbol, candles):
+        adx = ta.ADX(candles['high_ask'], candles['low_bid'], candles['close_bid'], timeperiod=self.params.get('adx'))
+        ema_short = ta.EMA(candles['close_bid'], timeperiod=self.params.get('short_ema'))
+        ema_long = ta.EMA(candles['close_bid'], timeperiod=self.params.get('long_ema'))
+        rsi = ta.RSI((candles['high_ask'] + candles['low_bid']) / 2, timeperiod=self.params.get('rsi'))
+
+        # signal is checked at the open of next H1 candle, 1970-01-01 is Thursday
+        now = candles['time'] + np.timedelta64(1, 'h')
+        hours = now.astype('datetime64[h]').astype(np.int64) % 24
+        weekdays = (now.astype('datetime64[D]').astype(np.int64) + 3) % 7
+        tradable = (adx > 25) & np.isin(hours, self.hours) & np.isin(weekdays, self.weekdays)
+
+        side = cross_array(ema_short, ema_long)
+        buy = tradable & (side == 1) & (rsi > 50) & (rsi < 70)
+        sell = tradable & (side == -1) & (rsi > 30) & (rsi < 50)
+        return {'entry': np.where(buy, 1, np.where(sell, -1, 0))}
+
+    def open(self, symbol, ema_short, ema_long, adx, rsi, context):
         if adx[-1] <= 25:
             return
 
@@ -78,12 +124,12 @@ class HLHBTrendStrategy(StrategyBase):
             event = SignalEvent(SignalAction.OPEN, self.name, self.version, self.magic_number,
                                 symbol, side, trailing_stop=self.trailing_stop,
                                 take_profit=self.take_profit, stop_loss=self.stop_loss)
-            self.send_event(event)
+            self.send_event(event, context)
         elif side == OrderSide.SELL and 50 > rsi[-1] > 30:
             event = SignalEvent(SignalAction.OPEN, self.name, self.version, self.magic_number,
                                 symbol, side, trailing_stop=self.trailing_stop,
                                 take_profit=self.take_profit, stop_loss=self.stop_loss)
-            self.send_event(event)
+            self.send_event(event, context)
         if event:
             logger.info('[ORDER_%s] %s@%s %s, param=%0.5f, %0.5f, %0.2f, %0.2f' % (
                 event.action, event.strategy, event.instrument, event.to_dict(), ema_short[-1],
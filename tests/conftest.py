@@ -2,3 +2,16 @@ import os
 import sys
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+
+@pytest.fixture(scope='session')
+def redis_server():
+    """tests on a local redis-server >= 6.2, skipped if it is not running"""
+    from redis_queue.redis import queue_redis
+    try:
+        queue_redis.ping()
+    except Exception:
+        pytest.skip('redis-server is not running')
+    return queue_redis
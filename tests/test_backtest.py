@@ -9,6 +9,7 @@ from falcon.event import TickPriceEvent
 from backtest.account import BacktestAccount
 from backtest.order import BacktestOrder
 from backtest.runner import BacktestRunner
+from backtest.store import convert_csv
 
 
 def test_order():
@@ -25,6 +26,7 @@ def test_order():
 
     order.close_price = Decimal('1.32552')
     assert order.is_closed
+    assert order.pips == Decimal('10.2')
 
 
 def test_account():
@@ -92,6 +94,60 @@ def test_account():
     assert order.profit == -33
 
 
+def test_order_trigger():
+    account = BacktestAccount()
+
+    def tick(seconds, bid, ask):
+        return TickPriceEvent(broker='Back test broker', instrument='EURUSD',
+                              time=datetime(2019, 3, 4) + timedelta(seconds=seconds),
+                              bid=Decimal(bid), ask=Decimal(ask))
+
+    tick1 = tick(0, '1.1332', '1.1333')
+    buy = account.market_order('EURUSD', OrderSide.BUY, 0.1, take_profit=10, stop_loss=10, tick=tick1)
+    sell = account.market_order('EURUSD', OrderSide.SELL, 0.1, take_profit=10, stop_loss=10, tick=tick1)
+    trailing = account.market_order('EURUSD', OrderSide.BUY, 0.1, take_profit=50, stop_loss=50, trailing_pip=5,
+                                    tick=tick1)
+    assert len(account.list_open_order('EURUSD')) == 3
+
+    account.update_tick(tick(1, '1.1340', '1.1341'))
+    assert not buy.is_closed
+    assert trailing.trailing_stop == Decimal('1.1335')
+
+    # buy take profit and sell stop loss are crossed
+    account.update_tick(tick(2, '1.1343', '1.1344'))
+    assert buy.is_closed and buy.note == 'take_profit'
+    assert buy.close_price == Decimal('1.1343')
+    assert sell.is_closed and sell.note == 'stop_loss'
+    assert sell.close_price == Decimal('1.1344')
+    assert account.list_open_order('EURUSD') == [trailing]
+
+    # trailing stop follows price then fires
+    account.update_tick(tick(3, '1.1350', '1.1351'))
+    assert trailing.trailing_stop == Decimal('1.1345')
+    account.update_tick(tick(4, '1.1347', '1.1348'))
+    assert not trailing.is_closed
+    account.update_tick(tick(5, '1.1345', '1.1346'))
+    assert trailing.is_closed and trailing.note == 'trailing_stop'
+    assert account.list_open_order('EURUSD') == []
+    assert len(account.list_order()) == 3
+
+    # closing again keeps the first close
+    account.close_order(trailing.order_id, tick=tick(6, '1.1300', '1.1301'))
+    assert trailing.close_price == Decimal('1.1345') and trailing.close_time == datetime(2019, 3, 4, 0, 0, 5)
+
+    # sell trailing stop follows ask down only
+    short = account.market_order('EURUSD', OrderSide.SELL, 0.1, take_profit=50, stop_loss=50, trailing_pip=5,
+                                 tick=tick(7, '1.1340', '1.1341'))
+    account.update_tick(tick(8, '1.1340', '1.1341'))
+    assert short.trailing_stop == Decimal('1.1346')
+    account.update_tick(tick(9, '1.1345', '1.1344'))
+    assert short.trailing_stop == Decimal('1.1346')
+    account.update_tick(tick(10, '1.1330', '1.1331'))
+    assert short.trailing_stop == Decimal('1.1336')
+    account.update_tick(tick(11, '1.1335', '1.1336'))
+    assert short.is_closed and short.note == 'trailing_stop'
+
+
 def test_runner():
     test_time_format = '%Y%m%d %H:%M:%S.%f'
     account = BacktestAccount()
@@ -118,8 +174,90 @@ def test_runner():
     assert order.max_profit > 0
     assert order.min_profit < 0
 
-    assert len(runner.ohlc[PERIOD_M1]) == 3
-    assert len(runner.ohlc[PERIOD_M30]) == 1
-    assert len(runner.ohlc[PERIOD_H4]) == 1
-    assert len(runner.ohlc[PERIOD_H1]) == 1
-    assert len(runner.ohlc[PERIOD_D1]) == 1
+    assert len(runner.ohlc['GBPUSD', PERIOD_M1]) == 3
+    assert len(runner.ohlc['GBPUSD', PERIOD_M30]) == 1
+    assert len(runner.ohlc['GBPUSD', PERIOD_H4]) == 1
+    assert len(runner.ohlc['GBPUSD', PERIOD_H1]) == 1
+    assert len(runner.ohlc['GBPUSD', PERIOD_D1]) == 1
+
+
+def test_tick_store(tmp_path):
+    test_time_format = '%Y%m%d %H:%M:%S.%f'
+    store_path = str(tmp_path / 'test_tick')
+    store = convert_csv('./tests/test_tick.csv', store_path)
+    assert len(store) == 49
+    assert store.instruments == ['GBPUSD']
+
+    event = store.get_event(0)
+    assert event.instrument == 'GBPUSD'
+    assert event.time.strftime(test_time_format) == '20181203 04:41:31.577000'
+    assert event.bid == Decimal('1.27724')
+    assert event.ask == Decimal('1.27732')
+
+    runner = BacktestRunner(store_path, [], [], [])
+    with open('./tests/test_tick.csv') as f:
+        for line, event in zip(f, store.iter_events()):
+            expected = runner.line_to_event(line)
+            assert event.instrument == expected.instrument
+            assert event.time == expected.time
+            assert event.bid == expected.bid
+            assert event.ask == expected.ask
+
+    runner.run()
+    assert runner.line_count == 49
+
+
+def test_order_book():
+    test_time_format = '%Y%m%d %H:%M:%S.%f'
+    runner = BacktestRunner('./tests/test_tick.csv', [], [], [])
+    with open('./tests/test_tick.csv') as f:
+        ticks = [runner.line_to_event(line) for line in f]
+
+    accounts = [BacktestAccount(), BacktestAccount()]
+    accounts[1].use_order_book = True
+    for account in accounts:
+        for i, tick in enumerate(ticks):
+            if i % 5 == 0:
+                side = OrderSide.BUY if i % 10 else OrderSide.SELL
+                account.market_order('GBPUSD', side, 0.1, take_profit=2, stop_loss=2, tick=tick)
+            account.update_tick(tick)
+
+    for order, book_order in zip(accounts[0].list_order().values(), accounts[1].list_order().values()):
+        assert book_order.book is None or book_order.book is accounts[1]._order_books['GBPUSD']
+        for field in ('current_price', 'current_time', 'max_profit', 'min_profit', 'profit_time', 'close_price',
+                      'close_time', 'note', 'pips', 'profit'):
+            assert getattr(order, field) == getattr(book_order, field)
+
+    closed = [x for x in accounts[1].list_order().values() if x.is_closed]
+    assert closed and len(closed) < len(accounts[1].list_order())
+    assert str_to_datetime('20181203 04:43:32.577', test_time_format) in \
+           [x.current_time for x in accounts[1].list_order().values()]
+
+
+def test_checkpoint(tmp_path):
+    checkpoint_path = str(tmp_path / 'backtest.checkpoint')
+    store_path = str(tmp_path / 'test_tick')
+    convert_csv('./tests/test_tick.csv', store_path)
+
+    for data_path in ('./tests/test_tick.csv', store_path):
+        results = []
+        for resume in (False, True):
+            account = BacktestAccount()
+            runner = BacktestRunner(data_path, [account], [], [], checkpoint_path=checkpoint_path,
+                                    checkpoint_step=20, resume=resume)
+            if not resume:
+                with open('./tests/test_tick.csv') as f:
+                    tick = runner.line_to_event(f.readline())
+                account.market_order('GBPUSD', OrderSide.BUY, 0.1, take_profit=33, stop_loss=22, trailing_pip=20,
+                                     tick=tick)
+            else:
+                # the last checkpoint was taken before tick 41
+                assert runner.line_count == 40
+            runner.run()
+
+            order = account.get_order('1')
+            candles = runner.ohlc['GBPUSD', PERIOD_M1]
+            results.append((runner.line_count, order.current_price, order.max_profit, order.min_profit,
+                            order.profit_time, list(candles['close_bid']), runner.last_tick_time))
+
+        assert results[0] == results[1]
@@ -0,0 +1,32 @@
+import json
+
+from backtest.runner import BacktestRunner
+from benchmarks.pipeline import run_benchmarks
+from benchmarks.ticks import generate_ticks
+
+
+def test_generate_ticks():
+    ticks = generate_ticks(('GBPUSD', 'USDJPY'), count=500, seed=1)
+    assert ticks == generate_ticks(('GBPUSD', 'USDJPY'), count=500, seed=1)
+    assert ticks != generate_ticks(('GBPUSD', 'USDJPY'), count=500, seed=2)
+
+    runner = BacktestRunner('./tests/test_tick.csv', [], [], [])
+    events = [runner.line_to_event(line) for line in ticks]
+    assert set(event.instrument for event in events) == {'GBPUSD', 'USDJPY'}
+    assert all(a.time <= b.time for a, b in zip(events, events[1:]))
+    assert all(event.ask > event.bid for event in events)
+
+
+def test_run_benchmarks(tmp_path):
+    output = str(tmp_path / 'benchmark.json')
+    report = run_benchmarks(count=200, output=output, names=['line_to_event', 'update_tick'])
+    with open(output) as f:
+        assert json.load(f) == report
+
+    assert set(report['results']) == {'line_to_event', 'update_tick'}
+    for result in report['results'].values():
+        assert result['count'] == 200
+        assert result['ticks_per_sec'] > 0
+        assert result['p99_us'] >= result['p50_us']
+    # each line builds a TickPriceEvent and its Decimals
+    assert report['results']['line_to_event']['allocated_bytes_per_tick'] > 0
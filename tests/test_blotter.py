@@ -0,0 +1,91 @@
+import numpy as np
+from falcon.base.order import OrderSide
+
+from backtest.account import BacktestAccount
+from backtest.analytics import analyze_path, max_drawdown, profit_factor, sharpe_ratio
+from backtest.blotter import ChunkWriter, EQUITY_FIELDS, EQUITY_PREFIX, load_trades, load_equity
+from backtest.runner import BacktestRunner
+
+
+def test_analytics():
+    assert max_drawdown([0, 10, 5, 20, 8, 12]) == 12
+    assert max_drawdown([-5, -10, 0]) == 10
+    assert profit_factor([10, -5, 20, -10]) == 2
+    assert profit_factor([10]) == float('inf')
+    assert sharpe_ratio([0.01, 0.01]) == 0
+    assert sharpe_ratio([0.01, 0.02, 0.03]) > 0
+
+
+def test_blotter(tmp_path):
+    blotter_path = str(tmp_path / 'blotter')
+    account = BacktestAccount()
+    runner = BacktestRunner('./tests/test_tick.csv', [account], [], [], blotter_path=blotter_path)
+    runner.equity_sample_step = 10
+    runner.blotter.trades.chunk_size = 2
+
+    with open('./tests/test_tick.csv') as f:
+        tick = runner.line_to_event(f.readline())
+    for i in range(5):
+        side = OrderSide.BUY if i < 3 else OrderSide.SELL
+        account.market_order('GBPUSD', side, 0.1, take_profit=50, stop_loss=max(i - 2, 1), tick=tick)
+    account.market_order('GBPUSD', OrderSide.BUY, 0.1, take_profit=50, stop_loss=50, tick=tick)
+    runner.run()
+
+    open_orders = account.list_open_order()
+    assert list(account.list_order().values()) == open_orders
+    trades = load_trades(blotter_path)
+    assert len(open_orders) == 1
+    assert len(trades['order_id']) == 5
+    assert runner.blotter.trades.chunk_count == 3
+    assert set(trades['note']) == {'stop_loss'}
+    assert np.all(trades['close_time'] >= trades['open_time'])
+
+    equity = load_equity(blotter_path)
+    assert len(equity['time']) == 5
+    floating = sum(float(order.profit) for order in open_orders)
+    assert equity['equity'][-1] == trades['profit'].sum() + floating
+
+    report = analyze_path(blotter_path)
+    assert report['trades'] == len(trades['order_id'])
+    assert report['profit'] == round(trades['profit'].sum(), 2)
+    assert 'p50' in report['mfe']
+
+
+def test_blotter_fresh_run(tmp_path):
+    path = str(tmp_path)
+    writer = ChunkWriter(path, EQUITY_PREFIX, EQUITY_FIELDS, chunk_size=2)
+    for i in range(5):
+        writer.append((i, i, 0, 0))
+    writer.flush()
+    assert list(load_equity(path)['time']) == [0, 1, 2, 3, 4]
+
+    # resume keeps chunks until truncated to the checkpoint
+    writer = ChunkWriter(path, EQUITY_PREFIX, EQUITY_FIELDS, chunk_size=2, resume=True)
+    assert list(load_equity(path)['time']) == [0, 1, 2, 3, 4]
+    writer.truncate(1, 2)
+    writer.append((9, 9, 0, 0))
+    writer.flush()
+    assert list(load_equity(path)['time']) == [0, 1, 9]
+
+    # a new run into the same directory starts empty
+    writer = ChunkWriter(path, EQUITY_PREFIX, EQUITY_FIELDS, chunk_size=2)
+    writer.append((99, 99, 0, 0))
+    writer.flush()
+    assert list(load_equity(path)['time']) == [99]
+
+
+def test_blotter_run_twice(tmp_path):
+    blotter_path = str(tmp_path / 'blotter')
+    counts = []
+    for order_count in (3, 1):
+        account = BacktestAccount()
+        runner = BacktestRunner('./tests/test_tick.csv', [account], [], [], blotter_path=blotter_path)
+        runner.blotter.trades.chunk_size = 1
+        with open('./tests/test_tick.csv') as f:
+            tick = runner.line_to_event(f.readline())
+        for _ in range(order_count):
+            account.market_order('GBPUSD', OrderSide.BUY, 0.1, take_profit=50, stop_loss=1, tick=tick)
+        runner.run()
+        counts.append(len(load_trades(blotter_path)['order_id']))
+    # trades of the first run are not mixed into the second
+    assert counts == [3, 1]
@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+from falcon.base.timeframe import PERIOD_M1, PERIOD_TICK
+
+from base.candle import CandleStore, CandleBuffer, TickBuffer
+
+
+def test_candle_buffer():
+    candles = CandleBuffer(3)
+    start = datetime(2018, 12, 3, 4, 41)
+    assert len(candles) == 0
+    assert len(candles['close_bid']) == 0
+
+    for i in range(5):
+        candle_time = start + timedelta(minutes=i)
+        assert candles.update_tick(candle_time, 1.0 + i, 1.1 + i)
+        assert not candles.update_tick(candle_time, 1.5 + i, 1.6 + i)
+        assert not candles.update_tick(candle_time, 0.5 + i, 0.6 + i)
+
+    assert len(candles) == 3
+    assert list(candles['open_bid']) == [3.0, 4.0, 5.0]
+    assert list(candles['high_bid']) == [3.5, 4.5, 5.5]
+    assert list(candles['low_ask']) == [2.6, 3.6, 4.6]
+    assert list(candles['close_ask']) == [2.6, 3.6, 4.6]
+    assert candles['time'][-1] == np.datetime64(start + timedelta(minutes=4), 'us')
+
+    # view shares memory with the ring buffer
+    assert np.shares_memory(candles['close_bid'], candles.arrays['close_bid'])
+
+
+def test_candle_store():
+    store = CandleStore(max_ohlc_keep=50, max_tick_keep=2)
+    assert isinstance(store['GBPUSD', PERIOD_M1], CandleBuffer)
+
+    ticks = store['GBPUSD', PERIOD_TICK]
+    assert isinstance(ticks, TickBuffer)
+    now = datetime.utcnow()
+    for i in range(3):
+        ticks.append(now + timedelta(seconds=i), 1.0 + i, 1.1 + i)
+    assert list(ticks['bid']) == [2.0, 3.0]
+    assert len(store['EURUSD', PERIOD_TICK]) == 0
@@ -0,0 +1,83 @@
+from datetime import datetime
+from decimal import Decimal
+
+from falcon.event import TickPriceEvent, HeartBeatEvent, DebugEvent
+
+from benchmarks.codec import run_benchmarks
+from redis_queue.codec import BINARY_CODEC, JSON_CODEC, BinaryCodec, get_codec
+from runner.runner import MemoryQueueRunner
+from runner.shard import ShardRouter
+
+
+def test_binary_codec():
+    tick = TickPriceEvent('fxcm', 'GBPUSD', datetime(2018, 12, 3, 0, 0, 0, 39000), Decimal('1.27006'),
+                          Decimal('113.020'))
+    tick.tried = 2
+    for event in (tick, HeartBeatEvent(3), DebugEvent('signal')):
+        data = BINARY_CODEC.encode(event)
+        assert isinstance(data, bytes)
+        assert len(data) < len(JSON_CODEC.encode(event))
+        decoded = BINARY_CODEC.decode(data)
+        assert type(decoded) is type(event)
+        assert decoded.to_dict() == event.to_dict()
+
+    decoded = BINARY_CODEC.decode(BINARY_CODEC.encode(tick))
+    assert decoded.ask == Decimal('113.020') and str(decoded.ask) == '113.020'
+    assert decoded.tried == 2
+
+    # json items still readable, e.g. put by a debug tool
+    assert BINARY_CODEC.decode(JSON_CODEC.encode(tick)).to_dict() == tick.to_dict()
+
+
+def test_binary_codec_fallback():
+    codec = BinaryCodec()
+    event = HeartBeatEvent(1)
+    # no schema registered, encoded as json
+    assert codec.decode(codec.encode(event)).to_dict() == event.to_dict()
+
+    # attribute of type without tag, whole event encoded as json
+    event = DebugEvent('signal')
+    event.extra = (1, 2)
+    assert BINARY_CODEC.encode(event) == JSON_CODEC.encode(event).encode()
+
+    try:
+        codec.register(DebugEvent, 1, [])
+        codec.register(HeartBeatEvent, 1, [])
+        assert False
+    except ValueError:
+        pass
+
+
+def test_runner_codec():
+    runner = MemoryQueueRunner('test', [], [], [], codec='binary')
+    assert runner.codec is BINARY_CODEC
+    event = HeartBeatEvent(3)
+    assert runner.decode_event(runner.encode_event(event)).to_dict() == event.to_dict()
+    assert get_codec(JSON_CODEC) is JSON_CODEC
+    assert MemoryQueueRunner('test', [], [], [], codec='json').codec is JSON_CODEC
+
+
+class ListQueue(list):
+    def __init__(self, name, binary=False):
+        super(ListQueue, self).__init__()
+        self.binary = binary
+
+    def put(self, item):
+        self.append(item)
+
+
+def test_shard_router_codec():
+    router = ShardRouter('test', [['GBPUSD']], queue_class=ListQueue, codec=BINARY_CODEC)
+    assert router.queues[0].binary
+    event = HeartBeatEvent(1)
+    router.put_event(event)
+    assert BINARY_CODEC.decode(router.queues[0][0]).to_dict() == event.to_dict()
+
+
+def test_codec_benchmark():
+    report = run_benchmarks(count=300)
+    assert set(report['results']) == {'json', 'binary'}
+    for result in report['results'].values():
+        assert result['count'] == 303
+        assert result['encode_per_sec'] > 0 and result['decode_per_sec'] > 0
+    assert report['results']['binary']['bytes_per_event'] < report['results']['json']['bytes_per_event']
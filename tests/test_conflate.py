@@ -0,0 +1,77 @@
+import threading
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from falcon.event import TickPriceEvent, DebugEvent
+
+from base.conflate import ConflatingQueue
+from runner.runner import MemoryQueueRunner
+
+
+def create_tick(instrument, bid, second=0):
+    return TickPriceEvent('test', instrument, datetime(2018, 12, 3, 0, 0, second), Decimal(bid),
+                          Decimal(bid) + Decimal('0.0002'))
+
+
+def test_conflating_queue():
+    queue = ConflatingQueue(merge_range=True)
+    first = DebugEvent('first')
+    queue.put(create_tick('GBPUSD', '1.27000'))
+    queue.put(first)
+    queue.put(create_tick('EURUSD', '1.13000'))
+    last = create_tick('GBPUSD', '1.27010')
+    for bid in ('1.26990', '1.27030'):
+        queue.put(create_tick('GBPUSD', bid))
+    queue.put(last)
+    second = DebugEvent('second')
+    queue.put(second)
+
+    events = queue.get_many(10)
+    # newest GBPUSD tick moved behind events put before it, other events in order
+    assert len(events) == 4
+    assert events[0] is first and events[2] is last and events[3] is second
+    assert events[1].instrument == 'EURUSD'
+    assert last.high == Decimal('1.27030') and last.low == Decimal('1.26990')
+    stats = queue.stats()
+    assert stats['conflated'] == 3 and stats['queued'] == 0
+    assert stats['max_age'] >= 0
+
+    # tick of an instrument already taken is queued again
+    queue.put(create_tick('GBPUSD', '1.27000'))
+    assert len(queue) == 1
+
+
+def test_conflating_queue_event_time():
+    queue = ConflatingQueue(event_time=True)
+    tick = create_tick('GBPUSD', '1.27000')
+    tick.time = datetime.utcnow() - timedelta(seconds=60)
+    queue.put(tick)
+    queue.put(create_tick('GBPUSD', '1.27010'))
+    # age counts from the time of the first queued tick, not from put
+    assert 60 <= queue.age() < 70
+    queue.get()
+    assert 60 <= queue.stats()['max_age'] < 70
+
+
+def test_conflating_queue_block():
+    queue = ConflatingQueue()
+    assert queue.get(block=True, timeout=0.01) is None
+    tick = create_tick('GBPUSD', '1.27000')
+    threading.Timer(0.01, queue.put, (tick,)).start()
+    assert queue.get(block=True, timeout=2) is tick
+
+
+def test_runner_conflate():
+    runner = MemoryQueueRunner('test', [], [], [], conflate=True, threaded=True)
+    for i in range(5000):
+        runner.put_event(create_tick('GBPUSD', '1.27000', i % 60))
+    # feed never blocks, backlog bounded by instruments
+    assert runner.queue.qsize() == 1
+    assert runner.yield_events(10)[0].time.second == 4999 % 60
+    assert runner.yield_event() is None
+
+    # dead entries of moved ticks are compacted
+    for i in range(1000):
+        runner.put_event(DebugEvent(i) if i % 10 == 0 else create_tick('GBPUSD', '1.27000'))
+    assert runner.queue.qsize() == 101
+    assert len(runner.queue.entries) <= 2 * 101
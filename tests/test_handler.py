@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from falcon.base.timeframe import PERIOD_CHOICES, PERIOD_TICK, PERIOD_M1, PERIOD_H1, get_candle_time
+from falcon.event import TickPriceEvent
+
+from handler import TimeFramePublisher
+
+
+class DummyContext(object):
+    last_tick_time = None
+
+    def __init__(self):
+        self.candle_window = None
+        self.candle_time = dict((timeframe, None) for timeframe in PERIOD_CHOICES + [PERIOD_TICK])
+        self.events = []
+
+    def put_event(self, event):
+        self.events.append(event)
+
+
+def test_timeframe_publisher():
+    publisher = TimeFramePublisher()
+    context = DummyContext()
+    start = datetime(2018, 12, 3, 4, 41, 31)
+    times = [start + timedelta(seconds=17 * i) for i in range(1000)]
+
+    expected = []
+    previous = dict((timeframe, get_candle_time(start, timeframe)) for timeframe in PERIOD_CHOICES)
+    for time in times:
+        for timeframe in PERIOD_CHOICES:
+            candle_time = get_candle_time(time, timeframe)
+            if candle_time != previous[timeframe]:
+                expected.append((timeframe, candle_time, previous[timeframe]))
+                previous[timeframe] = candle_time
+
+    for time in times:
+        tick = TickPriceEvent(broker='Back test broker', instrument='GBPUSD', time=time,
+                              bid=Decimal('1.27724'), ask=Decimal('1.27732'))
+        publisher.process(tick, context)
+
+    published = [(event.timeframe, event.current_time, event.previous) for event in context.events]
+    assert published == expected
+    assert len([x for x in published if x[0] == PERIOD_M1]) == 283
+    assert len([x for x in published if x[0] == PERIOD_H1]) == 5
+    assert context.candle_window[0] <= times[-1] < context.candle_window[1]
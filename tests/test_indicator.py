@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import talib as ta
+
+from base.candle import CandleBuffer
+from base.indicator import SMA, EMA, RSI, ATR, ADX, BollingerBands
+
+
+def random_candles(count=300, seed=7):
+    random = np.random.RandomState(seed)
+    close = 1.3 + np.cumsum(random.normal(0, 0.001, count))
+    high = close + np.abs(random.normal(0, 0.0008, count))
+    low = close - np.abs(random.normal(0, 0.0008, count))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    candles = [{'open_bid': open_[i], 'high_bid': high[i], 'low_bid': low[i], 'close_bid': close[i]}
+               for i in range(count)]
+    return candles, high, low, close
+
+
+def feed(indicator, candles):
+    for candle in candles:
+        indicator.update(candle)
+    return indicator.to_array()
+
+
+def assert_close(actual, expected):
+    np.testing.assert_allclose(actual, expected, rtol=1e-8, atol=1e-10, equal_nan=True)
+
+
+def test_moving_average():
+    candles, high, low, close = random_candles()
+    assert_close(feed(SMA(10), candles), ta.SMA(close, timeperiod=10))
+    assert_close(feed(EMA(5), candles), ta.EMA(close, timeperiod=5))
+    assert_close(feed(EMA(10), candles), ta.EMA(close, timeperiod=10))
+
+
+def test_oscillator():
+    candles, high, low, close = random_candles()
+    assert_close(feed(RSI(14), candles), ta.RSI(close, timeperiod=14))
+    assert_close(feed(ATR(14), candles), ta.ATR(high, low, close, timeperiod=14))
+    assert_close(feed(ADX(14), candles), ta.ADX(high, low, close, timeperiod=14))
+
+
+def test_bollinger_bands():
+    candles, high, low, close = random_candles()
+    bands = BollingerBands(20, nbdev_up=2, nbdev_down=2)
+    middle = feed(bands, candles)
+    expected_upper, expected_middle, expected_lower = ta.BBANDS(close, timeperiod=20, nbdevup=2, nbdevdn=2)
+    assert_close(middle, expected_middle)
+    assert_close(np.array(bands.upper), expected_upper)
+    assert_close(np.array(bands.lower), expected_lower)
+
+
+def test_bind_candle_buffer():
+    candles, high, low, close = random_candles(count=40)
+    buffer = CandleBuffer(50)
+    start = datetime(2018, 12, 3)
+
+    def tick(i, bid):
+        buffer.update_tick(start + timedelta(hours=i), bid, bid + 0.0002)
+
+    for i in range(20):
+        tick(i, close[i])
+    ema = EMA(5).bind(buffer)
+    assert len(ema) == 19
+
+    for i in range(20, 40):
+        tick(i, close[i])
+    assert len(ema) == 39
+    assert_close(ema.to_array(), ta.EMA(close[:39], timeperiod=5))
+    assert ema[-1] == ema.to_array()[-1]
@@ -0,0 +1,76 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from falcon.event import TickPriceEvent, HeartBeatEvent, DebugEvent
+
+from base.lanes import Lanes, LaneQueue, TICK, CONTROL
+from redis_queue.queue import RedisLaneQueue
+from runner.runner import MemoryQueueRunner, StreamQueueRunner
+
+
+def create_tick(i):
+    return TickPriceEvent('test', 'GBPUSD', datetime(2018, 12, 3, 0, 0, i), Decimal('1.27006'), Decimal('1.27021'))
+
+
+def test_strict_lanes():
+    queue = LaneQueue(Lanes())
+    ticks = [create_tick(i) for i in range(5)]
+    for tick in ticks:
+        queue.put(tick)
+    debug = DebugEvent('signal')
+    queue.put(debug)
+    heartbeat = HeartBeatEvent(1)
+    queue.put(heartbeat)
+
+    # control and timeframe lanes overtake ticks, order kept in lane
+    assert queue.get() is debug
+    assert queue.get_many(3) == [heartbeat] + ticks[:2]
+    queue.put(DebugEvent('signal'))
+    assert queue.get().type == DebugEvent.type
+    assert queue.get_many(10) == ticks[2:]
+    assert queue.get() is None and len(queue) == 0
+
+
+def test_weighted_lanes():
+    lanes = Lanes(mapping={HeartBeatEvent.type: CONTROL}, weights={'control': 2, 'order': 2, 'timeframe': 1, 'tick': 1})
+    queue = LaneQueue(lanes)
+    for i in range(4):
+        queue.put(create_tick(i))
+        queue.put(HeartBeatEvent(i))
+    types = [queue.get().type for _ in range(8)]
+    # 2 control then 1 tick in turn, ticks are not starved
+    assert types == [HeartBeatEvent.type] * 2 + [TickPriceEvent.type] + [HeartBeatEvent.type] * 2 + \
+        [TickPriceEvent.type] * 3
+    assert lanes.get_lane('UNKNOWN') == lanes.names.index('order')
+    assert lanes.get_lane(TickPriceEvent.type) == lanes.names.index(TICK)
+
+
+def test_runner_lanes():
+    runner = MemoryQueueRunner('test', [], [], [], lanes=True)
+    tick, debug = create_tick(0), DebugEvent('signal')
+    runner.put_event(tick)
+    runner.put_event(debug)
+    assert runner.yield_events(10) == [debug, tick]
+    assert runner.yield_event() is None
+
+    with pytest.raises(ValueError):
+        MemoryQueueRunner('test', [], [], [], lanes=True, threaded=True)
+    with pytest.raises(ValueError):
+        StreamQueueRunner('test', [], [], [], lanes=True)
+
+
+def test_redis_lanes(redis_server):
+    for weights in (None, {'control': 2, 'order': 2, 'timeframe': 1, 'tick': 1}):
+        queue = RedisLaneQueue('test_lanes', Lanes(weights=weights))
+        for key in queue.keys:
+            redis_server.delete(key)
+        tick_lane, control_lane = queue.lanes.names.index(TICK), queue.lanes.names.index(CONTROL)
+        queue.put_many([('t%s' % i, tick_lane) for i in range(3)] + [('c%s' % i, control_lane) for i in range(3)])
+        assert queue.qsize() == 6
+        if weights:
+            assert queue.get_many(4) == ['c0', 'c1', 't0', 'c2']
+        else:
+            assert queue.get_many(4) == ['c0', 'c1', 'c2', 't0']
+        assert queue.get_many(10, block=True) == ['t1', 't2']
+        assert queue.get(block=True, timeout=0.1) is None
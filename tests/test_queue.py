@@ -0,0 +1,142 @@
+from falcon.event import HeartBeatEvent, DebugEvent
+from redis.exceptions import ResponseError
+
+from handler import BaseHandler
+from redis_queue.queue import RedisQueue
+from runner.runner import ReisQueueRunner
+
+
+class FakeRedis(object):
+    """list commands of redis in memory, count round trips"""
+
+    def __init__(self, lpop_count=True, old_client=False):
+        self.lists = {}
+        self.calls = 0
+        self.lpop_count = lpop_count
+        self.old_client = old_client
+
+    def rpush(self, key, *items):
+        self.calls += 1
+        self.lists.setdefault(key, []).extend(items)
+
+    def lpop(self, key, count=None):
+        self.calls += 1
+        items = self.lists.setdefault(key, [])
+        if count is None:
+            return items.pop(0) if items else None
+        if self.old_client:
+            raise TypeError('lpop() takes 2 positional arguments but 3 were given')
+        if not self.lpop_count:
+            raise ResponseError('wrong number of arguments for \'lpop\' command')
+        result, self.lists[key] = items[:count], items[count:]
+        return result or None
+
+    def blpop(self, key, timeout=None):
+        item = self.lpop(key)
+        return (key, item) if item else None
+
+    def lrange(self, key, start, end):
+        self.calls += 1
+        return self.lists.get(key, [])[start:end + 1]
+
+    def ltrim(self, key, start, end):
+        self.calls += 1
+        self.lists[key] = self.lists.get(key, [])[start:]
+
+    def llen(self, key):
+        self.calls += 1
+        return len(self.lists.get(key, []))
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline(object):
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.commands.append((name, args))
+
+    def execute(self):
+        calls = self.redis.calls
+        results = [getattr(self.redis, name)(*args) for name, args in self.commands]
+        self.redis.calls = calls + 1
+        return results
+
+
+def create_queue(redis):
+    queue = RedisQueue('test')
+    queue._RedisQueue__db = redis
+    return queue
+
+
+def test_put_many_get_many():
+    for lpop_count, old_client in ((True, False), (False, False), (True, True)):
+        redis = FakeRedis(lpop_count, old_client)
+        queue = create_queue(redis)
+        queue.chunk_size = 3
+        assert queue.put_many([str(i) for i in range(7)] + ['']) == 7
+        assert redis.calls == 1
+        assert queue.get_many(5) == ['0', '1', '2', '3', '4']
+        assert queue.get_many(5) == ['5', '6']
+        assert queue.get_many(5) == []
+        assert queue.lpop_count is (lpop_count and not old_client)
+
+        queue.put('7')
+        assert queue.get_many(5, block=True) == ['7']
+
+
+class PutHandler(BaseHandler):
+    subscription = [HeartBeatEvent.type]
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.sent = []
+
+    def process(self, event, context):
+        # what is in redis when the event is handled
+        self.sent.append(self.redis.calls)
+        context.put_event(DebugEvent('signal'))
+
+
+def test_runner_batch():
+    redis = FakeRedis()
+    runner = ReisQueueRunner('test', [], [], [], batch_size=10, flush_interval=60)
+    runner.queue._RedisQueue__db = redis
+    handler = PutHandler(redis)
+    runner.register([handler])
+
+    # outside a batch put is sent at once
+    for i in range(5):
+        runner.put_event(HeartBeatEvent(i))
+    assert redis.calls == 5
+
+    events = runner.yield_events(runner.batch_size)
+    assert len(events) == 5 and redis.calls == 6
+    runner.handle_batch(events)
+    # events put by handlers sent together after the batch
+    assert handler.sent == [6] * 5
+    assert redis.calls == 7
+    assert [event.type for event in runner.yield_events(10)] == [DebugEvent.type] * 5
+
+    # buffered longer than flush_interval
+    runner.flush_interval = 0
+    runner.put_event(HeartBeatEvent(1))
+    runner.put_event(HeartBeatEvent(2))
+    runner.handle_batch(runner.yield_events(10))
+    assert handler.sent[-2:] == [11, 12]
+    assert len(redis.lists['queue:test']) == 2
+
+
+def test_runner_bad_item():
+    redis = FakeRedis()
+    runner = ReisQueueRunner('test', [], [], [], batch_size=10)
+    runner.queue._RedisQueue__db = redis
+    runner.put_event(HeartBeatEvent(1))
+    redis.rpush('queue:test', '{not json')
+    runner.put_event(HeartBeatEvent(2))
+
+    # only the bad item is dropped
+    assert [event.counter for event in runner.yield_events(10)] == [1, 2]
@@ -0,0 +1,85 @@
+import time
+
+from falcon.event import HeartBeatEvent, DebugEvent
+
+from backtest.runner import BacktestRunner
+from handler import BaseHandler
+from runner.retry import RetryPolicy, RedisRetryQueue
+from runner.runner import MemoryQueueRunner, ReisQueueRunner
+
+
+def test_retry_policy():
+    policy = RetryPolicy(base_delay=1, factor=2, max_delay=5, jitter=0.2)
+    for tried, delay in ((1, 1), (2, 2), (3, 4), (4, 5), (10, 5)):
+        assert delay * 0.8 <= policy.get_delay(tried) <= delay
+    assert RetryPolicy(base_delay=0).get_delay(3) == 0
+
+
+class FailHandler(BaseHandler):
+    subscription = [DebugEvent.type]
+
+    def process(self, event, context):
+        return True
+
+
+def test_retry_queue():
+    runner = MemoryQueueRunner('test', [], [], [FailHandler()],
+                               retry_policies={DebugEvent.type: RetryPolicy(base_delay=10, jitter=0, max_tries=2)})
+    event = DebugEvent('signal')
+    now = time.time()
+    runner.loop_handlers(event)
+    assert runner.yield_event() is None
+    runner.timers.advance(now + 9)
+    assert runner.yield_event() is None
+    runner.timers.advance(now + 11)
+    assert runner.yield_event() is event and event.tried == 1
+
+    # second retry waits double
+    runner.loop_handlers(event)
+    runner.timers.advance(now + 11 + 21)
+    assert runner.yield_event() is event and event.tried == 2
+
+    # retried max_tries times
+    runner.loop_handlers(event)
+    runner.timers.advance(now + 100)
+    assert runner.yield_event() is None
+    assert event.tried == 2
+    assert list(runner.retry_queue.dead_letters) == [event]
+    stats = runner.retry_queue.stats()
+    assert stats['retried'] == 2 and stats['dead'] == 1 and stats['waiting'] == 0
+    assert stats['retried_types'] == {DebugEvent.type: 2}
+
+    # other types by default policy
+    heartbeat = HeartBeatEvent(1)
+    runner.retry_event(heartbeat)
+    assert runner.yield_event() is None
+    runner.timers.advance(now + 101)
+    assert runner.yield_event() is heartbeat
+
+
+def test_backtest_retry():
+    runner = BacktestRunner('./tests/test_tick.csv', [], [], [])
+    event = DebugEvent('signal')
+    runner.retry_event(event)
+    # no timers in backtest, re-put at once
+    assert runner.queue.popleft() is event and event.tried == 1
+
+
+def test_redis_retry_queue(redis_server):
+    runner = ReisQueueRunner('test_retry', [], [], [])
+    retry_queue = runner.retry_queue
+    assert isinstance(retry_queue, RedisRetryQueue)
+    redis_server.delete(retry_queue.key, retry_queue.dead_key, runner.queue.key)
+
+    retry_queue.default = RetryPolicy(base_delay=0.05, jitter=0, max_tries=2)
+    event = DebugEvent('signal')
+    runner.retry_event(event)
+    runner.retry_event(event)
+    assert retry_queue.stats()['waiting'] == 2
+    assert retry_queue.poll() == 0
+    time.sleep(0.2)
+    assert retry_queue.poll() == 2
+    assert [e.tried for e in runner.yield_events(10)] == [1, 2]
+
+    runner.retry_event(event)
+    assert redis_server.llen(retry_queue.dead_key) == 1
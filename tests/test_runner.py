@@ -0,0 +1,154 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+from falcon.event import HeartBeatEvent, DebugEvent
+
+from handler import BaseHandler
+from runner.async_runner import AsyncRunner
+from runner.base import BaseRunner
+from runner.runner import MemoryQueueRunner
+
+
+def test_memory_queue_runner():
+    for threaded in (False, True):
+        runner = MemoryQueueRunner('test', [], [], [], threaded=threaded)
+        first, second = HeartBeatEvent(1), HeartBeatEvent(2)
+        runner.put_event(first)
+        runner.put_event(second)
+        # queued as object, no serialization round trip
+        assert runner.yield_event() is first
+        assert runner.yield_event() is second
+        assert runner.yield_event() is None
+
+
+def test_memory_queue_maxsize():
+    assert MemoryQueueRunner('test', [], [], []).queue.maxlen is None
+    assert MemoryQueueRunner('test', [], [], [], threaded=True).queue.maxsize == 2000
+    runner = MemoryQueueRunner('test', [], [], [], maxsize=1)
+    assert not runner.plain and runner.queue.maxsize == 1
+    runner.put_event(HeartBeatEvent(1))
+    assert runner.queue.full()
+
+
+def test_encode_event():
+    runner = MemoryQueueRunner('test', [], [], [])
+    event = HeartBeatEvent(3)
+    decoded = BaseRunner.decode_event(runner, BaseRunner.encode_event(runner, event))
+    assert isinstance(decoded, HeartBeatEvent)
+    assert decoded.to_dict() == event.to_dict()
+
+
+class RecordHandler(BaseHandler):
+    def __init__(self, name, subscription, records, result=None, error=False):
+        self.name = name
+        self.subscription = subscription
+        self.records = records
+        self.result = result
+        self.error = error
+
+    def process(self, event, context):
+        self.records.append(self.name)
+        if self.error:
+            raise ValueError(self.name)
+        return self.result
+
+
+def test_routes():
+    records = []
+    strategy = RecordHandler('strategy', [HeartBeatEvent.type], records, result=True)
+    runner = MemoryQueueRunner('test', [], [strategy], [])
+    runner.handlers = []
+    runner.register([RecordHandler('all', ['*'], records, error=True),
+                     RecordHandler('heartbeat', [HeartBeatEvent.type], records),
+                     RecordHandler('debug', [DebugEvent.type], records, result=True)])
+
+    assert len(runner.routes[HeartBeatEvent.type]) == 3
+    # failed handler does not stop the others, strategy result never asks re-put
+    assert not runner.dispatch(HeartBeatEvent(1))
+    assert records == ['strategy', 'all', 'heartbeat']
+
+    records.clear()
+    runner.loop_handlers(DebugEvent('test'))
+    assert records == ['all', 'debug']
+    # re-put after backoff
+    assert runner.yield_event() is None
+    runner.timers.advance(time.time() + 1)
+    assert runner.yield_event().tried == 1
+
+    runner.register([RecordHandler('late', [DebugEvent.type], records)])
+    records.clear()
+    runner.dispatch(DebugEvent('test'))
+    assert records == ['all', 'debug', 'late']
+
+
+def test_async_runner():
+    records = []
+
+    class SlowHandler(BaseHandler):
+        subscription = [DebugEvent.type]
+
+        async def process(self, event, context):
+            await asyncio.sleep(0.01)
+            records.append(('slow', event.action))
+
+    class BlockingHandler(BaseHandler):
+        subscription = [DebugEvent.type]
+        blocking = True
+
+        def process(self, event, context):
+            time.sleep(0.01)
+            records.append(('blocking', event.action))
+
+    class StopHandler(BaseHandler):
+        subscription = [DebugEvent.type, HeartBeatEvent.type]
+
+        def process(self, event, context):
+            records.append((event.type, getattr(event, 'action', None)))
+            if event.type == HeartBeatEvent.type:
+                context.stop()
+
+    runner = AsyncRunner('test', [], [], [SlowHandler(), BlockingHandler(), StopHandler()])
+    runner.heartbeat = 0.05
+    runner.put_event(DebugEvent('first'))
+    runner.put_event(DebugEvent('second'))
+    runner.run()
+
+    # events are not held by slow handlers, which still finish before the runner exits
+    assert records[:2] == [(DebugEvent.type, 'first'), (DebugEvent.type, 'second')]
+    assert set(records[2:]) == {('slow', 'first'), ('slow', 'second'), ('blocking', 'first'),
+                                ('blocking', 'second'), (HeartBeatEvent.type, None)}
+    assert not runner.tasks
+
+
+def test_async_runner_blocking_put():
+    threads = []
+
+    class ThreadQueue(deque):
+        def append(self, item):
+            threads.append(threading.get_ident())
+            super(ThreadQueue, self).append(item)
+
+    class BlockingHandler(BaseHandler):
+        subscription = [DebugEvent.type]
+        blocking = True
+
+        def process(self, event, context):
+            context.put_event(HeartBeatEvent(1))
+
+    class StopHandler(BaseHandler):
+        subscription = [HeartBeatEvent.type]
+
+        def process(self, event, context):
+            context.stop()
+
+    runner = AsyncRunner('test', [], [], [BlockingHandler(), StopHandler()])
+    runner.use_timer = False
+    runner.queue = ThreadQueue()
+    runner.put_event(DebugEvent('first'))
+    runner.run()
+
+    # put by pool thread is appended by the loop thread
+    assert len(threads) == 2 and threads[1] == threading.get_ident()
+    assert not runner.queue
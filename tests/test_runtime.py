@@ -0,0 +1,169 @@
+import json
+import time
+from datetime import datetime
+from decimal import Decimal
+from queue import Queue
+
+from redis_queue.runtime import StatusRecorder, PriceCache, TICK_PRICE_CHANNEL
+
+
+class StatusRedis(object):
+    """status commands of redis in memory, publish goes to subscribed queues"""
+
+    def __init__(self):
+        self.data = {}
+        self.calls = 0
+        self.subscribers = []
+
+    def mset(self, mapping):
+        self.calls += 1
+        self.data.update(mapping)
+
+    def get(self, key):
+        self.calls += 1
+        return self.data.get(key)
+
+    def mget(self, keys):
+        self.calls += 1
+        return [self.data.get(key) for key in keys]
+
+    def publish(self, channel, message):
+        for subscriber in self.subscribers:
+            subscriber.put({'type': 'message', 'channel': channel, 'data': message})
+
+    def pipeline(self, transaction=True):
+        return StatusPipeline(self)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return StatusPubSub(self)
+
+
+class StatusPipeline(object):
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.commands.append((name, args))
+
+    def execute(self):
+        calls = self.redis.calls
+        for name, args in self.commands:
+            getattr(self.redis, name)(*args)
+        self.redis.calls = calls + 1
+
+
+class StatusPubSub(Queue):
+    def __init__(self, redis):
+        super(StatusPubSub, self).__init__()
+        self.redis = redis
+
+    def subscribe(self, channel):
+        assert channel == TICK_PRICE_CHANNEL
+        self.redis.subscribers.append(self)
+
+    def listen(self):
+        while True:
+            yield self.get()
+
+    def close(self):
+        self.redis.subscribers.remove(self)
+
+
+def test_status_recorder():
+    redis = StatusRedis()
+    recorder = StatusRecorder(redis, flush_interval=60)
+    for i in range(100):
+        recorder.set('LAST_TICK_TIME', i)
+        recorder.set('GBPUSD_LIST', i)
+    recorder.set('HEARTBEAT', 1)
+    # nothing sent yet, reads see the latest value
+    assert redis.calls == 0
+    assert recorder.get('LAST_TICK_TIME') == 99
+
+    recorder.stop()
+    assert redis.calls == 1
+    assert redis.data == {'LAST_TICK_TIME': 99, 'GBPUSD_LIST': 99, 'HEARTBEAT': 1}
+    assert recorder.stats() == {'writes': 201, 'coalesced': 198, 'flushed': 3, 'flushes': 1, 'pending': 0}
+    assert recorder.get('HEARTBEAT') == 1
+
+
+def test_status_recorder_thread():
+    redis = StatusRedis()
+    recorder = StatusRecorder(redis, flush_interval=0.01)
+    recorder.set('HEARTBEAT', 1)
+    deadline = time.time() + 2
+    while not redis.data and time.time() < deadline:
+        time.sleep(0.01)
+    assert redis.data == {'HEARTBEAT': 1}
+    recorder.stop()
+    assert recorder.thread is None
+
+    # write through
+    recorder = StatusRecorder(redis, flush_interval=0)
+    recorder.set('HEARTBEAT', 2)
+    assert redis.data['HEARTBEAT'] == 2 and recorder.thread is None
+
+
+def wait_for(condition):
+    deadline = time.time() + 2
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+
+def test_price_cache():
+    redis = StatusRedis()
+    recorder = StatusRecorder(redis, flush_interval=60)
+    price = {'bid': 1.27006, 'ask': 1.27021, 'time': '2018-12-03 00:00:00:039000'}
+    redis.data['GBPUSD_LIST'] = json.dumps(price)
+
+    cache = PriceCache(recorder, redis)
+    cold = cache.get_many(['GBPUSD_LIST', 'EURUSD_LIST'])
+    assert cold['GBPUSD_LIST']['bid'] == Decimal('1.27006')
+    assert cold['GBPUSD_LIST']['time'] == datetime(2018, 12, 3, 0, 0, 0, 39000)
+    assert cold['EURUSD_LIST'] is None
+    wait_for(lambda: cache.subscribed)
+
+    # cached, read without redis
+    cache.get('GBPUSD_LIST')
+    calls = redis.calls
+    assert cache.get('GBPUSD_LIST')['ask'] == Decimal('1.27021')
+    assert redis.calls == calls
+
+    # published on flush of another process
+    price['bid'] = 1.27010
+    recorder.set('GBPUSD_LIST', json.dumps(price))
+    recorder.set('HEARTBEAT', 1)
+    recorder.flush()
+    wait_for(lambda: cache.updates == 1)
+    assert cache.get('GBPUSD_LIST')['bid'] == Decimal('1.27010')
+
+    stats = cache.stats()
+    assert stats['updates'] == 1 and stats['subscribed']
+    assert stats['staleness_max_ms'] >= stats['staleness_p50_ms'] >= 0
+    assert stats['misses'] >= 2 and stats['hits'] >= 2
+
+    # plain SET by a writer not publishing is read once the cached price is max_age old
+    price['bid'] = 1.27020
+    redis.data['GBPUSD_LIST'] = json.dumps(price)
+    assert cache.get('GBPUSD_LIST')['bid'] == Decimal('1.27010')
+    cache.max_age = 0
+    assert cache.get('GBPUSD_LIST')['bid'] == Decimal('1.27020')
+
+
+def test_get_tick_price_copy(monkeypatch):
+    from redis_queue import runtime
+
+    redis = StatusRedis()
+    redis.data['GBPUSD_LIST'] = json.dumps({'bid': 1.27006, 'ask': 1.27021})
+    cache = PriceCache(StatusRecorder(redis, flush_interval=60), redis)
+    monkeypatch.setattr(runtime, 'price_cache', cache)
+    wait_for(lambda: runtime.get_tick_price('GBPUSD') and cache.subscribed)
+
+    price = runtime.get_tick_price('GBPUSD')
+    price['bid'] = None
+    assert runtime.get_tick_price('GBPUSD')['bid'] == Decimal('1.27006')
+    prices = runtime.get_tick_prices(['GBPUSD'])
+    prices['GBPUSD']['ask'] = None
+    assert runtime.get_tick_prices(['GBPUSD'])['GBPUSD']['ask'] == Decimal('1.27021')
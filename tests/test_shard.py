@@ -0,0 +1,63 @@
+import json
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from falcon.event import TickPriceEvent, HeartBeatEvent
+
+from runner.runner import MemoryQueueRunner
+from runner.shard import ShardRouter, ShardSupervisor, shard_pairs
+
+PAIRS = ['EURUSD', 'GBPUSD', 'USDJPY', 'USDCHF', 'AUDUSD']
+
+
+class ListQueue(object):
+    def __init__(self, name):
+        self.name = name
+        self.items = []
+
+    def put(self, item):
+        self.items.append(item)
+
+
+def create_runner(queue_name, pairs):
+    return MemoryQueueRunner(queue_name, [], [], [])
+
+
+def test_shard_pairs():
+    assert shard_pairs(PAIRS, 2) == [['EURUSD', 'USDJPY', 'AUDUSD'], ['GBPUSD', 'USDCHF']]
+    assert shard_pairs(PAIRS, 10) == [[pair] for pair in PAIRS]
+    assert shard_pairs(PAIRS, 0) == [PAIRS]
+
+
+def test_shard_router():
+    router = ShardRouter('live', shard_pairs(PAIRS, 2), queue_class=ListQueue)
+    assert [queue.name for queue in router.queues] == ['live:0', 'live:1']
+
+    tick = TickPriceEvent('broker', 'GBPUSD', datetime.utcnow(), Decimal('1.27'), Decimal('1.28'))
+    router.put_event(tick)
+    router.put_event(HeartBeatEvent(1))
+    first, second = [[json.loads(item)['type'] for item in queue.items] for queue in router.queues]
+    assert first == [HeartBeatEvent.type]
+    assert second == [TickPriceEvent.type, HeartBeatEvent.type]
+
+
+def test_shard_supervisor():
+    supervisor = ShardSupervisor(create_runner, 'test', PAIRS, shards=2)
+    supervisor.start()
+    try:
+        pid = supervisor.workers[0].pid
+        assert supervisor.check() == []
+
+        supervisor.workers[0].terminate()
+        supervisor.workers[0].join()
+        assert supervisor.check() == [0]
+        assert supervisor.workers[0].pid != pid
+        assert supervisor.workers[0].is_alive()
+
+        # a hung worker stops reporting
+        supervisor.health[1] = time.time() - supervisor.stale_timeout - 1
+        assert supervisor.check() == [1]
+    finally:
+        supervisor.stop()
+    assert not any(worker.is_alive() for worker in supervisor.workers)
@@ -0,0 +1,70 @@
+import random
+import time
+
+from falcon.event import DebugEvent
+
+from base.strategy import StrategyBase
+from runner.runner import MemoryQueueRunner
+
+PAIRS = ['EURUSD', 'GBPUSD', 'USDJPY', 'USDCHF', 'USDCAD', 'AUDUSD', 'NZDUSD']
+
+
+class ParallelStrategy(StrategyBase):
+    pairs = PAIRS
+    parallel = 'thread'
+
+    def signal_pair(self, symbol, event, context):
+        time.sleep(random.random() * 0.01)
+        if symbol == 'USDJPY':
+            raise ValueError(symbol)
+        self.send_event(DebugEvent(symbol), context)
+        self.send_event(DebugEvent(symbol + '_2'), context)
+
+
+class ProcessStrategy(ParallelStrategy):
+    parallel = 'process'
+    params = {'factor': 2}
+
+    def fetch_pair(self, symbol, event, context):
+        time.sleep(random.random() * 0.01)
+        return len(symbol)
+
+    @classmethod
+    def evaluate_pair(cls, params, symbol, data):
+        if symbol == 'USDCHF':
+            raise ValueError(symbol)
+        return data * params['factor']
+
+    def apply_pair(self, symbol, result, event, context):
+        self.send_event(DebugEvent(f'{symbol}={result}'), context)
+
+
+def drain(runner):
+    actions = []
+    event = runner.yield_event()
+    while event:
+        actions.append(event.action)
+        event = runner.yield_event()
+    return actions
+
+
+def test_parallel_signal():
+    strategy = ParallelStrategy()
+    runner = MemoryQueueRunner('test', [], [strategy], [])
+    expected = []
+    for symbol in PAIRS:
+        if symbol != 'USDJPY':
+            expected += [symbol, symbol + '_2']
+
+    for _ in range(3):
+        strategy.signal(DebugEvent('signal'), runner)
+        assert drain(runner) == expected
+    strategy.shutdown()
+
+
+def test_process_signal():
+    strategy = ProcessStrategy()
+    runner = MemoryQueueRunner('test', [], [strategy], [])
+    strategy.signal(DebugEvent('signal'), runner)
+    assert drain(runner) == [f'{symbol}=12' for symbol in PAIRS if symbol != 'USDCHF']
+    strategy.shutdown()
@@ -0,0 +1,64 @@
+import pytest
+from falcon.event import HeartBeatEvent
+
+from redis_queue.queue import RedisStreamQueue
+from redis_queue.redis import queue_redis
+from runner.runner import StreamQueueRunner
+
+
+@pytest.fixture
+def stream_name(redis_server):
+    name = 'test_stream'
+    queue_redis.delete('stream:%s' % name)
+    yield name
+    queue_redis.delete('stream:%s' % name)
+
+
+def test_stream_queue(stream_name):
+    first = RedisStreamQueue(stream_name, consumer='first')
+    second = RedisStreamQueue(stream_name, consumer='second')
+    assert first.put_many(['1', '2', '3']) == 3
+
+    # replicas share the items
+    assert first.get_many(2) == ['1', '2']
+    assert second.get_many(2) == ['3']
+    assert second.ack() == 1
+
+    # first dies before ack, its items are claimed
+    second.claim_idle = 0
+    second.claim_time = 0
+    assert second.get_many(10) == ['1', '2']
+    assert second.ack() == 2
+    assert first.get_many(10) == []
+
+    # warm restart from the beginning of the stream
+    second.replay('0')
+    assert second.get_many(10) == ['1', '2', '3']
+    second.ack()
+
+    second.put_many([str(i) for i in range(10)])
+    assert second.trim(max_len=5) == 8
+    assert second.qsize() == 5
+
+
+def test_stream_consumer_restart(stream_name):
+    queue = RedisStreamQueue(stream_name, consumer='runner')
+    queue.put('a')
+    queue.put('b')
+    assert queue.get() == 'a'
+
+    # same consumer name reads its own pending item first
+    restarted = RedisStreamQueue(stream_name, consumer='runner')
+    assert restarted.get_many(10) == ['a']
+    assert restarted.get_many(10) == ['b']
+
+
+def test_stream_runner(stream_name):
+    runner = StreamQueueRunner(stream_name, [], [], [], consumer='runner', codec='binary')
+    event = HeartBeatEvent(1)
+    runner.put_event(event)
+    events = runner.yield_events(10)
+    assert [e.to_dict() for e in events] == [event.to_dict()]
+    runner.handle_batch(events)
+    assert not runner.queue.delivered
+    assert queue_redis.xpending(runner.queue.key, runner.group)['pending'] == 0
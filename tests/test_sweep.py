@@ -0,0 +1,72 @@
+from falcon.base.order import OrderSide, SignalAction
+from falcon.event import TimeFrameEvent, TickPriceEvent, SignalEvent
+
+from backtest.sweep import expand_grid, create_strategy, sweep, format_table, rank, run_backtest
+from base.strategy import StrategyBase
+
+
+class SweepStrategy(StrategyBase):
+    subscription = [TimeFrameEvent.type]
+    pairs = ['GBPUSD']
+    params = {'period': 5}
+
+    def signal_pair(self, symbol, event, context):
+        pass
+
+
+class EveryTickStrategy(StrategyBase):
+    """buy every nth tick, trade count depends on param `every`, profit on stop_loss too"""
+    name = 'every_tick'
+    version = '1'
+    magic_number = 1
+    subscription = [TickPriceEvent.type]
+    pairs = ['GBPUSD']
+    params = {'every': 10}
+    count = 0
+
+    def signal_pair(self, symbol, event, context):
+        self.count += 1
+        if self.count % self.params['every'] == 0:
+            self.send_event(SignalEvent(SignalAction.OPEN, self.name, self.version, self.magic_number, symbol,
+                                        OrderSide.BUY, take_profit=self.take_profit, stop_loss=self.stop_loss),
+                            context)
+
+
+def test_expand_grid():
+    combinations = expand_grid({'short_ema': [5, 8], 'long_ema': [10, 20, 30], 'take_profit': 50})
+    assert len(combinations) == 6
+    assert {'long_ema': 10, 'short_ema': 5, 'take_profit': 50} in combinations
+
+    strategy = create_strategy(SweepStrategy, {'period': 10, 'take_profit': 50})
+    assert strategy.params == {'period': 10}
+    assert strategy.take_profit == 50
+    assert SweepStrategy.params == {'period': 5}
+
+
+def test_sweep():
+    results = sweep(SweepStrategy, './tests/test_tick.csv', {'period': [5, 10], 'stop_loss': [20, 30]}, processes=2)
+    assert len(results) == 4
+    assert all(result['trades'] == 0 for result in results)
+    assert 'period' in format_table(results).splitlines()[0]
+
+
+def test_sweep_params():
+    grid = {'every': [5, 20], 'stop_loss': [1, 50]}
+    results = sweep(EveryTickStrategy, './tests/test_tick.csv', grid, processes=2)
+    assert len(results) == 4
+
+    # params reached the workers, each result is the same as the backtest in this process
+    for result in results:
+        params = dict((key, result[key]) for key in grid)
+        assert result == run_backtest(EveryTickStrategy, './tests/test_tick.csv', params)
+
+    by_params = dict(((result['every'], result['stop_loss']), result) for result in results)
+    assert by_params[5, 1]['trades'] == by_params[5, 50]['trades'] > by_params[20, 1]['trades'] > 0
+    assert len(set(result['profit'] for result in results)) == 4
+
+    # ranked by profit, then by sort_by
+    profits = [result['profit'] for result in results]
+    assert profits == sorted(profits, reverse=True)
+    assert results[0]['every'] == 20
+    trades = [result['trades'] for result in rank(results, 'trades')]
+    assert trades == sorted(trades, reverse=True) and rank(results, 'trades')[0]['every'] == 5
@@ -0,0 +1,100 @@
+import random
+from datetime import datetime
+
+from falcon.base.timeframe import PERIOD_M1, PERIOD_M5
+from falcon.event import TimeFrameEvent, HeartBeatEvent
+
+from base.timer import TimerWheel
+from handler import get_next_candle_time
+from runner.runner import MemoryQueueRunner
+
+
+class Clock(object):
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_timer_wheel():
+    clock = Clock(1000.0)
+    wheel = TimerWheel(resolution=0.001, slots=8, levels=3, clock=clock)
+    fired = []
+    timers = []
+    generator = random.Random(1)
+    for i in range(1000):
+        delay = generator.choice([0.01, 1, 10]) * generator.random()
+        timers.append(wheel.schedule(delay, lambda due: fired.append((clock.now, due)), clock.now + delay))
+    for timer in timers[::7]:
+        timer.cancel()
+
+    while clock.now < 1011:
+        clock.now += 0.0005
+        wheel.advance()
+
+    assert len(fired) == len([timer for timer in timers if not timer.cancelled])
+    # never early, late no more than one resolution plus clock step
+    assert all(0 <= now - due < 0.0016 for now, due in fired)
+    assert wheel.jitter_stats()['max_us'] < 1600
+    assert wheel.next_timeout() is None
+
+
+def test_timer_interval():
+    clock = Clock(0.0)
+    wheel = TimerWheel(clock=clock)
+    fired = []
+    wheel.schedule(5, fired.append, 1, interval=5)
+    # wakes up to cascade the timer down before it is due
+    assert 0 < wheel.next_timeout() <= 5
+
+    clock.now = 4.999
+    wheel.advance()
+    assert fired == []
+    clock.now = 20
+    wheel.advance()
+    # catch up every missed turn, each rescheduled from its due time
+    assert fired == [1, 1, 1, 1]
+    assert 0 < wheel.next_timeout() <= 5
+
+
+def test_runner_timers():
+    class Strategy(object):
+        timeframes = [PERIOD_M1, PERIOD_M5]
+        subscription = []
+
+    runner = MemoryQueueRunner('test', [], [Strategy()], [])
+    clock = Clock(1000.0)
+    runner.timers = TimerWheel(clock=clock)
+    runner.heartbeat = 1
+    runner.start_timers()
+    # heartbeat plus one timer per strategy timeframe
+    assert len(runner.timers) == 3
+
+    clock.now += 1
+    runner.timers.advance()
+    assert runner.yield_event().type == HeartBeatEvent.type
+
+    now = datetime.utcnow()
+    runner.candle_time[PERIOD_M1] = get_next_candle_time(now, PERIOD_M1).replace(year=now.year - 1)
+    runner.fire_timeframe(PERIOD_M1)
+    event = runner.yield_event()
+    assert event.type == TimeFrameEvent.type
+    assert event.timeframe == PERIOD_M1
+    # next boundary is scheduled, the original M1 timer is still pending
+    assert len(runner.timers) == 4
+
+
+def test_runner_loop_timers():
+    runner = MemoryQueueRunner('test', [], [], [])
+    runner.heartbeat = 0.01
+
+    def stop():
+        runner.running = False
+        runner.halt = True
+
+    runner.timers.schedule(0.05, stop)
+    runner.run()
+    # repeating heartbeat is still scheduled when the loop ends
+    assert len(runner.timers) == 1
+    assert runner.heartbeat_count >= 3
@@ -0,0 +1,63 @@
+from datetime import datetime
+
+import numpy as np
+from falcon.base.order import OrderSide
+from falcon.base.timeframe import PERIOD_M1
+
+from backtest.store import convert_csv
+from backtest.vectorized import VectorizedBacktest, resample, RESOLUTION_M1, summarize_trades
+from base.helper import cross_array
+from base.strategy import StrategyBase
+
+
+class FirstCandleStrategy(StrategyBase):
+    timeframes = [PERIOD_M1]
+    pairs = ['GBPUSD']
+    side = 1
+    stop_loss = 1
+    take_profit = 1
+
+    def vectorized_signal(self, symbol, candles):
+        entry = np.zeros(len(candles['time']), dtype=np.int8)
+        entry[0] = self.side
+        return {'entry': entry}
+
+
+def test_cross_array():
+    assert list(cross_array([1, 2, 3, 2, 1], [2, 2.5, 2.5, 2.5, 2])) == [0, 0, 1, -1, 0]
+
+
+def test_resample(tmp_path):
+    store = convert_csv('./tests/test_tick.csv', str(tmp_path / 'test_tick'))
+    candles = resample(np.asarray(store.time), np.asarray(store.bid), np.asarray(store.ask), PERIOD_M1)
+    assert len(candles['time']) == 3
+    assert candles['time'][0] == np.datetime64(datetime(2018, 12, 3, 4, 41), 'us')
+    assert candles['open_bid'][0] == 127724
+    assert candles['close_bid'][-1] == 127728
+    assert candles['high_ask'][-1] == 127744
+
+
+def test_vectorized_backtest(tmp_path):
+    store_path = str(tmp_path / 'test_tick')
+    convert_csv('./tests/test_tick.csv', store_path)
+
+    trades = VectorizedBacktest(FirstCandleStrategy(), store_path).run()
+    assert len(trades) == 1
+    trade = trades[0]
+    assert trade['side'] == OrderSide.BUY
+    assert trade['open_time'] == datetime(2018, 12, 3, 4, 42, 7, 359000)
+    assert trade['open_price'] == 1.27733
+    assert trade['reason'] == 'stop_loss'
+    assert trade['close_price'] <= 1.27723
+
+    strategy = FirstCandleStrategy()
+    strategy.side = -1
+    strategy.stop_loss = 1
+    strategy.take_profit = 20
+    trades = VectorizedBacktest(strategy, store_path, resolution=RESOLUTION_M1).run()
+    assert trades[0]['side'] == OrderSide.SELL
+    assert trades[0]['open_price'] == 1.2772
+    assert trades[0]['reason'] == 'stop_loss'
+    assert trades[0]['close_price'] == 1.2773
+    assert trades[0]['pips'] == -1
+    assert summarize_trades(trades)['trades'] == 1